@@ -0,0 +1,219 @@
+"""
+applicant_table.py
+
+Tabla compacta de los postulantes limpios (salida de utils.cleanup_applicants).
+
+El DataFrame limpio es de tipo object, con listas de Python en cada fila (subjects,
+ed_licence_level, available_days, unparseable_subjects) y copias crudas de algunas columnas:
+decenas de MB por cada 50.000 postulantes. Es la tabla que se guarda en la sesión
+(st.session_state['dfs']['cleaned_applicants']) y en el caché compartido, y la que leen los paneles
+y el motor de filtrado (matching.ApplicantMatcher, matching.ApplicantIndex). Guarda:
+  - columnas de listas como bitmasks de enteros sin signo: bit j = vocabulario[j]
+    (palabras de 8 a 64 bits según el vocabulario; días y niveles caben en un byte),
+  - textos con pocos valores distintos (genero, comuna_residencia, university, ...) como categóricas
+    y los demás textos (email, nombres, ...) como strings de Arrow,
+  - columnas numéricas tal cual.
+Las copias crudas (RAW_COLUMNS) no se guardan; se leen de Applicants al pedirlas
+(utils.load_applicant_raw_columns). CompactApplicants.rows arma el DataFrame de las filas pedidas.
+"""
+
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from ceas import config as cfg
+
+# columnas de listas -> vocabulario conocido (se le agregan los valores que aparezcan en los datos)
+LIST_COLUMNS = {
+    "available_days": list(cfg.DAY_MAP.values()),
+    "ed_licence_level": sorted(set(cfg.ED_MAPPING.values())),
+    "subjects": sorted(set(cfg.ALLOWED_SUBJECTS) | {cfg.SPECIAL_SUBJECT}),
+    "unparseable_subjects": [],
+}
+# columnas de texto que se guardan siempre como categóricas (las demás, si tienen pocos valores distintos)
+CATEGORICAL_COLUMNS = ["genero", "comuna_residencia", "university"]
+# copias crudas de cleanup_applicants -> columna de Applicants de la que salen (no se guardan en la tabla)
+RAW_COLUMNS = {"phone_raw": "phone", "subjects_raw": "subjects", "ed_licence_level_raw": "ed_licence_level"}
+# textos con tipo Arrow: un buffer contiguo por columna en vez de un objeto str de Python por celda
+ARROW_STRING = pd.ArrowDtype(pa.string())
+
+
+def _as_list(value) -> list:
+    """Valor de una columna de listas => lista (un str suelto cuenta como lista de un elemento)."""
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return list(value)
+    if isinstance(value, str) and value:
+        return [value]
+    return []
+
+
+class BitsetColumn:
+    """
+    Columna de listas codificada como bitmask: bits[i, w] es la palabra w de la fila i, y el bit j
+    (palabra j // word_bits, bit j % word_bits) indica si la fila contiene vocabulary[j].
+    Las palabras son del entero sin signo más chico en que cabe el vocabulario (uint64 si no cabe en una).
+    """
+
+    def __init__(self, series, vocabulary=()):
+        lists = [_as_list(v) for v in series]
+        values = list(chain.from_iterable(lists))
+        self.vocabulary = pd.Index(list(dict.fromkeys(list(vocabulary) + sorted(set(values) - set(vocabulary), key=str))))
+        self.word_bits = next((b for b in (8, 16, 32) if len(self.vocabulary) <= b), 64)
+        self.dtype = np.dtype(f"uint{self.word_bits}")
+        n_words = max(1, -(-len(self.vocabulary) // self.word_bits))
+        rows = np.repeat(np.arange(len(lists)), [len(l) for l in lists])
+        cols = self.vocabulary.get_indexer(values)
+        self.bits = np.zeros((len(lists), n_words), dtype=self.dtype)
+        np.bitwise_or.at(self.bits, (rows, cols // self.word_bits), self._bit(cols))
+
+    def __len__(self):
+        return len(self.bits)
+
+    def _bit(self, cols: np.ndarray) -> np.ndarray:
+        """Palabra con solo el bit de cada columna del vocabulario encendido."""
+        return np.left_shift(self.dtype.type(1), (cols % self.word_bits).astype(self.dtype))
+
+    def query_bits(self, values: list):
+        """(bitmask de 'values', True si todos los valores están en el vocabulario)."""
+        cols = self.vocabulary.get_indexer(list(values))
+        known = cols[cols >= 0]
+        query = np.zeros(self.bits.shape[1], dtype=self.dtype)
+        np.bitwise_or.at(query, known // self.word_bits, self._bit(known))
+        return query, len(known) == len(cols)
+
+    def any_of(self, values: list) -> np.ndarray:
+        """Máscara de filas que contienen al menos uno de 'values'."""
+        query, _ = self.query_bits(values)
+        return ((self.bits & query) != 0).any(axis=1)
+
+    def all_of(self, values: list) -> np.ndarray:
+        """Máscara de filas que contienen todos los 'values'."""
+        query, all_known = self.query_bits(values)
+        if not all_known:
+            return np.zeros(len(self.bits), dtype=bool)
+        return ((self.bits & query) == query).all(axis=1)
+
+    def query_matrix(self, value_lists: list):
+        """
+        query_bits para varias consultas a la vez: (matriz (consultas, palabras) de bitmasks,
+        arreglo booleano con True donde todos los valores de la consulta están en el vocabulario).
+        """
+        queries = [self.query_bits(values) for values in value_lists]
+        matrix = np.zeros((len(queries), self.bits.shape[1]), dtype=self.dtype)
+        for i, (query, _) in enumerate(queries):
+            matrix[i] = query
+        return matrix, np.array([known for _, known in queries], dtype=bool)
+
+    def any_of_batch(self, value_lists: list) -> np.ndarray:
+        """Matriz (consultas, filas): True si la fila contiene al menos uno de los valores de la consulta."""
+        queries, _ = self.query_matrix(value_lists)
+        return ((self.bits[None, :, :] & queries[:, None, :]) != 0).any(axis=2)
+
+    def all_of_batch(self, value_lists: list) -> np.ndarray:
+        """Matriz (consultas, filas): True si la fila contiene todos los valores de la consulta."""
+        queries, all_known = self.query_matrix(value_lists)
+        out = ((self.bits[None, :, :] & queries[:, None, :]) == queries[:, None, :]).all(axis=2)
+        out[~all_known] = False
+        return out
+
+    def count(self, values: list) -> np.ndarray:
+        """Número de 'values' que contiene cada fila (popcount de la intersección)."""
+        query, _ = self.query_bits(values)
+        inter = self.bits & query
+        as_bytes = inter.view(np.uint8).reshape(len(inter), inter.shape[1] * self.dtype.itemsize)
+        return np.unpackbits(as_bytes, axis=1).sum(axis=1)
+
+    def _set_bits(self, positions=None):
+        """(fila, columna del vocabulario) de cada bit encendido, por fila y columna; y el número de filas."""
+        bits = self.bits if positions is None else self.bits[positions]
+        as_bytes = bits.view(np.uint8).reshape(len(bits), bits.shape[1] * self.dtype.itemsize)
+        # solo se expanden los bytes distintos de cero (unparseable_subjects tiene un vocabulario grande)
+        rows, byte_cols = np.nonzero(as_bytes)
+        flags = np.unpackbits(as_bytes[rows, byte_cols][:, None], axis=1, bitorder="little")
+        hit, bit = np.nonzero(flags)
+        return rows[hit], byte_cols[hit] * 8 + bit, len(bits)
+
+    def decode(self, positions=None) -> list:
+        """Listas de las filas en 'positions' (todas si es None), en el orden del vocabulario."""
+        rows, cols, n_rows = self._set_bits(positions)
+        values = self.vocabulary.to_numpy()[cols].tolist()
+        bounds = np.searchsorted(rows, np.arange(n_rows + 1)).tolist()
+        return [values[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def postings(self) -> dict:
+        """valor -> posiciones ordenadas de las filas que lo contienen (solo valores presentes)."""
+        rows, cols, _ = self._set_bits()
+        vocab = self.vocabulary.to_numpy()
+        return {
+            vocab[col]: rows[idx].astype(np.int32)
+            for col, idx in pd.Series(cols).groupby(cols, sort=False).indices.items()
+        }
+
+    def memory_bytes(self) -> int:
+        return int(self.bits.nbytes)
+
+
+def _compact_column(series: pd.Series) -> pd.Series:
+    """Columna escalar del DataFrame limpio con el tipo más compacto que conserva sus valores."""
+    if series.dtype != object:
+        return series
+    non_null = series.dropna()
+    is_text = pd.api.types.infer_dtype(non_null, skipna=True) == "string"
+    if is_text and series.name not in CATEGORICAL_COLUMNS and non_null.nunique() > len(series) // 2:
+        return series.astype(ARROW_STRING)
+    try:
+        return series.astype("category")
+    except TypeError:
+        # valores no hasheables: se deja como object
+        return series
+
+
+class CompactApplicants:
+    """Tabla de postulantes limpios con tipos compactos (ver docstring del módulo)."""
+
+    def __init__(self, cleaned_applicants: pd.DataFrame):
+        """
+        Args:
+            cleaned_applicants (pd.DataFrame): salida de utils.cleanup_applicants.
+        """
+        self.lists = {
+            col: BitsetColumn(cleaned_applicants[col], vocab)
+            for col, vocab in LIST_COLUMNS.items()
+            if col in cleaned_applicants.columns
+        }
+        scalar_cols = [c for c in cleaned_applicants.columns if c not in self.lists and c not in RAW_COLUMNS]
+        self.frame = pd.DataFrame(
+            {col: _compact_column(cleaned_applicants[col]) for col in scalar_cols},
+            index=cleaned_applicants.index,
+        )
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def index(self) -> pd.Index:
+        return self.frame.index
+
+    def rows(self, positions=None) -> pd.DataFrame:
+        """
+        Filas en 'positions' (todas si es None) como DataFrame de tipo object, igual que la salida
+        de cleanup_applicants pero sin RAW_COLUMNS y con las listas en el orden del vocabulario.
+        Los nulos de los textos quedan como NaN.
+        """
+        frame = self.frame if positions is None else self.frame.iloc[positions]
+        out = pd.DataFrame(
+            {
+                col: values if pd.api.types.is_numeric_dtype(values) else values.to_numpy(dtype=object, na_value=np.nan)
+                for col, values in frame.items()
+            },
+            index=frame.index,
+        )
+        for col, bitset in self.lists.items():
+            out[col] = bitset.decode(positions)
+        return out
+
+    def memory_bytes(self) -> int:
+        """Memoria de la tabla (categóricas, textos Arrow y bitmasks)."""
+        return int(self.frame.memory_usage(deep=True).sum()) + sum(b.memory_bytes() for b in self.lists.values())
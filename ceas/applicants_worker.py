@@ -0,0 +1,152 @@
+"""
+applicants_worker.py
+
+Proceso aparte que limpia la hoja Applicants y publica CleanApplicants, fuera del login de la app.
+
+Antes, clean_applicants() (app_reemplazos_v2.py) limpiaba a todos los postulantes y reescribía
+CleanApplicants durante el inicio de sesión. Ahora este worker:
+  - lee Applicants y calcula su huella (hash de todas las filas),
+  - si cambió desde la última vez (o si cambió el año, por anios_egreso), limpia solo las filas
+    nuevas o modificadas (utils.create_clean_applicants_sheet) y actualiza la hoja CleanApplicants,
+  - guarda un snapshot local (INTERIM_DATA_DIR/clean_applicants_snapshot.pkl) con el resultado.
+
+La app solo lee el último resultado (load_latest_clean_applicants): el snapshot local si existe,
+o si no la hoja CleanApplicants. Solo si no hay ninguno limpia en el login, como antes.
+
+Uso:
+    python -m ceas.applicants_worker --once        # una pasada (p.ej. desde cron)
+    python -m ceas.applicants_worker --interval 300  # revisa cambios cada 5 minutos
+"""
+
+import datetime
+import hashlib
+import os
+import pickle
+import time
+
+import pandas as pd
+import streamlit as st
+import typer
+from loguru import logger
+
+from ceas import config as cfg
+from ceas.clean_cache import row_hashes
+from ceas.connections_manager import get_pooled_connection
+from ceas.persistence import dump_pickle_atomic
+from ceas.serialize_data import deserialize_clean_applicants
+from ceas.sheets_manager import read_worksheets
+from ceas.utils import create_clean_applicants_sheet
+
+SNAPSHOT_PATH = cfg.INTERIM_DATA_DIR / "clean_applicants_snapshot.pkl"
+APP_NAME = "appReemplazos"
+
+app = typer.Typer()
+
+
+def source_fingerprint(df_applicants: pd.DataFrame) -> str:
+    """Huella de la hoja Applicants: cambia si se agrega, modifica o borra cualquier fila."""
+    digest = hashlib.sha1(row_hashes(df_applicants).to_numpy().tobytes())
+    digest.update(repr(list(df_applicants.columns)).encode())
+    return digest.hexdigest()
+
+
+def save_snapshot(cleaned: pd.DataFrame, fingerprint: str, path=SNAPSHOT_PATH) -> None:
+    """Guarda los postulantes limpios y la huella de Applicants de la que salieron."""
+    dump_pickle_atomic(
+        {"source_fingerprint": fingerprint, "created_at": datetime.datetime.now(), "cleaned": cleaned},
+        path,
+    )
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """Último snapshot guardado por el worker ({"source_fingerprint", "created_at", "cleaned"}), o None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"[applicants_worker] No se pudo leer el snapshot: {e}")
+        return None
+
+
+def load_latest_clean_applicants(df_applicants: pd.DataFrame = None):
+    """
+    Postulantes limpios más recientes, sin limpiar nada: el snapshot local del worker o,
+    si no existe, la hoja CleanApplicants deserializada. Retorna None si no hay ninguno.
+
+    Si se entrega 'df_applicants' y el snapshot es de otra versión de Applicants, se avisa en el log
+    (el worker lo actualizará en su próxima pasada).
+    """
+    snapshot = load_snapshot()
+    if snapshot is not None:
+        if df_applicants is not None and snapshot["source_fingerprint"] != source_fingerprint(df_applicants):
+            print(f"[applicants_worker] El snapshot ({snapshot['created_at']:%Y-%m-%d %H:%M}) es de una versión anterior de Applicants")
+        return snapshot["cleaned"]
+    conn = get_pooled_connection()
+    worksheet = st.session_state["app_name"] + "CleanApplicants"
+    df_clean = read_worksheets(conn, [worksheet])[worksheet]
+    if df_clean.empty:
+        return None
+    return deserialize_clean_applicants(df_clean)
+
+
+def _init_worker_state(fake_data: bool) -> None:
+    """Claves de session_state que usan las funciones de ceas fuera de la app (modo bare de Streamlit)."""
+    st.session_state["app_name"] = APP_NAME
+    st.session_state["connections"] = (
+        ["bd_reemplazos1_fake", "bd_reemplazos2_fake"] if fake_data else ["bd_reemplazos1", "bd_reemplazos2"]
+    )
+
+
+def clean_once(force: bool = False) -> bool:
+    """
+    Una pasada del worker. Retorna True si se publicó un CleanApplicants nuevo,
+    False si Applicants no cambió desde el último snapshot. Lanza la excepción si no se pudo
+    escribir CleanApplicants (el snapshot queda como estaba).
+    """
+    conn = get_pooled_connection(ttl=0)
+    worksheet = st.session_state["app_name"] + "Applicants"
+    df_applicants = read_worksheets(conn, [worksheet])[worksheet]
+    fingerprint = source_fingerprint(df_applicants)
+    snapshot = load_snapshot()
+    if (
+        not force
+        and snapshot is not None
+        and snapshot["source_fingerprint"] == fingerprint
+        and snapshot["created_at"].year == datetime.date.today().year
+    ):
+        logger.info("Applicants sin cambios; no hay nada que limpiar.")
+        return False
+    t0 = time.perf_counter()
+    # si falla la escritura de CleanApplicants se propaga el error y no se guarda el snapshot,
+    # así la próxima pasada vuelve a intentarlo
+    cleaned, _ = create_clean_applicants_sheet(df_applicants, write_to_gsheet=True, raise_errors=True)
+    save_snapshot(cleaned, fingerprint)
+    logger.success(f"{len(cleaned)} postulantes limpios publicados en {time.perf_counter() - t0:.1f}s")
+    return True
+
+
+@app.command()
+def main(
+    once: bool = typer.Option(False, help="Hacer una sola pasada y salir."),
+    interval: int = typer.Option(300, help="Segundos entre revisiones de Applicants."),
+    force: bool = typer.Option(False, help="Limpiar y publicar aunque Applicants no haya cambiado."),
+    fake_data: bool = typer.Option(False, help="Usar las conexiones de datos falsos."),
+):
+    _init_worker_state(fake_data)
+    while True:
+        try:
+            clean_once(force=force)
+        except Exception as e:
+            logger.error(f"Error al limpiar postulantes: {e}")
+            if once:
+                raise typer.Exit(code=1)
+        if once:
+            break
+        force = False
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,84 @@
+"""
+benchmark_cleanup.py
+
+Benchmark de utils.cleanup_applicants sobre una hoja Applicants sintética.
+
+Genera 'n_rows' postulantes con el formato crudo de la hoja (teléfonos en distintos formatos,
+fechas dd/mm/YYYY, días/asignaturas/niveles separados por comas, algunos valores inválidos y
+duplicados por email/rut), hace una pasada de calentamiento, limpia 'repeats' veces y reporta el
+mejor tiempo. Termina con código 1 si el mejor tiempo supera 'max_seconds' (por defecto 0.6 s para
+50k filas, ~30% sobre lo que toma hoy), para usarlo como verificación (make benchmark-cleanup).
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import typer
+from loguru import logger
+
+from ceas import config as cfg
+from ceas.utils import cleanup_applicants
+
+app = typer.Typer()
+
+
+def fake_raw_applicants(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Hoja Applicants sintética (valores crudos, como llegan del formulario)."""
+    rng = np.random.default_rng(seed)
+    subjects = sorted(cfg.ALLOWED_SUBJECTS) + [cfg.SPECIAL_SUBJECT, "Otra asignatura"]
+    levels = list(cfg.ED_MAPPING.keys()) + ["Otro nivel"]
+    days = list(cfg.DAY_MAP.keys())
+
+    def joined(options, max_items):
+        picks = [rng.choice(options, size=rng.integers(0, max_items + 1), replace=False) for _ in range(n_rows)]
+        return [", ".join(p) for p in picks]
+
+    phones = np.array(["+56 9 1234 5678", "912345678", "12345678", "56912345678", "sin teléfono", ""], dtype=object)
+    dates = np.array(["10/06/2015", "1/3/2008", "31/12/2030", "01/01/1900", "no sé", ""], dtype=object)
+    ids = np.arange(n_rows)
+    return pd.DataFrame(
+        {
+            # ~2% de emails y ruts repetidos
+            "email": [f" Postulante{i % int(n_rows * 0.98 + 1)}@Correo.cl" for i in ids],
+            "rut": np.where(rng.random(n_rows) < 0.1, "", [f"{10_000_000 + i % int(n_rows * 0.99 + 1)}-k" for i in ids]),
+            "first_name": [f"Nombre{i}" for i in ids],
+            "last_name": "Apellido",
+            "phone": rng.choice(phones, size=n_rows),
+            "undergrad_year": rng.choice(dates, size=n_rows),
+            "available_days": joined(days, 5),
+            "subjects": joined(subjects, 3),
+            "ed_licence_level": joined(levels, 2),
+            "genero": rng.choice(["Masculino", "Femenino"], size=n_rows),
+            "comuna_residencia": rng.choice(["Santiago", "Ñuñoa", "Providencia", "Maipú"], size=n_rows),
+            "university": rng.choice(["Universidad de Chile", "PUC", "USACH"], size=n_rows),
+        }
+    )
+
+
+@app.command()
+def main(
+    n_rows: int = typer.Option(50_000, help="Número de postulantes sintéticos."),
+    repeats: int = typer.Option(5, help="Repeticiones (se reporta la mejor)."),
+    max_seconds: float = typer.Option(0.6, help="Tiempo máximo aceptable para limpiar 'n_rows' filas."),
+    seed: int = typer.Option(0, help="Semilla de los datos sintéticos."),
+):
+    df = fake_raw_applicants(n_rows, seed=seed)
+    logger.info(f"Limpiando {n_rows} postulantes sintéticos ({repeats} repeticiones)...")
+    # una pasada sin medir: la primera incluye la carga de los kernels de pyarrow y de las regex
+    cleanup_applicants(df)
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        cleaned = cleanup_applicants(df)
+        times.append(time.perf_counter() - t0)
+    best = min(times)
+    logger.info(f"{len(cleaned)} postulantes limpios; mejor: {best:.3f}s, mediana: {np.median(times):.3f}s, {n_rows / best:,.0f} filas/s")
+    if best > max_seconds:
+        logger.error(f"cleanup_applicants tardó {best:.3f}s (máximo {max_seconds:.3f}s)")
+        raise typer.Exit(code=1)
+    logger.success("OK")
+
+
+if __name__ == "__main__":
+    app()
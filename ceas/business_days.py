@@ -0,0 +1,157 @@
+"""
+business_days.py
+
+Calendario de días hábiles de Chile (lunes a viernes, sin feriados), precalculado.
+
+utils.get_days_between_dates construía holidays.country_holidays("CL", ...) y un pd.date_range en
+cada llamada, y filtraba los días comparando strftime("%A") de cada fecha con los nombres en
+español; process_requests_from_gsheet la llamaba una vez por fila del formulario. Aquí los días
+hábiles de varios años se guardan una sola vez en un arreglo ordenado de datetime64[D] (con su día
+de la semana, 0 = lunes), de modo que:
+  - un rango [inicio, fin] son dos searchsorted sobre el arreglo, y
+  - el filtro por días de la semana es una máscara de bits (bit w = día w) sobre esos días.
+days_between_many hace lo mismo para muchos rangos en una sola pasada vectorizada (importación
+de solicitudes del formulario).
+
+Si se consulta una fecha fuera de los años cubiertos, el calendario se extiende automáticamente
+(entre MIN_YEAR y MAX_YEAR). Las fechas nulas (NaT) no se aceptan en days_between y no tienen
+días en days_between_many.
+"""
+
+import datetime
+import threading
+
+import holidays
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from ceas import config as cfg
+
+# nombres en español de lunes a viernes, en orden (0 = lunes)
+WEEKDAY_NAMES = list(cfg.DAY_MAP.values())
+WEEKDAY_INDEX = {name: i for i, name in enumerate(WEEKDAY_NAMES)}
+# máscara de lunes a viernes (días por defecto)
+ALL_WEEKDAYS_MASK = (1 << len(WEEKDAY_NAMES)) - 1
+# años cubiertos alrededor del año actual al crear el calendario
+YEARS_BEFORE = 3
+YEARS_AFTER = 5
+# límites de la extensión automática: fechas fuera de este rango no tienen días hábiles
+MIN_YEAR = 1990
+MAX_YEAR = 2100
+
+
+def weekday_mask(days_of_the_week=None) -> int:
+    """Máscara de bits de una lista de nombres en español ("Lunes", ...); None = lunes a viernes."""
+    if days_of_the_week is None:
+        return ALL_WEEKDAYS_MASK
+    mask = 0
+    for name in days_of_the_week:
+        if name in WEEKDAY_INDEX:
+            mask |= 1 << WEEKDAY_INDEX[name]
+    return mask
+
+
+def weekdays_of(days: np.ndarray) -> np.ndarray:
+    """Día de la semana (0 = lunes) de un arreglo datetime64[D]."""
+    # 1970-01-01 fue jueves => (días desde la época + 3) % 7 da 0 = lunes
+    return (days.astype("datetime64[D]").astype(np.int64) + 3) % 7
+
+
+def _to_day(value) -> np.datetime64:
+    """Fecha (str, date, datetime, Timestamp) => datetime64[D]."""
+    return np.datetime64(pd.Timestamp(value).date(), "D")
+
+
+class BusinessCalendar:
+    """Días hábiles de Chile entre first_year y last_year (inclusive), como datetime64[D] ordenado."""
+
+    def __init__(self, first_year: int = None, last_year: int = None):
+        this_year = datetime.date.today().year
+        self._lock = threading.Lock()
+        self._build(first_year or this_year - YEARS_BEFORE, last_year or this_year + YEARS_AFTER)
+
+    def _build(self, first_year: int, last_year: int) -> None:
+        ch_holidays = holidays.country_holidays("CL", years=range(first_year, last_year + 1), observed=True)
+        holiday_days = np.array(sorted(ch_holidays.keys()), dtype="datetime64[D]")
+        all_days = np.arange(f"{first_year}-01-01", f"{last_year + 1}-01-01", dtype="datetime64[D]")
+        weekdays = weekdays_of(all_days)
+        keep = (weekdays < 5) & ~np.isin(all_days, holiday_days)
+        # se reemplaza todo junto para que las consultas concurrentes vean un estado consistente
+        self._state = (first_year, last_year, all_days[keep], weekdays[keep].astype(np.int8))
+
+    def _ensure_years(self, first_year: int, last_year: int):
+        """
+        Estado (first_year, last_year, días, días de la semana) que cubre los años pedidos,
+        acotados a [MIN_YEAR, MAX_YEAR].
+        """
+        first_year = min(max(first_year, MIN_YEAR), MAX_YEAR)
+        last_year = min(max(last_year, MIN_YEAR), MAX_YEAR)
+        state = self._state
+        if first_year >= state[0] and last_year <= state[1]:
+            return state
+        with self._lock:
+            state = self._state
+            if first_year < state[0] or last_year > state[1]:
+                print(f"[business_days] Extendiendo calendario a {min(first_year, state[0])}-{max(last_year, state[1])}")
+                self._build(min(first_year, state[0]), max(last_year, state[1]))
+            return self._state
+
+    @property
+    def days(self) -> np.ndarray:
+        return self._state[2]
+
+    def days_between(self, start, end, days_of_the_week=None) -> np.ndarray:
+        """
+        Días hábiles entre 'start' y 'end' (inclusive) cuyo día de la semana está en 'days_of_the_week'.
+        Lanza ValueError si alguna de las fechas es nula.
+        """
+        if pd.isna(start) or pd.isna(end):
+            raise ValueError(f"Fechas inválidas: {start!r} - {end!r}")
+        start, end = _to_day(start), _to_day(end)
+        if end < start:
+            return np.array([], dtype="datetime64[D]")
+        _, _, days, weekdays = self._ensure_years(start.astype(object).year, end.astype(object).year)
+        lo, hi = np.searchsorted(days, [start, end + 1])
+        keep = (weekday_mask(days_of_the_week) >> weekdays[lo:hi]) & 1
+        return days[lo:hi][keep.astype(bool)]
+
+    def days_between_many(self, starts, ends, days_of_the_week_lists=None) -> list:
+        """
+        days_between para muchos rangos a la vez: starts[i], ends[i] y days_of_the_week_lists[i]
+        (None = lunes a viernes para todos). Retorna una lista de arreglos datetime64[D], uno por rango;
+        los rangos con alguna fecha nula (NaT) quedan sin días.
+        """
+        starts = pd.to_datetime(pd.Series(starts), errors="coerce").to_numpy().astype("datetime64[D]")
+        ends = pd.to_datetime(pd.Series(ends), errors="coerce").to_numpy().astype("datetime64[D]")
+        n = len(starts)
+        if n == 0:
+            return []
+        if days_of_the_week_lists is None:
+            masks = np.full(n, ALL_WEEKDAYS_MASK, dtype=np.int64)
+        else:
+            masks = np.array([weekday_mask(d) for d in days_of_the_week_lists], dtype=np.int64)
+        valid = ~np.isnat(starts) & ~np.isnat(ends)
+        if valid.any():
+            years = np.concatenate([starts[valid], ends[valid]]).astype("datetime64[Y]").astype(np.int64) + 1970
+            _, _, days, weekdays = self._ensure_years(int(years.min()), int(years.max()))
+        else:
+            _, _, days, weekdays = self._state
+
+        lo = np.where(valid, np.searchsorted(days, starts), 0)
+        hi = np.where(valid, np.maximum(np.searchsorted(days, ends + 1), lo), 0)
+        counts = hi - lo
+        # posiciones en 'days' de todos los rangos concatenados
+        row = np.repeat(np.arange(n), counts)
+        offsets = np.cumsum(counts) - counts
+        positions = lo[row] + np.arange(counts.sum()) - offsets[row]
+        keep = ((masks[row] >> weekdays[positions]) & 1).astype(bool)
+        selected = days[positions[keep]]
+        kept_counts = np.bincount(row[keep], minlength=n)
+        return np.split(selected, np.cumsum(kept_counts)[:-1])
+
+
+@st.cache_resource
+def get_business_calendar() -> BusinessCalendar:
+    """Calendario del proceso: los feriados y días hábiles se calculan una vez y los comparten todas las sesiones."""
+    return BusinessCalendar()
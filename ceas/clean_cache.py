@@ -0,0 +1,111 @@
+"""
+clean_cache.py
+
+Caché persistente de postulantes limpios, por fila.
+
+cleanup_applicants volvía a parsear toda la hoja Applicants (teléfonos, fechas, asignaturas,
+niveles) en cada inicio de sesión, aunque casi todas las filas fueran las mismas de la vez anterior.
+Aquí cada fila cruda se identifica por un hash de sus valores (row_hashes) y se guarda su versión
+limpia; en la siguiente limpieza solo se parsean las filas cuyo hash no está en el caché
+(nuevas o modificadas). Las filas que ya no existen se descartan al guardar.
+
+El caché también recuerda qué filas (hashes) hay escritas en la hoja CleanApplicants, para
+agregar solo las nuevas en vez de reescribir la hoja completa (ver utils.create_clean_applicants_sheet).
+
+Se guarda con pickle en INTERIM_DATA_DIR/clean_applicants_cache.pkl. Si cambian las columnas de
+Applicants o las reglas de limpieza (CLEAN_CACHE_VERSION), el caché se descarta completo.
+"""
+
+import os
+import pickle
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from ceas import config as cfg
+from ceas.persistence import dump_pickle_atomic
+
+# subir al cambiar las reglas de limpieza de utils.parse_applicant_rows (invalida el caché)
+CLEAN_CACHE_VERSION = 1
+
+
+def row_hashes(df: pd.DataFrame) -> pd.Series:
+    """Hash de 64 bits de cada fila de 'df' (valores como texto, sin el índice)."""
+    return pd.util.hash_pandas_object(df.astype(str), index=False)
+
+
+class CleanRowCache:
+    """
+    Filas limpias indexadas por el hash de la fila cruda, más los hashes escritos en CleanApplicants.
+
+    'schema' identifica el formato de las filas (columnas crudas, versión de las reglas y opciones
+    de limpieza); si no coincide con el guardado, el caché parte vacío.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or cfg.INTERIM_DATA_DIR / "clean_applicants_cache.pkl"
+        self._lock = threading.Lock()
+        self.schema = None
+        self.rows = None  # pd.DataFrame limpio, índice = hash de la fila cruda
+        self.written = None  # hashes escritos en la hoja CleanApplicants, en orden
+        self.written_year = None  # año en que se calcularon los anios_egreso escritos
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            self.schema = data["schema"]
+            self.rows = data["rows"]
+            self.written = data.get("written")
+            self.written_year = data.get("written_year")
+        except Exception as e:
+            print(f"[clean_cache] No se pudo leer el caché ({e}); se limpiará todo de nuevo")
+
+    def save(self) -> None:
+        """Guarda el caché en disco."""
+        with self._lock:
+            data = {
+                "schema": self.schema,
+                "rows": self.rows,
+                "written": self.written,
+                "written_year": self.written_year,
+            }
+        dump_pickle_atomic(data, self.path)
+
+    def lookup(self, schema, hashes: pd.Series) -> pd.DataFrame:
+        """
+        Filas limpias guardadas para 'hashes' (solo las que están; índice = hash).
+        Si 'schema' no coincide con el del caché, no retorna ninguna.
+        """
+        with self._lock:
+            if self.rows is None or self.schema != schema:
+                return pd.DataFrame()
+            found = self.rows.index.isin(hashes.to_numpy())
+            return self.rows[found]
+
+    def update(self, schema, hashes: pd.Series, cleaned: pd.DataFrame) -> None:
+        """Reemplaza el contenido por 'cleaned' (filas alineadas con 'hashes'); descarta las filas que ya no están."""
+        rows = cleaned.set_axis(hashes.to_numpy(), axis=0)
+        rows = rows[~rows.index.duplicated(keep="last")]
+        with self._lock:
+            if self.schema != schema:
+                self.written = None
+                self.written_year = None
+            self.schema = schema
+            self.rows = rows
+
+    def mark_written(self, hashes: list, year: int) -> None:
+        """Registra los hashes que quedaron escritos en CleanApplicants y el año de sus anios_egreso."""
+        with self._lock:
+            self.written = list(hashes)
+            self.written_year = year
+
+
+@st.cache_resource
+def get_clean_row_cache() -> CleanRowCache:
+    """Caché de filas limpias compartido por las sesiones del proceso; se lee del disco solo al crearlo."""
+    return CleanRowCache()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -22,6 +23,14 @@ FIGURES_DIR = REPORTS_DIR / "figures"
 # JINJA2 TEMPLATES DIR
 TEMPLATES_DIR = DATA_DIR / "jinja2_templates"
 
+# Espejo local en DuckDB de las hojas de la app (opcional, ver ceas/duckdb_mirror.py).
+# Se activa con la variable de entorno CEAS_DUCKDB_MIRROR=1
+DUCKDB_MIRROR_ENABLED = os.getenv("CEAS_DUCKDB_MIRROR", "0").lower() in ("1", "true", "yes")
+DUCKDB_MIRROR_PATH = Path(os.getenv("CEAS_DUCKDB_MIRROR_PATH", INTERIM_DATA_DIR / "ceas_mirror.duckdb"))
+
+# Cuota de requests por minuto de cada service account en la API de Sheets (ver ceas/rate_limit.py)
+SHEETS_QUOTA_PER_MINUTE = int(os.getenv("CEAS_SHEETS_QUOTA_PER_MINUTE", "60"))
+
 # gform_map.json is a json file that contains the mapping of columns in the google form to the columns in the data
 with open(PROJ_ROOT / "gform_map.json" ) as f:
     GFORM_MAP = json.load(f)
@@ -55,6 +64,10 @@ DAY_MAP = {
     "Thursday": "Jueves",
     "Friday": "Viernes"
 }
+# Estados válidos de una solicitud de reemplazo (utils.validate_request)
+REQUEST_STATUSES = ["creada", "aprobada", "rechazada", "finalizada"]
+# Estados de solicitud que ya no buscan candidatos (el resto se considera abierta)
+CLOSED_REQUEST_STATUSES = {"rechazada", "finalizada"}
 # Subject normalization: allowed subjects and special-case multi-comma subject
 ALLOWED_SUBJECTS = {
     "Artes Visuales",
@@ -1,12 +1,163 @@
-import streamlit as st
+"""
+connections_manager.py
+
+Pool de conexiones a Google Sheets (una por service account configurada en secrets).
+
+Cada service account tiene su propia cuota por minuto, así que elegir la conexión al azar
+reparte mal la carga y sigue usando una cuenta que ya está recibiendo errores 429.
+El pool (ConnectionPool, uno por proceso) lleva, por cada conexión:
+  - in_flight: requests HTTP en curso (todas las sesiones del proceso),
+  - los 429 recientes y, si se recibió uno, hasta cuándo queda "drenada" (no se entrega).
+y entrega la conexión sana con menos requests en curso.
+
+Las requests se cuentan envolviendo Client.request del cliente gspread de cada conexión,
+así que cubren conn.read, conn.update y las funciones de sheets_manager. El mismo envoltorio
+aplica el límite de requests por minuto y los reintentos de ceas.rate_limit.
+"""
+
 import random
+import threading
+import time
+from collections import deque
+
+import streamlit as st
+from streamlit_gsheets import GSheetsConnection
+
+from ceas.rate_limit import get_rate_limiter
+
+# ventana (segundos) en que un 429 cuenta como "reciente"
+RECENT_429_WINDOW = 60
+# segundos que se deja de entregar una conexión después de un 429 (se duplica con cada 429 reciente)
+DRAIN_SECONDS = 15
+MAX_DRAIN_SECONDS = 120
+
+
+def is_quota_error(error) -> bool:
+    """True si 'error' es un error de cuota de la API de Google (HTTP 429)."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+class ConnectionPool:
+    """Estado compartido de las conexiones, seguro entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}  # nombre -> requests en curso
+        self._recent_429 = {}  # nombre -> deque de time.monotonic() de los 429
+        self._drained_until = {}  # nombre -> time.monotonic() hasta el que no se entrega
+
+    def _recent_429_count(self, name: str, now: float) -> int:
+        recent = self._recent_429.setdefault(name, deque())
+        while recent and now - recent[0] > RECENT_429_WINDOW:
+            recent.popleft()
+        return len(recent)
+
+    def pick(self, names: list) -> str:
+        """
+        Retorna el nombre de la conexión sana (no drenada) con menos requests en curso
+        y menos 429 recientes; los empates se deciden al azar.
+        Si todas están drenadas, retorna la que se libera primero.
+        """
+        if not names:
+            raise ValueError("No hay conexiones configuradas.")
+        now = time.monotonic()
+        with self._lock:
+            healthy = [n for n in names if self._drained_until.get(n, 0) <= now]
+            if not healthy:
+                return min(names, key=lambda n: self._drained_until.get(n, 0))
+            return min(
+                healthy,
+                key=lambda n: (self._in_flight.get(n, 0), self._recent_429_count(n, now), random.random()),
+            )
+
+    def request_started(self, name: str) -> None:
+        with self._lock:
+            self._in_flight[name] = self._in_flight.get(name, 0) + 1
+
+    def request_finished(self, name: str, error=None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight[name] = max(0, self._in_flight.get(name, 0) - 1)
+            if error is not None and is_quota_error(error):
+                n_recent = self._recent_429_count(name, now) + 1
+                self._recent_429[name].append(now)
+                drain = min(DRAIN_SECONDS * 2 ** (n_recent - 1), MAX_DRAIN_SECONDS)
+                self._drained_until[name] = now + drain
+                print(f"[connections] {name}: 429 recibido, se drena por {drain}s")
+
+    def stats(self) -> dict:
+        """{nombre: {"in_flight", "recent_429", "drained_for"}} para diagnóstico."""
+        now = time.monotonic()
+        with self._lock:
+            names = set(self._in_flight) | set(self._recent_429) | set(self._drained_until)
+            return {
+                n: {
+                    "in_flight": self._in_flight.get(n, 0),
+                    "recent_429": self._recent_429_count(n, now),
+                    "drained_for": max(0.0, self._drained_until.get(n, 0) - now),
+                }
+                for n in sorted(names)
+            }
+
+    def track(self, name: str, conn):
+        """
+        Envuelve Client.request del cliente gspread de 'conn' para registrar cada request
+        en el pool y pasarla por el limitador de la service account (token bucket + reintentos).
+        Es idempotente (una conexión se envuelve una sola vez).
+        """
+        gspread_client = getattr(conn.client, "_client", None)
+        if gspread_client is None or getattr(gspread_client, "_pool_name", None) is not None:
+            return conn
+        original_request = gspread_client.request
+        pool = self
+        limiter = get_rate_limiter()
+
+        def single_attempt(*args, **kwargs):
+            pool.request_started(name)
+            try:
+                response = original_request(*args, **kwargs)
+            except Exception as e:
+                pool.request_finished(name, error=e)
+                raise
+            pool.request_finished(name)
+            return response
+
+        def tracked_request(*args, **kwargs):
+            return limiter.call_with_retry(name, single_attempt, *args, **kwargs)
+
+        gspread_client.request = tracked_request
+        gspread_client._pool_name = name
+        return conn
+
+
+@st.cache_resource
+def get_connection_pool() -> ConnectionPool:
+    """Pool del proceso: la carga y los 429 de cada service account se cuentan para todas las sesiones."""
+    return ConnectionPool()
+
+
+def get_pooled_connection(names_key: str = "connections", **kwargs):
+    """
+    Retorna la conexión (GSheetsConnection) menos cargada entre st.session_state[names_key].
+    kwargs se pasan a st.connection (p.ej. ttl, max_entries).
+    """
+    pool = get_connection_pool()
+    name = pool.pick(st.session_state[names_key])
+    conn = st.connection(name, type=GSheetsConnection, **kwargs)
+    return pool.track(name, conn)
+
+
+def pooled_connection_name(conn) -> str:
+    """Nombre (en secrets) de una conexión entregada por get_pooled_connection, o None."""
+    return getattr(getattr(conn.client, "_client", None), "_pool_name", None)
+
 
 def get_random_connection():
     try:
-    # elegir al azar una de las conexiones disponibles
-        rand_conn = random.choice(st.session_state["connections"])
+    # elegir la conexión menos cargada de las disponibles (ver ConnectionPool)
+        rand_conn = get_connection_pool().pick(st.session_state["connections"])
         return rand_conn
     except Exception as e:
         st.error(f"Error al obtener una conexión: {e}")
         return None
-    
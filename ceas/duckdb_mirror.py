@@ -0,0 +1,255 @@
+"""
+duckdb_mirror.py
+
+Espejo local (opcional) de la base de datos de Google Sheets en un archivo DuckDB.
+
+Las hojas Users, Schools, Requests, CleanApplicants, SentCVs y EmailLog se copian a tablas
+de DuckDB (config.DUCKDB_MIRROR_PATH) y los paneles pueden consultarlas con SQL en vez de
+recorrer copias de pandas. Google Sheets sigue siendo la fuente de verdad: las escrituras van
+a Sheets y el espejo se sincroniza después, comparando el token de versión de cada hoja en
+el caché compartido (shared_cache), así que una tabla solo se reescribe si su hoja cambió.
+
+Se activa con la variable de entorno CEAS_DUCKDB_MIRROR=1. Si duckdb no está instalado o
+el espejo está desactivado, get_mirror() retorna None y los llamadores usan pandas.
+"""
+
+from pathlib import Path
+import threading
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+from ceas import config as cfg
+from ceas.applicant_table import CompactApplicants
+from ceas.matching import parse_request_criteria
+from ceas.shared_cache import get_shared_cache
+
+try:
+    import duckdb
+except ModuleNotFoundError:
+    duckdb = None
+
+# hoja (sin el prefijo app_name) -> tabla en DuckDB
+MIRROR_TABLES = {
+    "Users": "users",
+    "Schools": "schools",
+    "Requests": "requests",
+    "CleanApplicants": "clean_applicants",
+    "SentCVs": "sent_cvs",
+    "EmailLog": "email_log",
+}
+
+# columnas indexadas por tabla (índices ART de DuckDB)
+MIRROR_INDEXES = {
+    "users": ["email"],
+    "schools": ["school_id"],
+    "requests": ["replacement_id"],
+    "clean_applicants": ["email"],
+    "sent_cvs": ["replacement_id"],
+}
+
+# columna con la posición de cada fila en el DataFrame original, para devolver las filas de pandas que calzan
+ROW_POS_COL = "_row_pos"
+
+# los tokens de versión del caché compartido se reinician con el proceso => se prefijan con un id de proceso
+_PROCESS_TOKEN = uuid.uuid4().hex[:8]
+
+
+def _prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deja el DataFrame en tipos que DuckDB entiende:
+      - columnas de listas (subjects, available_days, ...) -> listas (nulos -> lista vacía) => VARCHAR[]
+      - otras columnas object con tipos mezclados -> str (los nulos se mantienen)
+    y agrega ROW_POS_COL con la posición de cada fila.
+    """
+    out = df.copy()
+    for col in out.columns:
+        if out[col].dtype != object:
+            continue
+        non_null = out[col].dropna()
+        if len(non_null) and non_null.map(lambda v: isinstance(v, (list, tuple, set))).all():
+            out[col] = out[col].map(
+                lambda v: [str(x) for x in v] if isinstance(v, (list, tuple, set)) else []
+            )
+        else:
+            out[col] = out[col].where(out[col].isna(), out[col].astype(str))
+    out.columns = [str(c) for c in out.columns]
+    out = out.reset_index(drop=True)
+    out[ROW_POS_COL] = range(len(out))
+    return out
+
+
+class DuckDBMirror:
+    """
+    Archivo DuckDB con una tabla por hoja y una tabla _sync_versions con la versión sincronizada.
+    Una sola conexión por proceso, protegida con un lock (las sesiones de Streamlit son threads).
+    """
+
+    def __init__(self, path=None):
+        path = path or cfg.DUCKDB_MIRROR_PATH
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._con = duckdb.connect(str(path))
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS _sync_versions ("
+            "table_name VARCHAR PRIMARY KEY, version VARCHAR, n_rows BIGINT, synced_at TIMESTAMP)"
+        )
+        # table -> (id, largo) del DataFrame sincronizado (para saber si una copia de pandas es la misma)
+        self._frame_ids = {}
+
+    def synced_version(self, table: str):
+        """Versión con la que se sincronizó 'table' (None si nunca)."""
+        with self._lock:
+            row = self._con.execute(
+                "SELECT version FROM _sync_versions WHERE table_name = ?", [table]
+            ).fetchone()
+        return row[0] if row else None
+
+    def sync_table(self, table: str, df, version=None) -> bool:
+        """
+        Reemplaza 'table' con el contenido de 'df' (DataFrame o CompactApplicants), salvo que ya
+        esté sincronizada con 'version'. Las filas de una CompactApplicants se arman solo al reescribir.
+
+        Returns:
+            bool: True si se reescribió la tabla.
+        """
+        if df is None:
+            return False
+        version = None if version is None else f"{_PROCESS_TOKEN}:{version}"
+        if version is not None and version == self.synced_version(table):
+            self._frame_ids[table] = (id(df), len(df))
+            return False
+        prepared = _prepare_frame(df.rows() if isinstance(df, CompactApplicants) else df)
+        with self._lock:
+            self._con.execute("BEGIN TRANSACTION")
+            try:
+                self._con.register("_incoming", prepared)
+                self._con.execute(f'CREATE OR REPLACE TABLE "{table}" AS SELECT * FROM _incoming')
+                self._con.unregister("_incoming")
+                for col in MIRROR_INDEXES.get(table, []):
+                    if col in prepared.columns:
+                        self._con.execute(f'CREATE INDEX "idx_{table}_{col}" ON "{table}" ("{col}")')
+                self._con.execute(
+                    "INSERT OR REPLACE INTO _sync_versions VALUES (?, ?, ?, current_timestamp)",
+                    [table, version, len(prepared)],
+                )
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+        self._frame_ids[table] = (id(df), len(df))
+        print(f"[duckdb_mirror] {table}: {len(prepared)} filas sincronizadas")
+        return True
+
+    def is_synced_with(self, table: str, df) -> bool:
+        """True si 'df' es el mismo DataFrame (o CompactApplicants) con que se sincronizó 'table'."""
+        return self._frame_ids.get(table) == (id(df), len(df))
+
+    def query(self, sql: str, params: list = None) -> pd.DataFrame:
+        """Ejecuta una consulta SQL sobre el espejo y retorna un DataFrame."""
+        with self._lock:
+            return self._con.execute(sql, params or []).df()
+
+    def match_applicant_rows(self, request: dict) -> list:
+        """
+        Versión SQL de utils.filter_applicants_by_request sobre la tabla clean_applicants.
+        Usa los mismos criterios (ver esa función) y retorna las posiciones de las filas
+        que calzan, en el mismo orden del DataFrame.
+        """
+        crit = parse_request_criteria(request)
+        where, params = [], []
+        if crit["genero"] is not None:
+            where.append("genero = ?")
+            params.append(crit["genero"])
+        if crit["levels"]:
+            where.append("list_has_any(ed_licence_level, ?::VARCHAR[])")
+            params.append(crit["levels"])
+        if crit["subjects"]:
+            where.append("list_has_any(subjects, ?::VARCHAR[])")
+            params.append(crit["subjects"])
+        if crit["days"]:
+            if crit["days_mode"] == "all":
+                where.append("list_has_all(available_days, ?::VARCHAR[])")
+            else:
+                where.append("list_has_any(available_days, ?::VARCHAR[])")
+            params.append(crit["days"])
+        if crit["min_anios_egreso"] > 0:
+            where.append("anios_egreso >= ?")
+            params.append(crit["min_anios_egreso"])
+
+        sql = f"SELECT {ROW_POS_COL} FROM clean_applicants"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {ROW_POS_COL}"
+        with self._lock:
+            return [row[0] for row in self._con.execute(sql, params).fetchall()]
+
+
+@st.cache_resource
+def _get_mirror_resource():
+    """Espejo DuckDB del proceso; abre la base local una sola vez y la comparten todas las sesiones."""
+    return DuckDBMirror()
+
+
+def get_mirror():
+    """
+    Retorna el espejo DuckDB del proceso, o None si está desactivado (CEAS_DUCKDB_MIRROR)
+    o si duckdb no está instalado.
+    """
+    if not cfg.DUCKDB_MIRROR_ENABLED or duckdb is None:
+        return None
+    try:
+        return _get_mirror_resource()
+    except Exception as e:
+        print(f"[duckdb_mirror] No se pudo abrir el espejo: {e}")
+        return None
+
+
+def sync_mirror(dfs: dict, extra: dict = None) -> None:
+    """
+    Sincroniza el espejo con los DataFrames de la sesión (st.session_state['dfs'], keys simplificadas).
+    Solo se reescriben las tablas cuya hoja cambió de versión en el caché compartido.
+
+    Args:
+        dfs (dict): {key simplificada: DataFrame}, p.ej. {"users": df}; "cleaned_applicants" es una CompactApplicants.
+        extra (dict): hojas que no están en dfs, p.ej. {"SentCVs": df}.
+    """
+    mirror = get_mirror()
+    if mirror is None:
+        return
+    cache = get_shared_cache()
+    app_name = st.session_state["app_name"]
+    frames = {}
+    for sheet, table in MIRROR_TABLES.items():
+        if sheet == "CleanApplicants":
+            frames[table] = (dfs.get("cleaned_applicants"), cache.version("cleaned_applicants"))
+        elif sheet.lower() in dfs:
+            frames[table] = (dfs[sheet.lower()], cache.version(app_name + sheet))
+    for sheet, df in (extra or {}).items():
+        # hojas leídas fuera del caché compartido: sin versión => se reescriben siempre
+        frames[MIRROR_TABLES[sheet]] = (df, None)
+    for table, (df, version) in frames.items():
+        try:
+            mirror.sync_table(table, df, version=version or None)
+        except Exception as e:
+            print(f"[duckdb_mirror] No se pudo sincronizar {table}: {e}")
+
+
+def filter_applicants(request: dict, cleaned_applicants: CompactApplicants) -> pd.DataFrame:
+    """
+    Filtra los postulantes según 'request'. Si el espejo está activo y sincronizado con
+    'cleaned_applicants', el filtro se hace en SQL; si no, con utils.filter_applicants_by_request.
+    """
+    # import local: ceas.utils importa refresh, que importa este módulo
+    from ceas.utils import filter_applicants_by_request
+
+    mirror = get_mirror()
+    if mirror is not None and mirror.is_synced_with("clean_applicants", cleaned_applicants):
+        try:
+            return cleaned_applicants.rows(mirror.match_applicant_rows(request))
+        except Exception as e:
+            print(f"[duckdb_mirror] Error en la consulta, se usa pandas: {e}")
+    return filter_applicants_by_request(request, cleaned_applicants)
@@ -0,0 +1,192 @@
+"""
+gform_ingest.py
+
+Ingesta incremental de las respuestas del Google Form de solicitudes ("Respuestas de formulario 3").
+
+Antes, check_new_gform_requests (login) e importar_nuevas_solicitudes leían la hoja de respuestas
+completa y volvían a limpiar todas las filas con process_requests_from_gsheet, aunque solo
+hubiera una respuesta nueva. La hoja del formulario solo recibe filas al final, así que aquí se
+guarda una marca de agua (watermark) con la última fila ya procesada:
+  - last_row: número de la última fila (1-based, con encabezado) ya leída y limpiada,
+  - last_marker: valor de la primera columna (marca temporal) de esa fila, para verificar que la
+    hoja no se editó ni se borraron filas; si no coincide se vuelve a procesar todo,
+  - pending: filas ya limpiadas que aún no están importadas en Requests.
+En cada sincronización (sync_gform_requests) se leen solo las filas desde last_row
+(sheets_manager.read_rows_from), se limpian solo las nuevas y se cruzan, junto con las pendientes,
+con las solicitudes ya importadas.
+
+El cruce es un anti-join de llaves hash (utils.gform_request_keys). Las llaves de las solicitudes
+ya importadas también se guardan (existing_keys), junto con cuántas filas de Requests cubren y el
+replacement_id de la última; como Requests solo recibe filas al final, en cada sincronización se
+calculan solo las llaves de las filas nuevas. Si la última fila cubierta cambió, se recalculan todas.
+
+Se guarda con pickle en INTERIM_DATA_DIR/gform_ingest_state.pkl. Si cambia la hoja del formulario
+o las reglas de limpieza (GFORM_INGEST_VERSION), se parte desde cero.
+"""
+
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from ceas import config as cfg
+from ceas.persistence import dump_pickle_atomic
+from ceas.schools_manager import get_school_index
+from ceas.sheets_manager import read_rows_from
+from ceas.utils import (
+    existing_gform_request_keys,
+    find_unprocessed_gform_requests,
+    get_gform_solicitudes_conn,
+    process_requests_from_gsheet,
+)
+
+# subir al cambiar utils.process_requests_from_gsheet o utils.gform_request_keys (invalida el estado guardado)
+GFORM_INGEST_VERSION = 2
+
+
+class GFormIngestState:
+    """Marca de agua de la hoja de respuestas del GForm y filas limpias pendientes de importar."""
+
+    def __init__(self, path=None):
+        self.path = path or cfg.INTERIM_DATA_DIR / "gform_ingest_state.pkl"
+        self.lock = threading.Lock()
+        self.reset()
+        self.reset_existing()
+        self._load()
+
+    def reset(self, sheet_name: str = None) -> None:
+        """Vuelve al inicio de la hoja (sin filas procesadas)."""
+        self.sheet_name = sheet_name
+        self.last_row = 1
+        self.last_marker = None
+        self.pending = pd.DataFrame()
+
+    def reset_existing(self) -> None:
+        """Descarta el índice de llaves de las solicitudes ya importadas."""
+        self.existing_keys = np.array([], dtype=np.uint64)
+        self.existing_rows = 0
+        self.existing_last_id = None
+
+    def existing_keys_for(self, df_requests: pd.DataFrame) -> np.ndarray:
+        """
+        Llaves de las solicitudes GForm de 'df_requests', calculando solo las de las filas agregadas
+        desde la última vez (o todas, si la última fila cubierta ya no es la misma).
+        """
+        covered = self.existing_rows
+        if (
+            covered == 0
+            or len(df_requests) < covered
+            or "replacement_id" not in df_requests.columns
+            or str(df_requests["replacement_id"].iloc[covered - 1]) != self.existing_last_id
+        ):
+            self.reset_existing()
+            covered = 0
+        new_rows = df_requests.iloc[covered:]
+        if not new_rows.empty:
+            self.existing_keys = np.union1d(self.existing_keys, existing_gform_request_keys(new_rows))
+        self.existing_rows = len(df_requests)
+        if not df_requests.empty and "replacement_id" in df_requests.columns:
+            self.existing_last_id = str(df_requests["replacement_id"].iloc[-1])
+        return self.existing_keys
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") != GFORM_INGEST_VERSION:
+                return
+            self.sheet_name = data["sheet_name"]
+            self.last_row = data["last_row"]
+            self.last_marker = data["last_marker"]
+            self.pending = data["pending"]
+            self.existing_keys = data["existing_keys"]
+            self.existing_rows = data["existing_rows"]
+            self.existing_last_id = data["existing_last_id"]
+        except Exception as e:
+            print(f"[gform_ingest] No se pudo leer la marca de agua ({e}); se procesará toda la hoja")
+            self.reset()
+            self.reset_existing()
+
+    def save(self) -> None:
+        """Guarda el estado en disco."""
+        data = {
+            "version": GFORM_INGEST_VERSION,
+            "sheet_name": self.sheet_name,
+            "last_row": self.last_row,
+            "last_marker": self.last_marker,
+            "pending": self.pending,
+            "existing_keys": self.existing_keys,
+            "existing_rows": self.existing_rows,
+            "existing_last_id": self.existing_last_id,
+        }
+        dump_pickle_atomic(data, self.path)
+
+
+@st.cache_resource
+def get_gform_ingest_state() -> GFormIngestState:
+    """
+    Estado de ingesta compartido por las sesiones del proceso, para que todas avancen la misma
+    marca de agua (sync_gform_requests lo usa bajo state.lock).
+    """
+    return GFormIngestState()
+
+
+def _read_new_rows(conn, sheet_name: str, state: GFormIngestState) -> pd.DataFrame:
+    """
+    Filas crudas posteriores a state.last_row. Si la fila de la marca de agua ya no coincide
+    (hoja editada, filas borradas o hoja distinta), reinicia el estado y retorna la hoja completa.
+    """
+    if state.sheet_name == sheet_name and state.last_row > 1:
+        raw, _ = read_rows_from(conn, sheet_name, state.last_row)
+        watermark_idx = state.last_row - 2
+        if watermark_idx in raw.index and str(raw.loc[watermark_idx].iloc[0]) == state.last_marker:
+            return raw.loc[raw.index > watermark_idx]
+        print(f"[gform_ingest] La fila {state.last_row} de '{sheet_name}' cambió; se procesa la hoja completa")
+    state.reset(sheet_name)
+    raw, _ = read_rows_from(conn, sheet_name, 2)
+    return raw
+
+
+def sync_gform_requests(df_requests: pd.DataFrame, full: bool = False) -> pd.DataFrame:
+    """
+    Solicitudes del GForm (limpias, como get_preprocessed_gform_requests) que aún no están en
+    'df_requests', leyendo y limpiando solo las respuestas agregadas desde la última sincronización.
+
+    Args:
+        df_requests (pd.DataFrame): hoja Requests (solicitudes ya importadas).
+        full (bool): ignorar la marca de agua y procesar la hoja completa.
+
+    Returns:
+        pd.DataFrame: filas del GForm sin importar (vacío si no hay).
+    """
+    state = get_gform_ingest_state()
+    sheet_name = st.session_state["solicitudes_gform_sheet_name"]
+    conn = get_gform_solicitudes_conn()
+    if conn is None:
+        return pd.DataFrame()
+    with state.lock:
+        if full:
+            state.reset(sheet_name)
+            state.reset_existing()
+        raw = _read_new_rows(conn, sheet_name, state)
+        new_requests = process_requests_from_gsheet(raw) if not raw.empty else pd.DataFrame()
+        candidates = pd.concat([state.pending, new_requests], ignore_index=True)
+        if not candidates.empty:
+            # el school_id de las pendientes se recalcula por si cambió la hoja Schools
+            candidates["school_id"] = get_school_index().ids_for(candidates["school_name"])
+            existing_keys = state.existing_keys_for(df_requests)
+            candidates = find_unprocessed_gform_requests(
+                candidates, df_requests, existing_keys=existing_keys
+            ).reset_index(drop=True)
+        if not raw.empty:
+            state.last_row = int(raw.index.max()) + 2
+            state.last_marker = str(raw.iloc[-1, 0])
+        state.pending = candidates
+        state.save()
+        print(f"[gform_ingest] {len(raw)} respuestas nuevas leídas (hasta la fila {state.last_row}); {len(candidates)} sin importar")
+        return candidates.copy()
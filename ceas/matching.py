@@ -0,0 +1,364 @@
+"""
+matching.py
+
+Motor de filtrado de postulantes vectorizado.
+
+utils.filter_applicants_by_request filtraba con lambdas por fila sobre columnas de listas
+(ed_licence_level, subjects, available_days), recorriendo a todos los postulantes en Python
+en cada rerun del panel. Aquí se lee la tabla compacta de postulantes
+(applicant_table.CompactApplicants), donde esas columnas ya son bitmasks, y cada criterio es una
+operación de máscaras de NumPy; solo las filas que calzan se arman como DataFrame (CompactApplicants.rows).
+
+match_requests cruza de una vez todas las solicitudes abiertas con todos los postulantes
+(matriz solicitudes x postulantes) y entrega los candidatos de cada una en formato disperso.
+
+El codificador (ApplicantMatcher) y el índice invertido (ApplicantIndex, para los filtros
+del modo manual) se construyen una vez por tabla de postulantes y se reutilizan
+mientras sea el mismo objeto (get_matcher, get_applicant_index).
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ceas import config as cfg
+from ceas.applicant_table import BitsetColumn, CompactApplicants
+
+# niveles que exigen filtrar por asignatura (ver utils.filter_applicants_by_request)
+LEVELS_REQUIRING_SUBJECT = {"Básica Generalista", "Básica con Mención", "Media", "Técnico Profesional"}
+
+# pesos del puntaje de relevancia (ApplicantMatcher.score); suman 1
+SCORE_WEIGHTS = {
+    "subjects": 0.4,  # fracción de las asignaturas pedidas que el postulante cubre
+    "days": 0.3,  # fracción de los días pedidos en que está disponible
+    "experience": 0.2,  # años de egreso, con tope EXPERIENCE_CAP_YEARS
+    "comuna": 0.1,  # vive en la comuna del colegio
+}
+EXPERIENCE_CAP_YEARS = 10
+# solicitudes por bloque en el cruce masivo (acota la memoria de las matrices solicitudes x postulantes)
+BATCH_CHUNK_SIZE = 64
+
+
+def parse_request_criteria(request: dict) -> dict:
+    """
+    Traduce un 'request' (ver utils.filter_applicants_by_request) a criterios de filtrado:
+      - genero: str o None (None = sin filtro)
+      - levels: lista de niveles (al menos uno)
+      - subjects: lista de asignaturas (al menos una; vacía = sin filtro)
+      - days: lista de días; days_mode: "all" (Completa) o "any" (Parcial)
+      - min_anios_egreso: mínimo de años de egreso (0 = sin filtro)
+    """
+    genero = request.get("genero", "Indiferente")
+    levels = list(dict.fromkeys(request.get("nivel_educativo", [])))
+
+    subjects = []
+    if set(levels).intersection(LEVELS_REQUIRING_SUBJECT):
+        asig_val = request.get("asignatura", {})
+        if isinstance(asig_val, dict):
+            for _, arr in asig_val.items():
+                subjects.extend(arr)
+        elif isinstance(asig_val, list):
+            subjects = list(asig_val)
+        subjects = list(dict.fromkeys(subjects))
+
+    return {
+        "genero": None if genero == "Indiferente" else genero,
+        "levels": levels,
+        "subjects": subjects,
+        "days": list(dict.fromkeys(request.get("dias_de_la_semana", []))),
+        "days_mode": "all" if request.get("disponibilidad", "Parcial") == "Completa" else "any",
+        "min_anios_egreso": request.get("anios_egreso", 0) or 0,
+    }
+
+
+class ApplicantMatcher:
+    """
+    Columnas de filtrado de los postulantes limpios, tomadas de su tabla compacta
+    (applicant_table.CompactApplicants): bitmasks para las listas y categóricas para genero.
+    """
+
+    def __init__(self, table: CompactApplicants):
+        self.n = len(table)
+        empty = BitsetColumn([[]] * self.n)
+        self.genero = (
+            table.frame["genero"] if "genero" in table.frame.columns else pd.Series(None, index=table.index, dtype=object)
+        )
+        self.levels = table.lists.get("ed_licence_level", empty)
+        self.subjects = table.lists.get("subjects", empty)
+        self.days = table.lists.get("available_days", empty)
+        anios = table.frame["anios_egreso"] if "anios_egreso" in table.frame.columns else pd.Series(np.nan, index=table.index)
+        self.anios_egreso = pd.to_numeric(anios, errors="coerce").to_numpy(dtype=float)
+        comuna = (
+            table.frame["comuna_residencia"] if "comuna_residencia" in table.frame.columns
+            else pd.Series(None, index=table.index, dtype=object)
+        )
+        # comuna normalizada (minúsculas, sin espacios extra) para comparar con la del colegio
+        self.comuna = comuna.astype(object).where(comuna.notna(), "").astype(str).str.strip().str.casefold().to_numpy()
+
+    def mask(self, request: dict) -> np.ndarray:
+        """Máscara booleana de los postulantes que cumplen 'request'."""
+        crit = parse_request_criteria(request)
+        mask = np.ones(self.n, dtype=bool)
+        if crit["genero"] is not None:
+            mask &= (self.genero == crit["genero"]).to_numpy(dtype=bool)
+        if crit["levels"]:
+            mask &= self.levels.any_of(crit["levels"])
+        if crit["subjects"]:
+            mask &= self.subjects.any_of(crit["subjects"])
+        if crit["days"]:
+            if crit["days_mode"] == "all":
+                mask &= self.days.all_of(crit["days"])
+            else:
+                mask &= self.days.any_of(crit["days"])
+        if crit["min_anios_egreso"] > 0:
+            with np.errstate(invalid="ignore"):
+                mask &= self.anios_egreso >= crit["min_anios_egreso"]
+        return mask
+
+    def mask_batch(self, requests: list) -> np.ndarray:
+        """
+        Igual que mask, pero para varias solicitudes a la vez: matriz booleana (solicitudes, postulantes).
+        Cada criterio se evalúa de una vez para todas las solicitudes que lo usan.
+        """
+        crits = [parse_request_criteria(r) for r in requests]
+        out = np.ones((len(crits), self.n), dtype=bool)
+        for genero in {c["genero"] for c in crits if c["genero"] is not None}:
+            rows = [i for i, c in enumerate(crits) if c["genero"] == genero]
+            out[rows] &= (self.genero == genero).to_numpy(dtype=bool)
+        for column, key, mode in (
+            (self.levels, "levels", "any"),
+            (self.subjects, "subjects", "any"),
+            (self.days, "days", "all"),
+            (self.days, "days", "any"),
+        ):
+            rows = [i for i, c in enumerate(crits) if c[key] and (key != "days" or c["days_mode"] == mode)]
+            if not rows:
+                continue
+            value_lists = [crits[i][key] for i in rows]
+            out[rows] &= column.all_of_batch(value_lists) if mode == "all" else column.any_of_batch(value_lists)
+        min_anios = pd.to_numeric(pd.Series([c["min_anios_egreso"] for c in crits], dtype=object), errors="coerce")
+        min_anios = min_anios.fillna(0).to_numpy(dtype=float)
+        rows = np.flatnonzero(min_anios > 0)
+        if len(rows):
+            with np.errstate(invalid="ignore"):
+                out[rows] &= self.anios_egreso[None, :] >= min_anios[rows, None]
+        return out
+
+    def score(self, request: dict, school_comuna: str = None) -> np.ndarray:
+        """
+        Puntaje de relevancia (0 a 1) de cada postulante para 'request', en una sola pasada:
+        suma ponderada (SCORE_WEIGHTS) de cobertura de asignaturas, cobertura de días,
+        años de egreso y si vive en la comuna del colegio.
+        La cercanía por comuna es solo coincidencia exacta (no hay coordenadas de comunas).
+        """
+        crit = parse_request_criteria(request)
+        scores = np.zeros(self.n, dtype=float)
+        if crit["subjects"]:
+            scores += SCORE_WEIGHTS["subjects"] * self.subjects.count(crit["subjects"]) / len(crit["subjects"])
+        else:
+            scores += SCORE_WEIGHTS["subjects"]
+        if crit["days"]:
+            scores += SCORE_WEIGHTS["days"] * self.days.count(crit["days"]) / len(crit["days"])
+        else:
+            scores += SCORE_WEIGHTS["days"]
+        experience = np.nan_to_num(np.clip(self.anios_egreso, 0, EXPERIENCE_CAP_YEARS), nan=0.0)
+        scores += SCORE_WEIGHTS["experience"] * experience / EXPERIENCE_CAP_YEARS
+        if school_comuna:
+            scores += SCORE_WEIGHTS["comuna"] * (self.comuna == str(school_comuna).strip().casefold())
+        return scores
+
+
+def top_k(scores: np.ndarray, k: int, mask: np.ndarray = None) -> np.ndarray:
+    """
+    Posiciones de los 'k' mayores puntajes (entre las filas de 'mask', si se entrega),
+    de mayor a menor. Usa argpartition: solo se ordenan los k elegidos, no todo el arreglo.
+    """
+    candidates = np.arange(len(scores)) if mask is None else np.flatnonzero(mask)
+    if k <= 0 or len(candidates) == 0:
+        return np.empty(0, dtype=np.int64)
+    cand_scores = scores[candidates]
+    if len(candidates) > k:
+        chosen = np.argpartition(-cand_scores, k - 1)[:k]
+    else:
+        chosen = np.arange(len(candidates))
+    # orden estable: a igual puntaje, se mantiene el orden original
+    order = np.lexsort((candidates[chosen], -cand_scores[chosen]))
+    return candidates[chosen[order]]
+
+
+class BatchMatches:
+    """
+    Resultado del cruce masivo solicitudes x postulantes, como matriz dispersa en formato CSR:
+    los postulantes (posiciones 0..n-1 en la tabla de postulantes) de la solicitud i son
+    indices[indptr[i]:indptr[i + 1]], y counts[i] es su cantidad.
+    """
+
+    def __init__(self, request_ids: list, indptr: np.ndarray, indices: np.ndarray):
+        self.request_ids = list(request_ids)
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = np.diff(indptr)
+        self._row = {rid: i for i, rid in enumerate(self.request_ids)}
+
+    def __len__(self):
+        return len(self.request_ids)
+
+    def candidates(self, request_id) -> np.ndarray:
+        """Posiciones de los postulantes que cumplen la solicitud 'request_id' (vacío si no está)."""
+        i = self._row.get(request_id)
+        if i is None:
+            return np.empty(0, dtype=self.indices.dtype)
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def count_by_request(self) -> dict:
+        """{request_id: número de candidatos}."""
+        return dict(zip(self.request_ids, self.counts.tolist()))
+
+
+def open_requests(df_requests: pd.DataFrame) -> pd.DataFrame:
+    """Solicitudes abiertas: las que no tienen un estado de config.CLOSED_REQUEST_STATUSES."""
+    if "status" not in df_requests.columns:
+        return df_requests
+    status = df_requests["status"].astype(str).str.strip().str.lower()
+    return df_requests[~status.isin(cfg.CLOSED_REQUEST_STATUSES)]
+
+
+def match_requests(df_requests: pd.DataFrame, cleaned_applicants: CompactApplicants,
+                   id_col: str = "replacement_id", chunk_size: int = BATCH_CHUNK_SIZE) -> BatchMatches:
+    """
+    Cruza todas las solicitudes de 'df_requests' (ya deserializadas, ver
+    serialize_data.deserialize_request_from_sheets) con todos los postulantes limpios, con las
+    mismas reglas que utils.filter_applicants_by_request.
+
+    Las solicitudes se procesan en bloques de 'chunk_size' filas de la matriz solicitudes x postulantes
+    y solo se guardan las posiciones que calzan (CSR).
+    """
+    matcher = get_matcher(cleaned_applicants)
+    records = df_requests.to_dict(orient="records")
+    request_ids = df_requests[id_col].tolist() if id_col in df_requests.columns else list(df_requests.index)
+    counts, indices = [], []
+    for start in range(0, len(records), chunk_size):
+        block = matcher.mask_batch(records[start:start + chunk_size])
+        counts.append(block.sum(axis=1))
+        # np.nonzero recorre la matriz por filas: las columnas quedan agrupadas por solicitud y ordenadas
+        indices.append(np.nonzero(block)[1].astype(np.int32))
+    indptr = np.zeros(len(records) + 1, dtype=np.int64)
+    if records:
+        np.cumsum(np.concatenate(counts), out=indptr[1:])
+    indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.int32)
+    return BatchMatches(request_ids, indptr, indices)
+
+
+class ApplicantIndex:
+    """
+    Índice invertido de los postulantes limpios: para cada campo, valor -> arreglo ordenado
+    con las posiciones (0..n-1) de los postulantes que lo tienen.
+
+    Una consulta intersecta/une solo los arreglos de los valores pedidos, partiendo por el más
+    corto, así que el trabajo crece con el número de coincidencias y no con el total de postulantes.
+    """
+
+    LIST_FIELDS = ("subjects", "ed_licence_level", "available_days")
+    SCALAR_FIELDS = ("genero", "comuna_residencia", "university")
+
+    def __init__(self, table: CompactApplicants):
+        self.n = len(table)
+        self.postings = {}
+        positions = pd.RangeIndex(self.n)
+        for field in self.LIST_FIELDS:
+            if field in table.lists:
+                self.postings[field] = table.lists[field].postings()
+        for field in self.SCALAR_FIELDS:
+            if field not in table.frame.columns:
+                continue
+            values = pd.Series(table.frame[field].to_numpy(), index=positions).dropna()
+            self.postings[field] = self._group(values)
+
+    @staticmethod
+    def _group(values: pd.Series) -> dict:
+        """valor -> posiciones ordenadas y sin repetir."""
+        return {
+            value: np.unique(values.index.to_numpy()[idx]).astype(np.int32)
+            for value, idx in values.groupby(values.to_numpy(), sort=False).indices.items()
+        }
+
+    def options(self, field: str) -> list:
+        """Valores presentes en 'field', ordenados (para los selectores del panel)."""
+        return sorted(self.postings.get(field, {}).keys(), key=str)
+
+    def any_of(self, field: str, values: list) -> np.ndarray:
+        """Posiciones con al menos uno de 'values' en 'field' (unión)."""
+        lists = [self.postings.get(field, {}).get(v) for v in values]
+        lists = [l for l in lists if l is not None]
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        if len(lists) == 1:
+            return lists[0]
+        return np.unique(np.concatenate(lists))
+
+    def all_of(self, field: str, values: list) -> np.ndarray:
+        """Posiciones con todos los 'values' en 'field' (intersección)."""
+        lists = [self.postings.get(field, {}).get(v) for v in values]
+        if not lists or any(l is None for l in lists):
+            return np.empty(0, dtype=np.int32)
+        lists.sort(key=len)
+        result = lists[0]
+        for l in lists[1:]:
+            result = np.intersect1d(result, l, assume_unique=True)
+        return result
+
+    def search(self, any_of: dict = None, all_of: dict = None) -> np.ndarray:
+        """
+        Posiciones de los postulantes que cumplen todos los criterios:
+          any_of: {campo: valores} => al menos un valor por campo
+          all_of: {campo: valores} => todos los valores del campo
+        Los campos con lista vacía se ignoran. Sin criterios retorna todas las posiciones.
+        """
+        sets = [self.any_of(f, v) for f, v in (any_of or {}).items() if v]
+        sets += [self.all_of(f, v) for f, v in (all_of or {}).items() if v]
+        if not sets:
+            return np.arange(self.n, dtype=np.int32)
+        sets.sort(key=len)
+        result = sets[0]
+        for s in sets[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, s, assume_unique=True)
+        return result
+
+
+# (tipo, id, largo) de la tabla -> (tabla, estructura); pocos elementos (uno por versión de Applicants).
+# Se guarda también la tabla para que su id no se reutilice mientras esté en el caché.
+_FRAME_CACHE = {}
+_FRAME_CACHE_SIZE = 8
+_FRAME_LOCK = threading.Lock()
+
+
+def _get_for_frame(builder, cleaned_applicants: CompactApplicants):
+    """Retorna builder(cleaned_applicants), construyéndolo solo la primera vez para esa tabla."""
+    key = (builder.__name__, id(cleaned_applicants), len(cleaned_applicants))
+    with _FRAME_LOCK:
+        entry = _FRAME_CACHE.get(key)
+        if entry is not None and entry[0] is cleaned_applicants:
+            return entry[1]
+    built = builder(cleaned_applicants)
+    with _FRAME_LOCK:
+        if len(_FRAME_CACHE) >= _FRAME_CACHE_SIZE:
+            _FRAME_CACHE.pop(next(iter(_FRAME_CACHE)))
+        _FRAME_CACHE[key] = (cleaned_applicants, built)
+    return built
+
+
+def get_matcher(cleaned_applicants: CompactApplicants) -> ApplicantMatcher:
+    """
+    Retorna el ApplicantMatcher de 'cleaned_applicants', construyéndolo solo la primera vez.
+    Como la tabla de postulantes se comparte entre sesiones (shared_cache), el codificador también.
+    """
+    return _get_for_frame(ApplicantMatcher, cleaned_applicants)
+
+
+def get_applicant_index(cleaned_applicants: CompactApplicants) -> ApplicantIndex:
+    """Retorna el ApplicantIndex de 'cleaned_applicants', construyéndolo solo la primera vez."""
+    return _get_for_frame(ApplicantIndex, cleaned_applicants)
+
@@ -0,0 +1,28 @@
+"""
+persistence.py
+
+Archivos pickle que sobreviven a reinicios del proceso (cachés y estados en INTERIM_DATA_DIR).
+"""
+
+import os
+import pickle
+import tempfile
+
+
+def dump_pickle_atomic(obj, path) -> None:
+    """
+    Guarda 'obj' con pickle en 'path', creando la carpeta si no existe. Se escribe primero un
+    archivo temporal con nombre único en la misma carpeta y luego se reemplaza con os.replace,
+    así un lector nunca ve un archivo a medio escribir y dos escritores (p.ej. la app y
+    applicants_worker) no se pisan el temporal; gana el último os.replace.
+    """
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,124 @@
+"""
+rate_limit.py
+
+Límite de requests por service account y reintentos ante errores de cuota.
+
+La API de Google Sheets permite una cantidad fija de requests por minuto a cada service account
+(config.SHEETS_QUOTA_PER_MINUTE). Cuando se supera, responde 429 y la operación se perdía con un
+st.error. Aquí:
+  - TokenBucket: un balde por service account. Cada request HTTP consume un token; si no hay,
+    la request espera su turno (una ráfaga, p.ej. importar muchas solicitudes GForm, queda en cola
+    en vez de fallar).
+  - call_with_retry: reintenta los errores transitorios (429, 5xx, errores de red) con espera
+    exponencial con jitter.
+
+Se aplica a nivel de Client.request de gspread (ver ConnectionPool.track en connections_manager),
+así que cubre conn.read, conn.update y sheets_manager sin cambiar a los llamadores.
+"""
+
+import random
+import threading
+import time
+
+import requests
+import streamlit as st
+
+from ceas import config as cfg
+
+# tokens que se pueden gastar de una vez (ráfaga); el resto se repone de a poco.
+# El relleno es (cuota - ráfaga) por minuto, así en cualquier ventana de 60 s no se supera la cuota.
+BURST_SIZE = 10
+# reintentos ante errores transitorios
+MAX_RETRIES = 5
+# espera base y máxima (segundos) del backoff exponencial
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 32.0
+# códigos HTTP que se reintentan
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Balde de tokens seguro entre threads."""
+
+    def __init__(self, rate_per_minute: float, capacity: float = BURST_SIZE):
+        self.capacity = min(capacity, rate_per_minute)
+        self.refill_per_second = max(rate_per_minute - self.capacity, 1) / 60
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def acquire(self, timeout: float = None) -> bool:
+        """
+        Consume un token, esperando a que haya uno disponible.
+        Retorna False si no se consiguió dentro de 'timeout' segundos (None = esperar siempre).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.refill_per_second
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+
+def is_retryable(error) -> bool:
+    """True si 'error' es transitorio: cuota (429), error del servidor (5xx) o de red."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) in RETRYABLE_STATUS
+
+
+def backoff_delay(attempt: int) -> float:
+    """Espera antes del reintento 'attempt' (1, 2, ...): exponencial con jitter completo."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class RateLimiter:
+    """Un TokenBucket por service account (nombre de la conexión)."""
+
+    def __init__(self, rate_per_minute: float = None):
+        self.rate_per_minute = rate_per_minute or cfg.SHEETS_QUOTA_PER_MINUTE
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str) -> TokenBucket:
+        with self._lock:
+            if name not in self._buckets:
+                self._buckets[name] = TokenBucket(self.rate_per_minute)
+            return self._buckets[name]
+
+    def call_with_retry(self, name: str, fn, *args, **kwargs):
+        """
+        Ejecuta fn(*args, **kwargs) consumiendo un token de 'name' por intento, y reintenta
+        los errores transitorios hasta MAX_RETRIES veces. Los demás errores se propagan de inmediato.
+        """
+        bucket = self.bucket(name)
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                attempt += 1
+                if attempt > MAX_RETRIES or not is_retryable(e):
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"[rate_limit] {name}: {type(e).__name__} ({e}), reintento {attempt}/{MAX_RETRIES} en {delay:.1f}s")
+                time.sleep(delay)
+
+
+@st.cache_resource
+def get_rate_limiter() -> RateLimiter:
+    """Limitador del proceso: las cuotas por service account se cuentan para todas las sesiones juntas."""
+    return RateLimiter()
@@ -17,8 +17,9 @@ Cada función incluye controles básicos, manejo de errores y versionado si se d
 import streamlit as st
 import pandas as pd
 import datetime
-from streamlit_gsheets import GSheetsConnection
-from ceas.connections_manager import get_random_connection
+from ceas.connections_manager import get_pooled_connection
+from ceas.shared_cache import invalidate_worksheet
+from ceas.sheets_manager import append_rows, find_rows, next_id, update_cells
 
 def get_receipts_conn(ttl=0):
     """
@@ -31,8 +32,7 @@ def get_receipts_conn(ttl=0):
       Conexión (GSheetsConnection) o None en caso de error.
     """
     try:
-        rand_conn = get_random_connection()
-        conn = st.connection(rand_conn, type=GSheetsConnection, ttl=ttl)
+        conn = get_pooled_connection(ttl=ttl)
     except Exception as e:
         st.error(f"Error al conectar con la base de datos de recepciones: {e}")
         return None
@@ -86,17 +86,12 @@ def create_receipt(order_id: int, user_id: int, status: str, comments: str) -> b
         return False
     ws_name = st.session_state["app_name"] + "Receipts"
     try:
-        df_orig = conn.read(worksheet=ws_name)
+        # solo se lee la columna receipt_id, no la hoja completa
+        new_id = next_id(conn, ws_name, "receipt_id")
     except Exception as e:
         st.error(f"Error leyendo la hoja 'Receipts': {e}")
         return False
-    df_mod = df_orig.copy()
-    
-    # Aseguramos que 'receipt_id' se trate como int
-    if "receipt_id" in df_mod.columns:
-        df_mod["receipt_id"] = pd.to_numeric(df_mod["receipt_id"], errors="coerce").fillna(0).astype(int)
-    
-    new_id = get_next_receipt_id(df_mod)
+
     now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     new_row = {
@@ -107,11 +102,10 @@ def create_receipt(order_id: int, user_id: int, status: str, comments: str) -> b
         "status": status,
         "comments": comments
     }
-    new_df = pd.DataFrame([new_row])
-    df_mod = pd.concat([df_mod, new_df], ignore_index=True)
     
     try:
-        conn.update(data = df_mod, worksheet=ws_name)
+        # se envía solo la fila nueva
+        append_rows(conn, ws_name, [new_row])
         return True
     except Exception as e:
         st.error(f"Error creando receipt: {e}")
@@ -133,30 +127,23 @@ def update_receipt(receipt_id: int, updates: dict) -> bool:
         return False
     ws_name = st.session_state["app_name"] + "Receipts"
     try:
-        df_orig = conn.read(worksheet=ws_name)
+        # se lee solo la columna receipt_id para ubicar la fila
+        rows = find_rows(conn, ws_name, "receipt_id", receipt_id)
     except Exception as e:
         st.error(f"Error leyendo 'Receipts': {e}")
         return False
-    df_mod = df_orig.copy()
-    
-    if "receipt_id" in df_mod.columns:
-        df_mod["receipt_id"] = pd.to_numeric(df_mod["receipt_id"], errors="coerce").fillna(0).astype(int)
-    
-    idx = df_mod.index[df_mod["receipt_id"] == receipt_id]
-    if len(idx) == 0:
+    if len(rows) == 0:
         st.error(f"No se encontró receipt_id={receipt_id}")
         return False
-    irow = idx[0]
     
     now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    for k, v in updates.items():
-        if k in df_mod.columns:
-            df_mod.at[irow, k] = v
+    updates = dict(updates)
     # Actualizamos la fecha de última actualización en 'receipt_date'
-    df_mod.at[irow, "receipt_date"] = now_str
+    updates["receipt_date"] = now_str
     
     try:
-        conn.update(data = df_mod, worksheet=ws_name)
+        # solo se escriben las celdas modificadas
+        update_cells(conn, ws_name, "receipt_id", receipt_id, updates, rows=rows[:1])
         return True
     except Exception as e:
         st.error(f"Error actualizando receipt: {e}")
@@ -194,6 +181,7 @@ def delete_receipt(receipt_id: int) -> bool:
     
     try:
         conn.update(data = df_mod, worksheet=ws_name)
+        invalidate_worksheet(ws_name)
         return True
     except Exception as e:
         st.error(f"Error eliminando receipt: {e}")
@@ -1,28 +1,112 @@
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
 import pandas as pd
+from ceas.shared_cache import get_shared_cache
+from ceas.duckdb_mirror import sync_mirror
+from ceas.connections_manager import get_pooled_connection
+from ceas.sheets_manager import get_columns
+
+# cómo detectar si una hoja cambió desde la última lectura (nombre de la hoja sin el prefijo app_name):
+# se leen solo las columnas de marcador (get_columns, una request) y la hoja completa solo si
+# cambiaron. Las columnas son la llave (filas agregadas o borradas) y las que cambian al editar:
+#   - Schools: la columna 'version' aumenta en cada edición (update_school).
+#   - Requests: las solicitudes se editan en la planilla (cambios de estado).
+#   - Users: la app cambia 'role' y 'status' (change_user_role, delete_user).
+# Las ediciones manuales en otras columnas no se detectan aquí: aparecen en la próxima lectura completa.
+# Una hoja que no está aquí se lee completa, pero si su hash es igual al de la lectura anterior
+# se conserva el DataFrame anterior.
+REFRESH_MARKER_COLUMNS = {
+    "Schools": ["school_id", "version"],
+    "Requests": ["replacement_id", "status", "updated_at"],
+    "Users": ["email", "role", "status"],
+}
+
+
+def _hash_frame(df: pd.DataFrame) -> int:
+    """Hash del contenido (valores, índice y columnas) de un DataFrame."""
+    try:
+        values_hash = int(pd.util.hash_pandas_object(df, index=True).sum())
+    except TypeError:
+        # columnas con listas/dicts no son hasheables => se usa su representación en texto
+        values_hash = int(pd.util.hash_pandas_object(df.astype(str), index=True).sum())
+    return hash((values_hash, tuple(map(str, df.columns))))
+
+
+def refresh_sheet(conn, sheet_name: str, current_df: pd.DataFrame = None, revision: dict = None) -> tuple:
+    """
+    Refresca una hoja leyendo lo mínimo necesario: primero sus columnas de marcador
+    (REFRESH_MARKER_COLUMNS) y la hoja completa solo si el marcador cambió.
+
+    Args:
+        conn (GSheetsConnection): conexión con service account.
+        sheet_name (str): nombre completo de la hoja, p.ej. "appReemplazosRequests".
+        current_df (pd.DataFrame): DataFrame que se tiene actualmente de la hoja (o None).
+        revision (dict): marcador guardado en la lectura anterior (o None).
+
+    Returns:
+        tuple: (df, revision, changed)
+            df (pd.DataFrame): DataFrame actualizado (el mismo objeto current_df si no cambió).
+            revision (dict): nuevo marcador de la hoja.
+            changed (bool): True si la hoja cambió.
+    """
+    base_name = sheet_name.replace(st.session_state["app_name"], "")
+    marker_columns = REFRESH_MARKER_COLUMNS.get(base_name)
+    revision = revision or {}
+
+    if marker_columns:
+        cols = get_columns(conn, sheet_name, marker_columns)
+        # número de filas + valores de las columnas de marcador
+        marker = hash(tuple((name, tuple(values)) for name, values in cols.items()))
+        if current_df is not None and cols and revision.get("marker") == marker:
+            print(f"Hoja {sheet_name} sin cambios (columnas {', '.join(cols)})")
+            return current_df, revision, False
+        df = conn.read(worksheet=sheet_name, ttl=0, max_entries=1)
+        return df, {"marker": marker}, True
+
+    df = conn.read(worksheet=sheet_name, ttl=0, max_entries=1)
+    # se compara con el hash de la lectura anterior (no con current_df, que puede tener filas
+    # agregadas localmente o tipos distintos a los de conn.read)
+    marker = _hash_frame(df)
+    if current_df is not None and revision.get("marker") == marker:
+        print(f"Hoja {sheet_name} sin cambios")
+        return current_df, {"marker": marker}, False
+    return df, {"marker": marker}, True
+
+
 def refresh_dataframes(dfs = "dfs", refresh_list = "refresh_list",file_callback=None):
     """Refresca los DataFrames de las hojas de la spreadsheet y retorna un diccionario con los DataFrames con la estructura {sheet_name: df}, usando la conexión de GSheets.
 
+    Solo se lee lo que cambió desde la lectura anterior (ver REFRESH_MARKER_COLUMNS); los marcadores
+    de cada hoja se guardan en st.session_state['sheet_revisions'].
+
     Returns:
         dict: Diccionario con los DataFrames de las hojas de la spreadsheet.
     """
     if dfs in st.session_state and refresh_list in st.session_state:
-        
+
         print("Refrescando información de la base de datos")
 
-        refresh_conn = st.connection(st.session_state["connections"][1], type=GSheetsConnection)
-            
+        refresh_conn = get_pooled_connection()
+        revisions = st.session_state.setdefault('sheet_revisions', {})
+
             # leemos las hojas que necesitan ser refrescadas
         if st.session_state[refresh_list] is not None:
             for sheet_name in st.session_state[refresh_list]:
                 print(f"Refrescando hoja {sheet_name}")
-                st.session_state['dfs'][sheet_name] = refresh_conn.read(worksheet=sheet_name,ttl=0,max_entries=1)
-                
+                key = sheet_name.replace(st.session_state["app_name"],"").lower()
+                current_df = st.session_state['dfs'].pop(key, st.session_state['dfs'].get(sheet_name))
+                df, revisions[sheet_name], changed = refresh_sheet(
+                    refresh_conn, sheet_name, current_df, revisions.get(sheet_name)
+                )
+                st.session_state['dfs'][sheet_name] = df
+                if changed or get_shared_cache().get(sheet_name) is None:
+                    # la versión recién leída queda disponible para las demás sesiones
+                    get_shared_cache().put(sheet_name, df)
+
 
             del st.session_state['refresh_list']
             st.session_state['dfs'] = {k.replace(st.session_state["app_name"],"").lower():v for k,v in st.session_state['dfs'].items()}
-            
+            sync_mirror(st.session_state['dfs'])
+
     elif dfs in st.session_state and refresh_list not in st.session_state:
         print("No hay hojas que refrescar")
     else:
@@ -30,4 +114,3 @@ def refresh_dataframes(dfs = "dfs", refresh_list = "refresh_list",file_callback=
     if file_callback is not None:
 
         return file_callback, st.session_state['dfs']
-    
\ No newline at end of file
@@ -25,17 +25,17 @@ import pickle
 import streamlit as st
 import pandas as pd
 import datetime
-from streamlit_gsheets import GSheetsConnection
-from ceas.connections_manager import get_random_connection
+from ceas.connections_manager import get_pooled_connection
+from ceas.shared_cache import get_shared_cache, invalidate_worksheet
+from ceas.sheets_manager import append_rows, get_columns, next_id, update_cells
 def get_schools_conn(ttl=0):
     """
     Crea la conexión a la hoja "app_name + Schools",    
     """
     
     try:
-        # elegir al azar una de las conexiones disponibles
-        rand_conn = get_random_connection()
-        conn = st.connection(rand_conn, type=GSheetsConnection, ttl=ttl)
+        # elegir la conexión menos cargada de las disponibles
+        conn = get_pooled_connection(ttl=ttl)
 
     except Exception as e:
         st.error(f"Error al conectar con la base 'schools': {e}")
@@ -89,6 +89,51 @@ def get_all_schools() -> pd.DataFrame:
 
     return df
 
+class SchoolIndex:
+    """
+    Índices de la hoja Schools para no recorrerla en cada búsqueda:
+      - id_by_name: school_name -> school_id (si un nombre se repite, gana la primera fila),
+      - records: school_id -> fila del colegio (dict).
+    """
+
+    def __init__(self, df_schools: pd.DataFrame):
+        by_name = df_schools.drop_duplicates("school_name", keep="first")
+        self.id_by_name = pd.Series(by_name["school_id"].astype(object).to_numpy(), index=by_name["school_name"].to_numpy())
+        by_id = df_schools.drop_duplicates("school_id", keep="first")
+        self.records = by_id.set_index("school_id", drop=False).to_dict("index")
+
+    def id_for(self, school_name: str):
+        """school_id del colegio 'school_name', o None si no existe."""
+        return self.id_by_name.get(school_name)
+
+    def ids_for(self, school_names: pd.Series) -> pd.Series:
+        """school_id de cada nombre de 'school_names' (un solo map; None para los que no existen)."""
+        ids = school_names.map(self.id_by_name).astype(object)
+        return ids.where(ids.notna(), None)
+
+    def record(self, school_id) -> dict:
+        """Fila del colegio 'school_id' como dict, o None si no existe."""
+        return self.records.get(school_id)
+
+
+def get_school_index() -> SchoolIndex:
+    """
+    SchoolIndex de st.session_state['dfs']['schools'].
+
+    Se guarda en el caché compartido con la versión de la hoja Schools, así que se construye una vez
+    por versión y lo reutilizan los reruns y las demás sesiones.
+    """
+    df_schools = st.session_state['dfs']['schools']
+    sheet_name = st.session_state["app_name"] + "Schools"
+    cache = get_shared_cache()
+    version = cache.version(sheet_name)
+    entry = cache.get(sheet_name + ":index", version=version)
+    if entry is not None and entry[0] is df_schools:
+        return entry[1]
+    index = SchoolIndex(df_schools)
+    cache.put(sheet_name + ":index", (df_schools, index), version=version)
+    return index
+
 def get_next_school_id(df:pd.DataFrame) -> int:
     """
     Retorna el siguiente ID => max + 1 o 1 si df empty.
@@ -115,16 +160,12 @@ def create_school(school_name:str, comuna:str, address:str, status:str="activo",
 
     ws_name = st.session_state["app_name"] + "Schools"
     try:
-        df_orig = conn.read(worksheet=ws_name)
+        # solo se lee la columna school_id, no la hoja completa
+        new_id = next_id(conn, ws_name, "school_id")
     except Exception as e:
         st.error(f"Error leyendo la hoja 'Schools': {e}")
         return False
 
-    df_mod = df_orig.copy()
-    if "school_id" in df_mod.columns:
-        df_mod["school_id"] = pd.to_numeric(df_mod["school_id"], errors='coerce').fillna(0).astype(int)
-
-    new_id = get_next_school_id(df_mod)
     new_row = {
         "school_id": new_id,
         "school_name": school_name,
@@ -135,11 +176,9 @@ def create_school(school_name:str, comuna:str, address:str, status:str="activo",
         "version": 1  # concurrency
     }
 
-    row_df = pd.DataFrame([new_row])
-    df_mod = pd.concat([df_mod, row_df], ignore_index=True)
-
     try:
-        conn.update(data = df_mod, worksheet=ws_name)
+        # se envía solo la fila nueva
+        append_rows(conn, ws_name, [new_row])
         return True
     except Exception as e:
         st.error(f"Error creando colegio: {e}")
@@ -162,35 +201,30 @@ def update_school(school_id:int, updates:dict) -> bool:
 
     ws_name = st.session_state["app_name"] + "Schools"
     try:
-        df_orig = conn.read(worksheet=ws_name)
+        # se leen solo las columnas school_id y version, en una sola request
+        cols = get_columns(conn, ws_name, ["school_id", "version"])
     except Exception as e:
         st.error(f"Error leyendo 'Schools': {e}")
         return False
 
-    df_mod = df_orig.copy()
-    if "school_id" in df_mod.columns:
-        df_mod["school_id"] = pd.to_numeric(df_mod["school_id"], errors='coerce').fillna(0).astype(int)
-
-    row_index = df_mod.index[df_mod["school_id"]==school_id]
+    ids = pd.to_numeric(pd.Series(cols.get("school_id", []), dtype=object), errors='coerce').fillna(0).astype(int)
+    row_index = ids.index[ids == school_id]
     if len(row_index)==0:
         st.error(f"No se encontró school_id={school_id}")
         return False
     idx = row_index[0]
 
+    updates = dict(updates)
     # concurrency => version
-    if "version" in df_mod.columns:
-        old_ver = df_mod.at[idx,"version"]
-        new_ver = old_ver + 1
-
-    for k,v in updates.items():
-        if k in df_mod.columns:
-            df_mod.at[idx,k] = v
-
-    if "version" in df_mod.columns:
-        df_mod.at[idx,"version"] = new_ver
+    if "version" in cols:
+        versions = pd.to_numeric(pd.Series(cols["version"], dtype=object), errors='coerce')
+        old_ver = versions.get(idx, 0)
+        old_ver = 0 if pd.isna(old_ver) else int(old_ver)
+        updates["version"] = old_ver + 1
 
     try:
-        conn.update(data = df_mod, worksheet=ws_name)
+        # solo se escriben las celdas modificadas
+        update_cells(conn, ws_name, "school_id", school_id, updates, rows=[int(idx) + 2])
         return True
     except Exception as e:
         st.error(f"Error actualizando colegio: {e}")
@@ -234,6 +268,7 @@ def delete_school(school_id:int) -> bool:
     df_mod.drop(idx, inplace=True)
     try:
         conn.update(data = df_mod, worksheet=ws_name)
+        invalidate_worksheet(ws_name)
         return True
     except Exception as e:
         st.error(f"Error al eliminar colegio: {e}")
@@ -270,7 +305,11 @@ def validate_candidate(email, df_candidates):
     df_candidates.loc[df_candidates["email"] == email, "validated"] = True
     conn = get_schools_conn()
     try:
-        conn.update(data=df_candidates, worksheet=st.session_state["app_name"] + "Candidates")
+        # solo se escribe la celda 'validated' de la fila del candidato
+        written = update_cells(conn, st.session_state["app_name"] + "Candidates", "email", email, {"validated": True})
+        if written == 0:
+            st.error(f"Error al validar el candidato: no se encontró {email} en la hoja Candidates.")
+            return False, df_candidates
         return True, df_candidates
     except Exception as e:
         st.error(f"Error al validar el candidato: {e}")
@@ -289,7 +328,11 @@ def select_candidate(email, df_candidates):
     df_candidates.loc[df_candidates["email"] == email, "selected"] = True
     conn = get_schools_conn()
     try:
-        conn.update(data=df_candidates, worksheet=st.session_state["app_name"] + "Candidates")
+        # solo se escribe la celda 'selected' de la fila del candidato
+        written = update_cells(conn, st.session_state["app_name"] + "Candidates", "email", email, {"selected": True})
+        if written == 0:
+            st.error(f"Error al seleccionar el candidato: no se encontró {email} en la hoja Candidates.")
+            return False, df_candidates
         return True, df_candidates
     except Exception as e:
         st.error(f"Error al seleccionar el candidato: {e}")
@@ -307,7 +350,11 @@ def choose_candidate(email, df_proposed_candidates):
     df_proposed_candidates.loc[df_proposed_candidates["email"] == email, "chosen"] = True
     conn = get_schools_conn()
     try:
-        conn.update(data=df_proposed_candidates, worksheet=st.session_state["app_name"] + "Candidates")
+        # df_proposed_candidates está filtrado (selected == True), así que la fila se ubica en la hoja
+        written = update_cells(conn, st.session_state["app_name"] + "Candidates", "email", email, {"chosen": True})
+        if written == 0:
+            st.error(f"Error al elegir el candidato: no se encontró {email} en la hoja Candidates.")
+            return False, df_proposed_candidates
         return True, df_proposed_candidates
     except Exception as e:
         st.error(f"Error al elegir el candidato: {e}")
@@ -322,7 +369,11 @@ def register_reception(email, rating, df_receptions):
     df_receptions.loc[df_receptions["email"] == email, "rating"] = rating
     conn = get_schools_conn()
     try:
-        conn.update(data=df_receptions, worksheet=st.session_state["app_name"] + "Receptions")
+        # la fila se ubica leyendo la columna 'email' de la hoja (df_receptions puede estar desactualizado)
+        written = update_cells(conn, st.session_state["app_name"] + "Receptions", "email", email, {"rating": rating})
+        if written == 0:
+            st.error(f"Error al registrar la recepción: no se encontró {email} en la hoja Receptions.")
+            return False, df_receptions
         return True, df_receptions
     except Exception as e:
         st.error(f"Error al registrar la recepción: {e}")
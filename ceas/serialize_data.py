@@ -1,7 +1,11 @@
+import numpy as np
 import pandas as pd
 import json
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
+from ceas.config import SPECIAL_SUBJECT
+from ceas.sheets_manager import read_worksheets
 def serialize_request_for_sheets(request: dict) -> dict:
     """
     Takes the internal request dictionary (with lists/dicts/datetimes)
@@ -51,46 +55,146 @@ def serialize_request_for_sheets(request: dict) -> dict:
         #print(f"{k}: {type(v)}=> {type(out[k])}")
     return out
 
-def deserialize_request_from_sheets(row: dict) -> dict:
+def _serialize_values(values: pd.Series) -> pd.Series:
     """
-    row => dict con strings. Reconstruye list, dict, date, etc.
-    We guess field by field. (Requires some knowledge about which fields are lists, which are dict.)
+    Serializa una columna de tipo object con las mismas reglas que serialize_request_for_sheets,
+    agrupando los valores por tipo: cada grupo se convierte de una vez.
+    Los escalares de NumPy se tratan como sus equivalentes de Python (igual que Series.to_dict por fila).
+    """
+    out = pd.Series("", index=values.index, dtype=object)
+    kinds = values.map(type)
+    for kind in kinds.unique():
+        mask = (kinds == kind).to_numpy()
+        group = values[mask]
+        if issubclass(kind, list):
+            out[mask] = [",".join(map(str, v)) for v in group]
+        elif issubclass(kind, dict):
+            out[mask] = [json.dumps(v, default=str) for v in group]
+        elif issubclass(kind, datetime.datetime):
+            out[mask] = [v.isoformat()[:19] for v in group]
+        elif issubclass(kind, np.datetime64):
+            out[mask] = [pd.Timestamp(v).isoformat()[:19] for v in group]
+        elif issubclass(kind, datetime.date):
+            out[mask] = [v.isoformat()[:10] for v in group]
+        elif issubclass(kind, datetime.time):
+            out[mask] = [v.isoformat()[:5] for v in group]
+        elif issubclass(kind, (int, np.integer, np.bool_)):
+            out[mask] = pd.Series([int(v) for v in group], index=group.index, dtype=object)
+        elif issubclass(kind, (float, np.floating)):
+            out[mask] = pd.Series([float(v) for v in group], index=group.index, dtype=object)
+        elif kind is type(None):
+            continue
+        else:
+            out[mask] = group.astype(str)
+    return out
+
+
+def serialize_frame_for_sheets(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Versión por columnas de serialize_request_for_sheets para un DataFrame completo:
+    el resultado es el mismo que serializar cada fila (iterrows) y armar el DataFrame,
+    pero cada columna se convierte en una pasada. Las columnas numéricas pasan sin cambios
+    (como int/float de Python) y las de fechas se formatean de una vez.
     """
     out = {}
-    # supongamos que "nivel_educativo" es un string "Media,Básica"
-    # "asignatura" es un JSON
-    # "fecha_inicio" es "YYYY-MM-DD"
-    # ...
-    # We'll do a manual approach or a definition of schema.
+    for col in df.columns:
+        series = df[col]
+        kind = series.dtype.kind if isinstance(series.dtype, np.dtype) else None
+        if kind == "b":
+            out[col] = series.astype(int).astype(object)
+        elif kind in ("i", "u", "f"):
+            out[col] = series.astype(object)
+        elif kind == "M" or isinstance(series.dtype, pd.DatetimeTZDtype):
+            # mismo formato que datetime.isoformat()[:19] (los NaT quedan como 'NaT', igual que por fila)
+            out[col] = series.dt.strftime("%Y-%m-%dT%H:%M:%S").fillna("NaT").astype(object)
+        else:
+            out[col] = _serialize_values(series.astype(object))
+    return pd.DataFrame(out, index=df.index, columns=df.columns)
+
+
+# Tipos de las columnas de la hoja Requests que no son texto/número plano:
+#   list     => 'val1,val2,...'
+#   json     => json.dumps(...)
+#   date     => 'YYYY-MM-DD'
+#   datetime => 'YYYY-MM-DD HH:MM:SS'
+# Las columnas que no están aquí se dejan tal como vienen de la hoja.
+REQUESTS_SCHEMA = {
+    "nivel_educativo": "list",
+    "dias_seleccionados": "list",
+    "dias_de_la_semana": "list",
+    "asignatura": "json",
+    "curso": "json",
+    "horarios_seleccionados": "json",
+    "fecha_inicio": "date",
+    "fecha_fin": "date",
+    "created_at": "datetime",
+}
+SCHEMA_DATE_FORMATS = {"date": "%Y-%m-%d", "datetime": "%Y-%m-%d %H:%M:%S"}
 
+
+def _decode_json(v):
+    try:
+        return json.loads(v)
+    except:
+        return {}
+
+
+def deserialize_request_from_sheets(row: dict, schema: dict = None) -> dict:
+    """
+    row => dict con strings. Reconstruye list, dict, date, etc. según 'schema'
+    (por defecto REQUESTS_SCHEMA). Para un DataFrame completo usar decode_frame.
+    """
+    schema = REQUESTS_SCHEMA if schema is None else schema
+    out = {}
     for k, v in row.items():
-        # listas
-        if k in ["nivel_educativo","dias_seleccionados","dias_de_la_semana",]:
-            out[k] = v.split(",") if v else []
-        elif k in ["asignatura","curso","horarios_seleccionados",]:
-            # assume JSON
-            try:
-                out[k] = json.loads(v)
-            except:
-                out[k] = {}
-        elif k in ["fecha_inicio","fecha_fin"]:
-            # parse date from 'YYYY-MM-DD'
+        kind = schema.get(k)
+        if kind == "list":
+            out[k] = v.split(",") if isinstance(v, str) and v else []
+        elif kind == "json":
+            out[k] = _decode_json(v)
+        elif kind == "date":
             try:
-                out[k] = datetime.datetime.strptime(v, "%Y-%m-%d").date()
+                out[k] = datetime.datetime.strptime(v, SCHEMA_DATE_FORMATS["date"]).date()
             except:
                 out[k] = None
-        elif k in ["created_at"]:
-            # parse time from 'YYYY-MM-DD HH:MM:SS'
+        elif kind == "datetime":
             try:
-                out[k] = datetime.datetime.strptime(v, "%Y-%m-%d %H:%M:%S")
+                out[k] = datetime.datetime.strptime(v, SCHEMA_DATE_FORMATS["datetime"])
             except:
                 out[k] = None
-            
         else:
             # fallback
             out[k] = v
     return out
 
+
+def decode_frame(df: pd.DataFrame, schema: dict = None) -> pd.DataFrame:
+    """
+    Versión por columnas de deserialize_request_from_sheets: decodifica cada columna de 'schema'
+    en una pasada (split de listas, pd.to_datetime para fechas, json.loads solo donde hay JSON).
+    El resultado es el mismo que pd.DataFrame([deserialize_request_from_sheets(r) for r in records]).
+    """
+    schema = REQUESTS_SCHEMA if schema is None else schema
+    out = df.reset_index(drop=True)
+    decoded = {}
+    for col, kind in schema.items():
+        if col not in out.columns:
+            continue
+        values = out[col]
+        is_text = (values.map(type) == str).to_numpy()
+        if kind == "list":
+            split = values.where(is_text & (values != "")).str.split(",")
+            decoded[col] = [v if isinstance(v, list) else [] for v in split]
+        elif kind == "json":
+            decoded[col] = values.map(_decode_json)
+        elif kind in SCHEMA_DATE_FORMATS:
+            parsed = pd.to_datetime(values.where(is_text), format=SCHEMA_DATE_FORMATS[kind], errors="coerce")
+            if kind == "date":
+                decoded[col] = pd.Series(parsed.dt.date.to_numpy(dtype=object), index=out.index).where(parsed.notna(), None)
+            else:
+                decoded[col] = parsed
+    return out.assign(**decoded) if decoded else out.copy()
+
 def format_candidates_for_panel_display(df_candidates: pd.DataFrame) -> pd.DataFrame:
     """
     "Format the candidates for display in the panel."
@@ -128,12 +232,65 @@ def read_all_dataframes(sheet_name_list: list, connection) -> dict:
     """
     Lee múltiples hojas de Google Sheets y retorna un diccionario
     {sheet_name: DataFrame} usando la conexión provista.
+
+    Todas las hojas se leen en una sola request (values.batchGet, ver sheets_manager.read_worksheets).
+    Si la lectura en lote falla, se lee cada hoja con connection.read, en paralelo.
     """
-    dataframes = {}
-    for sheet_name in sheet_name_list:
-        df = connection.read(worksheet=sheet_name,max_entries=1)
-        dataframes[sheet_name] = df
-    return dataframes
+    try:
+        return read_worksheets(connection, sheet_name_list)
+    except Exception as e:
+        print(f"[read_all_dataframes] Error en la lectura en lote, leyendo hojas en paralelo: {e}")
+
+    def _read(sheet_name):
+        return connection.read(worksheet=sheet_name,max_entries=1)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(sheet_name_list))) as executor:
+        dfs = list(executor.map(_read, sheet_name_list))
+    return dict(zip(sheet_name_list, dfs))
+
+# columnas de CleanApplicants que se guardan como listas unidas por comas
+CLEAN_APPLICANTS_LIST_COLUMNS = ["subjects", "unparseable_subjects", "ed_licence_level", "available_days"]
+
+
+def _split_clean_list(value, special: str = None) -> list:
+    """'a,b,c' => ['a', 'b', 'c']; 'special' es un valor que contiene comas y se extrae primero."""
+    if not isinstance(value, str) or not value.strip():
+        return []
+    out = []
+    if special and special in value:
+        out.append(special)
+        value = value.replace(special, "")
+    return out + [x.strip() for x in value.split(",") if x.strip()]
+
+
+def deserialize_clean_applicants(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Inverso de la serialización de CleanApplicants (utils.create_clean_applicants_sheet):
+    reconstruye las listas, la fecha de egreso y los números, para obtener el mismo formato
+    que utils.cleanup_applicants a partir de la hoja.
+    """
+    out = df.copy()
+    for col in CLEAN_APPLICANTS_LIST_COLUMNS:
+        if col in out.columns:
+            special = SPECIAL_SUBJECT if col == "subjects" else None
+            out[col] = out[col].apply(lambda v: _split_clean_list(v, special))
+    if "undergrad_year" in out.columns:
+        dates = pd.to_datetime(out["undergrad_year"], format="%Y-%m-%d", errors="coerce")
+        out["undergrad_year"] = pd.Series(dates.dt.date.to_numpy(dtype=object), index=out.index).where(dates.notna(), None)
+    for col in ["anios_egreso", "max_hours_per_week"]:
+        if col in out.columns:
+            out[col] = pd.to_numeric(out[col], errors="coerce")
+    if "phone" in out.columns:
+        # Sheets guarda '+569XXXXXXXX' como número
+        out["phone"] = out["phone"].apply(
+            lambda v: f"+{int(v)}" if isinstance(v, (int, float)) and not pd.isna(v) else (v if v else float("nan"))
+        )
+    if "email" in out.columns:
+        out["email"] = out["email"].astype(str)
+    if "rut" in out.columns:
+        out["rut"] = out["rut"].fillna("").astype(str)
+    return out
+
 
 def format_request_data_for_email(request: dict) -> dict:
     """
@@ -0,0 +1,106 @@
+"""
+shared_cache.py
+
+Caché de DataFrames compartido por todas las sesiones de Streamlit del proceso.
+
+Sin este caché cada sesión lee y guarda su propia copia de cada hoja en st.session_state['dfs'];
+con 30 colegios conectados, las hojas Users, Schools, Applicants, etc. se leen 30 veces y quedan
+30 veces en memoria. Aquí se guarda una sola copia por hoja, con un token de versión:
+  - get(key): retorna el DataFrame compartido (o None si no está, o si está vencido).
+  - put(key, df): guarda una nueva versión de la hoja.
+  - invalidate(key): descarta la hoja (se llama después de cada escritura a esa hoja).
+
+Las sesiones reciben el mismo objeto DataFrame, por lo que deben tratarlo como de solo lectura:
+si necesitan modificarlo, deben hacer .copy() primero.
+"""
+
+import threading
+import time
+
+import streamlit as st
+
+# segundos que una hoja se considera vigente si nadie la invalida (p.ej. cambios hechos a mano en la planilla)
+SHARED_CACHE_TTL = 600
+
+
+class SharedFrameCache:
+    """
+    Diccionario {key: DataFrame} con un token de versión por key, seguro entre threads.
+    La versión de una key aumenta cada vez que se guarda (put) o se invalida.
+    """
+
+    def __init__(self, ttl: float = SHARED_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._frames = {}  # key -> (version, loaded_at, df)
+        self._versions = {}  # key -> int
+
+    def version(self, key: str) -> int:
+        """Versión actual de 'key' (0 si nunca se ha cargado)."""
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def get(self, key: str, version: int = None):
+        """
+        Retorna el DataFrame compartido de 'key', o None si no está, si venció el ttl
+        o si se pide una versión distinta a la guardada.
+        """
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                return None
+            entry_version, loaded_at, df = entry
+            if self.ttl is not None and time.monotonic() - loaded_at > self.ttl:
+                return None
+            if version is not None and version != entry_version:
+                return None
+            return df
+
+    def put(self, key: str, df, version: int = None) -> int:
+        """
+        Guarda 'df' como nueva versión de 'key' y retorna el token de versión.
+        Si se entrega 'version' se usa ese token (útil para datos derivados de otra hoja).
+        """
+        with self._lock:
+            if version is None:
+                version = self._versions.get(key, 0) + 1
+            self._versions[key] = version
+            self._frames[key] = (version, time.monotonic(), df)
+            return version
+
+    def invalidate(self, key: str) -> None:
+        """Descarta 'key' y aumenta su versión, para que la próxima lectura vaya a Sheets."""
+        with self._lock:
+            self._frames.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get_many(self, keys: list) -> tuple:
+        """
+        Retorna (hits, misses): hits = {key: df} de las keys vigentes, misses = lista de keys faltantes.
+        """
+        hits = {}
+        misses = []
+        for key in keys:
+            df = self.get(key)
+            if df is None:
+                misses.append(key)
+            else:
+                hits[key] = df
+        return hits, misses
+
+
+@st.cache_resource
+def get_shared_cache() -> SharedFrameCache:
+    """Caché de hojas del proceso: todas las sesiones de Streamlit reciben la misma instancia."""
+    return SharedFrameCache()
+
+
+def invalidate_worksheet(worksheet: str) -> None:
+    """
+    Invalida solo la hoja modificada. Las funciones de escritura (sheets_manager, managers)
+    la llaman después de escribir en 'worksheet'.
+    """
+    try:
+        get_shared_cache().invalidate(worksheet)
+    except Exception as e:
+        print(f"[shared_cache] No se pudo invalidar {worksheet}: {e}")
@@ -0,0 +1,291 @@
+"""
+sheets_manager.py
+
+Acceso a las hojas de Google Sheets a nivel de filas y celdas.
+
+streamlit_gsheets solo expone conn.read / conn.update, que leen y reescriben la hoja completa,
+así que cada alta de un registro cuesta O(filas) en payload y latencia.
+Este módulo usa el Worksheet de gspread que está detrás de la conexión (conn.client) para:
+  - append_rows: agregar filas al final de la hoja enviando solo las filas nuevas,
+    sin volver a leer la hoja.
+  - next_id: calcular el siguiente ID leyendo solo la columna de la llave primaria.
+  - update_cells: ubicar la(s) fila(s) de una llave primaria y escribir solo las celdas
+    modificadas, en un único batch update.
+  - read_worksheets: leer varias hojas de la misma spreadsheet en una sola request (values.batchGet).
+  - read_rows_from: leer solo las filas desde una posición en adelante (hojas donde solo se agregan filas).
+
+Los Worksheet y los encabezados se guardan en caché por conexión, para no repetir
+las lecturas de metadata de la spreadsheet en cada escritura.
+Cada escritura invalida la hoja en el caché compartido entre sesiones (shared_cache).
+"""
+
+from numbers import Real
+
+from gspread.utils import rowcol_to_a1
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from ceas.shared_cache import invalidate_worksheet
+
+# (id(conn), worksheet) -> gspread.Worksheet
+_WORKSHEET_CACHE = {}
+# (id(conn), worksheet) -> list[str] con los encabezados (fila 1)
+_HEADER_CACHE = {}
+# id(conn) -> gspread.Spreadsheet
+_SPREADSHEET_CACHE = {}
+
+
+def get_spreadsheet(conn):
+    """
+    Retorna el gspread.Spreadsheet configurado en la conexión (secrets), guardado en caché.
+    """
+    key = id(conn)
+    if key not in _SPREADSHEET_CACHE:
+        _SPREADSHEET_CACHE[key] = conn.client._open_spreadsheet()
+    return _SPREADSHEET_CACHE[key]
+
+
+def get_worksheet(conn, worksheet: str):
+    """
+    Retorna el gspread.Worksheet de 'worksheet' usando el cliente de la conexión.
+    Abrir la spreadsheet cuesta una lectura de metadata, por eso se guarda en caché.
+    """
+    key = (id(conn), worksheet)
+    if key not in _WORKSHEET_CACHE:
+        _WORKSHEET_CACHE[key] = conn.client._select_worksheet(worksheet=worksheet)
+    return _WORKSHEET_CACHE[key]
+
+
+def get_header(conn, worksheet: str, refresh: bool = False) -> list:
+    """
+    Retorna los encabezados (fila 1) de la hoja. Se leen una sola vez por conexión.
+    """
+    key = (id(conn), worksheet)
+    if refresh or key not in _HEADER_CACHE:
+        _HEADER_CACHE[key] = get_worksheet(conn, worksheet).row_values(1)
+    return _HEADER_CACHE[key]
+
+
+def to_cell(value):
+    """
+    Convierte un valor de pandas/python a un valor aceptado por la API de Sheets,
+    con las mismas reglas que usa conn.update (gspread_dataframe):
+      - nulos (None, NaN, NaT) -> ""
+      - números -> número (los escalares de numpy se pasan a python)
+      - el resto -> str(value)
+    """
+    if isinstance(value, (list, dict, tuple, set)):
+        return str(value)
+    if pd.isnull(value) is True:
+        return ""
+    if isinstance(value, np.datetime64):
+        value = pd.Timestamp(value)
+    elif isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, Real):
+        return value
+    return str(value)
+
+
+def _rows_to_values(rows, header: list) -> list:
+    """
+    Ordena las filas (DataFrame o lista de dicts) según los encabezados de la hoja.
+    Las columnas que no están en la hoja se ignoran y las que faltan quedan vacías.
+    """
+    if isinstance(rows, pd.DataFrame):
+        rows = rows.to_dict(orient="records")
+    extra = {k for row in rows for k in row.keys()} - set(header)
+    if extra:
+        print(f"[sheets_manager] columnas ignoradas (no existen en la hoja): {sorted(extra)}")
+    return [[to_cell(row.get(col)) for col in header] for row in rows]
+
+
+def append_rows(conn, worksheet: str, rows) -> int:
+    """
+    Agrega 'rows' al final de la hoja 'worksheet' en una sola request (values.append),
+    sin leer ni reescribir las filas existentes.
+
+    Args:
+        conn (GSheetsConnection): conexión con service account.
+        worksheet (str): nombre de la hoja, p.ej. "appReemplazosRequests".
+        rows (pd.DataFrame | list[dict]): filas a agregar; las keys deben coincidir con los encabezados.
+
+    Returns:
+        int: número de filas agregadas.
+    """
+    if isinstance(rows, dict):
+        rows = [rows]
+    if len(rows) == 0:
+        return 0
+    ws = get_worksheet(conn, worksheet)
+    header = get_header(conn, worksheet)
+    if not header:
+        # hoja vacía => los encabezados son las keys de la primera fila
+        first = rows.columns if isinstance(rows, pd.DataFrame) else rows[0].keys()
+        header = [str(c) for c in first]
+        ws.append_rows([header], value_input_option="USER_ENTERED")
+        _HEADER_CACHE[(id(conn), worksheet)] = header
+    values = _rows_to_values(rows, header)
+    ws.append_rows(
+        values,
+        value_input_option="USER_ENTERED",
+        insert_data_option="INSERT_ROWS",
+        table_range="A1",
+    )
+    invalidate_worksheet(worksheet)
+    return len(values)
+
+
+def next_id(conn, worksheet: str, id_col: str) -> int:
+    """
+    Retorna el siguiente ID (max + 1, o 1 si no hay registros) leyendo solo la columna 'id_col'.
+    """
+    header = get_header(conn, worksheet)
+    if id_col not in header:
+        return 1
+    col_values = get_worksheet(conn, worksheet).col_values(header.index(id_col) + 1)[1:]
+    ids = pd.to_numeric(pd.Series(col_values, dtype=object), errors="coerce").dropna()
+    if ids.empty:
+        return 1
+    return int(ids.max()) + 1
+
+
+def get_columns(conn, worksheet: str, columns: list) -> dict:
+    """
+    Lee solo las columnas pedidas (sin encabezado) en una única request (values.batchGet).
+
+    Returns:
+        dict: {columna: lista de valores (str)}; las columnas que no existen en la hoja se omiten.
+    """
+    header = get_header(conn, worksheet)
+    columns = [c for c in columns if c in header]
+    if not columns:
+        return {}
+    ranges = []
+    for col in columns:
+        letter = rowcol_to_a1(1, header.index(col) + 1)[:-1]
+        ranges.append(f"{letter}2:{letter}")
+    values = get_worksheet(conn, worksheet).batch_get(ranges)
+    return {col: [r[0] if r else "" for r in vals] for col, vals in zip(columns, values)}
+
+
+def find_rows(conn, worksheet: str, key_col: str, key_value) -> list:
+    """
+    Retorna los números de fila (1-based, el encabezado es la fila 1) donde key_col == key_value.
+    Lee solo la columna key_col de la hoja (no una copia local, que puede estar desactualizada).
+    """
+    keys = get_columns(conn, worksheet, [key_col]).get(key_col, [])
+    keys = pd.Series(keys, dtype=object)
+    # los IDs numéricos se comparan como número (la hoja puede devolver "3" o "3.0")
+    if isinstance(key_value, Real) and not isinstance(key_value, bool):
+        match = pd.to_numeric(keys, errors="coerce") == key_value
+    else:
+        match = keys.astype(str).str.strip() == str(key_value).strip()
+    return [int(i) + 2 for i in np.flatnonzero(match.to_numpy())]
+
+
+def update_cells(conn, worksheet: str, key_col: str, key_value, updates: dict, rows: list = None) -> int:
+    """
+    Escribe solo las celdas de 'updates' en las filas donde key_col == key_value,
+    en un único batch update (values.batchUpdate).
+
+    Args:
+        conn (GSheetsConnection): conexión con service account.
+        worksheet (str): nombre de la hoja.
+        key_col (str): columna de la llave primaria (p.ej. "email", "school_id").
+        key_value: valor de la llave.
+        updates (dict): {columna: nuevo valor}. Las columnas que no existen en la hoja se ignoran.
+        rows (list): opcional, números de fila ya ubicados con find_rows.
+
+    Returns:
+        int: número de celdas escritas (0 si no se encontró la fila).
+    """
+    header = get_header(conn, worksheet)
+    if rows is None:
+        rows = find_rows(conn, worksheet, key_col, key_value)
+    if not rows:
+        return 0
+    missing = [k for k in updates if k not in header]
+    if missing:
+        print(f"[sheets_manager] columnas ignoradas (no existen en la hoja): {missing}")
+    data = [
+        {"range": rowcol_to_a1(row, header.index(col) + 1), "values": [[to_cell(value)]]}
+        for row in rows
+        for col, value in updates.items()
+        if col in header
+    ]
+    if not data:
+        return 0
+    get_worksheet(conn, worksheet).batch_update(data, value_input_option="USER_ENTERED")
+    invalidate_worksheet(worksheet)
+    return len(data)
+
+
+def values_to_dataframe(values: list) -> pd.DataFrame:
+    """
+    Convierte los valores crudos de una hoja (lista de filas, la primera es el encabezado)
+    en un DataFrame, igual que conn.read (gspread_dataframe.get_as_dataframe):
+    se infieren los tipos con TextParser y se eliminan filas vacías y columnas vacías sin nombre.
+    """
+    if not values:
+        return pd.DataFrame()
+    width = max(len(row) for row in values)
+    rect = [list(row) + [""] * (width - len(row)) for row in values]
+    df = TextParser(rect).read()
+    df = df.dropna(how="all", axis=0)
+    unnamed = [c for c in df.columns if str(c).startswith("Unnamed:") and df[c].isna().all()]
+    if unnamed:
+        df = df.drop(columns=unnamed)
+    return df
+
+
+def read_worksheets(conn, worksheets: list) -> dict:
+    """
+    Lee todas las hojas de 'worksheets' en una sola request a nivel de spreadsheet
+    (values.batchGet), en vez de una request por hoja.
+
+    Returns:
+        dict: {worksheet: DataFrame}
+    """
+    ranges = ["'" + ws.replace("'", "''") + "'" for ws in worksheets]
+    response = get_spreadsheet(conn).values_batch_get(
+        ranges,
+        params={
+            "valueRenderOption": "UNFORMATTED_VALUE",
+            "dateTimeRenderOption": "FORMATTED_STRING",
+        },
+    )
+    value_ranges = response.get("valueRanges", [])
+    return {
+        ws: values_to_dataframe(vr.get("values", []))
+        for ws, vr in zip(worksheets, value_ranges)
+    }
+
+
+def read_rows_from(conn, worksheet: str, start_row: int) -> tuple:
+    """
+    Lee solo las filas desde 'start_row' (1-based) hasta el final de la hoja, con el mismo
+    formato de valores que conn.read. Sirve para refrescar hojas donde solo se agregan filas.
+
+    Returns:
+        tuple: (df, n_rows)
+            df (pd.DataFrame): filas leídas, con los encabezados de la hoja; el índice
+                conserva la posición de la fila (fila r de la hoja -> índice r - 2), igual que conn.read.
+            n_rows (int): número de filas leídas, incluyendo las vacías.
+    """
+    header = get_header(conn, worksheet)
+    if not header:
+        return pd.DataFrame(), 0
+    last_col = rowcol_to_a1(1, len(header))[:-1]
+    values = get_worksheet(conn, worksheet).get(
+        f"A{start_row}:{last_col}",
+        value_render_option="UNFORMATTED_VALUE",
+        date_time_render_option="FORMATTED_STRING",
+    )
+    values = [list(row) for row in values]
+    if not values:
+        return pd.DataFrame(columns=header), 0
+    df = values_to_dataframe([header] + values)
+    df.index = df.index + (start_row - 2)
+    return df, len(values)
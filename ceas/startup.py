@@ -0,0 +1,64 @@
+"""
+startup.py
+
+Carga inicial de la app: ejecuta tareas de I/O independientes (lectura de hojas, GForm,
+escritura de CleanApplicants, etc.) en un pool de threads acotado y espera a que todas
+terminen antes de armar la navegación.
+
+Cada tarea se cronometra, para ver qué parte domina el tiempo de arranque en frío.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# máximo de threads por defecto: las tareas son de red, pero las cuotas de Sheets son por minuto
+DEFAULT_MAX_WORKERS = 4
+
+
+def run_startup_tasks(tasks: dict, max_workers: int = DEFAULT_MAX_WORKERS) -> tuple:
+    """
+    Ejecuta 'tasks' en paralelo (máximo 'max_workers' a la vez) y espera a que terminen todas.
+
+    Los threads heredan el ScriptRunContext de la sesión actual, así que las tareas pueden
+    usar st.session_state y st.connection. Aun así, es preferible que retornen sus resultados
+    y que el thread principal los guarde en session_state.
+
+    Args:
+        tasks (dict): {nombre: callable sin argumentos}
+        max_workers (int): tamaño máximo del pool.
+
+    Returns:
+        tuple: (results, timings)
+            results (dict): {nombre: valor retornado, o la Exception si la tarea falló}
+            timings (dict): {nombre: segundos que tomó la tarea}
+    """
+    if not tasks:
+        return {}, {}
+    ctx = get_script_run_ctx()
+    timings = {}
+
+    def _init_thread():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    def _timed(name, fn):
+        t0 = time.perf_counter()
+        try:
+            return fn()
+        except Exception as e:
+            print(f"[startup] la tarea '{name}' falló: {e}")
+            return e
+        finally:
+            timings[name] = time.perf_counter() - t0
+
+    n_workers = max(1, min(max_workers, len(tasks)))
+    with ThreadPoolExecutor(max_workers=n_workers, initializer=_init_thread) as executor:
+        futures = {name: executor.submit(_timed, name, fn) for name, fn in tasks.items()}
+        results = {name: fut.result() for name, fut in futures.items()}
+
+    for name, secs in sorted(timings.items(), key=lambda kv: -kv[1]):
+        print(f"[startup] {name}: {secs:.2f}s")
+    return results, timings
@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
-from streamlit_gsheets import GSheetsConnection
 import datetime
 import time
-from ceas.connections_manager import get_random_connection
+from ceas.connections_manager import get_pooled_connection
+from ceas.sheets_manager import append_rows, next_id, update_cells
 
 def get_users_conn(ttl=0):
     """
@@ -12,9 +12,7 @@ def get_users_conn(ttl=0):
         ttl (int): Tiempo de vida de la conexión en segundos. Por defecto es 0.
     """
     try:
-        rand_conn = get_random_connection()
-        
-        conn = st.connection(rand_conn, type= GSheetsConnection, ttl=ttl)
+        conn = get_pooled_connection(ttl=ttl)
         # prints para debug de cuando se crea la conexión o cuando se reutiliza
 
     except Exception as e:
@@ -86,25 +84,16 @@ def change_user_role(email: str, new_role: str, df_users: pd.DataFrame):
     
     
     
-    # 2) Crear la conexión a GSheets y leer la hoja correspondiente
+    # 2) Cambiar el rol del usuario: se escribe solo la celda 'role'. La fila se ubica leyendo
+    #    la columna 'email' de la hoja (no el índice de df_users, que puede estar desactualizado)
     try:
         conn = get_users_conn()
-        df = conn.read(worksheet=st.session_state["app_name"] + "Users")
-    except Exception as e:
-        st.error(f"Error al leer la hoja {st.session_state['app_name']}Users: {e}")
-        return False, df_users
-    
-    # 3) Chequear que la hoja leída y el df_users sean iguales, es decir, que no haya habido cambios en la hoja mientras se leía
-    if not df.equals(df_users):
-        st.error("Hubo cambios en la base de datos de usuarios. Por favor, refresca la página y vuelve a intentarlo.")
-
-        return False, df_users
-
-    # 4) Cambiar el rol del usuario
-    try:
+        written = update_cells(conn, st.session_state["app_name"] + "Users", "email", email, {"role": new_role})
+        if written == 0:
+            st.error(f"No se encontró al usuario {email} en {st.session_state['app_name']}Users. El rol no se cambió.")
+            return False, df_users
         df_mod = df_users.copy()
-        df_mod.loc[df["email"] == email, "role"] = new_role
-        conn.update(data=df_mod, worksheet=st.session_state["app_name"] + "Users")
+        df_mod.loc[df_mod["email"] == email, "role"] = new_role
     except Exception as e:
         st.error(f"Error al escribir en la hoja {st.session_state['app_name']}Users: {e}. El rol no se cambió.")
         return False, df_users
@@ -117,27 +106,17 @@ def delete_user(email: str, df_users: pd.DataFrame):
     if st.session_state.role not in ["owner","admin","oficina_central"]:
         st.error("No tienes acceso a esta sección.")
         st.stop()
-        # 2) Crear la conexión a GSheets y leer la hoja correspondiente
-    try:
-        conn = get_users_conn()
-        df = conn.read(worksheet=st.session_state["app_name"] + "Users")
-    except Exception as e:
-        st.error(f"Error al leer la hoja {st.session_state['app_name']}Users: {e}")
-        return False, df_users
-    
-    # 3) Chequear que la hoja leída y el df_users sean iguales, es decir, que no haya habido cambios en la hoja mientras se leía
-    if not df.equals(df_users):
-        st.error("Hubo cambios en la base de datos de usuarios. Por favor, refresca la página y vuelve a intentarlo.")
-
-        return False, df_users
-    # 4) Desactivar el usuario
+    # 2) Desactivar el usuario: se escribe solo la celda 'status' (la fila se ubica en la hoja)
 
     try:
-        df_mod = df_users.copy()
         # delete en realidad es desactivar, cambiar status a inactive
-        df_mod.loc[df_mod["email"] == email, "status"] = "inactive"
         conn = get_users_conn()
-        conn.update(data=df_mod, worksheet=st.session_state["app_name"] + "Users")
+        written = update_cells(conn, st.session_state["app_name"] + "Users", "email", email, {"status": "inactive"})
+        if written == 0:
+            st.error(f"No se encontró al usuario {email} en {st.session_state['app_name']}Users.")
+            return False, df_users
+        df_mod = df_users.copy()
+        df_mod.loc[df_mod["email"] == email, "status"] = "inactive"
     except Exception as e:
         st.error(f"Error al escribir en la hoja {st.session_state['app_name']}Users: {e}")
         return False, df_users
@@ -149,10 +128,14 @@ def add_user(email: str, name: str, role: str, school_id: int, school_name: str,
         st.stop()
     
     conn = get_users_conn()
-    df_users = conn.read(worksheet=st.session_state["app_name"] + "Users")
+    ws_name = st.session_state["app_name"] + "Users"
     # crear nueva fila: user_id, email, name, role, school_id, 'school_name', status, created_at, last_login
-    # user_id es el máximo de la columna user_id + 1
-    user_id = df_users["user_id"].max() + 1
+    # user_id es el máximo de la columna user_id + 1 (se lee solo esa columna, no la hoja completa)
+    try:
+        user_id = next_id(conn, ws_name, "user_id")
+    except Exception as e:
+        st.error(f"Error al leer la hoja {ws_name}: {e}")
+        return False, None
 
     new_row = pd.DataFrame({
         "user_id": [user_id],
@@ -166,13 +149,13 @@ def add_user(email: str, name: str, role: str, school_id: int, school_name: str,
         "created_at": [datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")],
         "last_login": [None]
     })
-    df_users = pd.concat([df_users, new_row], ignore_index=True)
     try:
-        conn.update(data=df_users, worksheet=st.session_state["app_name"] + "Users")
+        # se envía solo la fila nueva
+        append_rows(conn, ws_name, new_row)
     except Exception as e:
-        st.error(f"Error al escribir en la hoja {st.session_state['app_name']}Users: {e}")
-        return False, df_users
-    return True, df_users
+        st.error(f"Error al escribir en la hoja {ws_name}: {e}")
+        return False, new_row
+    return True, new_row
 
 
 
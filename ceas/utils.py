@@ -15,14 +15,20 @@ from typing import Union
 from ceas.reemplazos.refresh import refresh_dataframes
 from ceas.user_management import get_all_users, change_user_role, delete_user
 from ceas.reemplazos.gmail import send_candidates_email
-from ceas.serialize_data import serialize_request_for_sheets
-import holidays
+from ceas.serialize_data import decode_frame, serialize_frame_for_sheets, serialize_request_for_sheets, REQUESTS_SCHEMA
+import pyarrow as pa
 from datetime import date
 import datetime
-from ceas.schools_manager import get_schools_conn
+from ceas.schools_manager import get_school_index, get_schools_conn
+from ceas.sheets_manager import append_rows, next_id
+from ceas.shared_cache import get_shared_cache, invalidate_worksheet
+from ceas.write_queue import get_write_queue
+from ceas.connections_manager import get_pooled_connection, pooled_connection_name
+from ceas.clean_cache import CLEAN_CACHE_VERSION, get_clean_row_cache, row_hashes
+from ceas.applicant_table import ARROW_STRING, RAW_COLUMNS, CompactApplicants
+from ceas.matching import get_matcher, match_requests, open_requests, top_k
+from ceas.business_days import WEEKDAY_NAMES, get_business_calendar, weekdays_of
 import pickle
-import random
-from streamlit_gsheets import GSheetsConnection
 import io
 
 # --- Google Drive API imports ---
@@ -36,10 +42,8 @@ def get_gform_solicitudes_conn():
     Función que obtiene la conexión a la hoja de Google Sheets con los datos de las solicitudes de reemplazo ingresadas por los colegios.
     """
     try:
-        # elegir al azar una de las conexiones disponibles
-        rand_conn = random.choice(st.session_state["solicitudes_gform_connections"])
-        print("rand_conn:",rand_conn)
-        conn = st.connection(rand_conn, type=GSheetsConnection, ttl=0,max_entries=1)
+        # elegir la conexión menos cargada de las disponibles
+        conn = get_pooled_connection("solicitudes_gform_connections", ttl=0, max_entries=1)
 
     except Exception as e:
         st.error(f"Error al conectar con la base 'solicitudes': {e}")
@@ -153,17 +157,18 @@ def process_requests_from_gsheet(df):
     df_clean['dias_de_la_semana'] = df_clean['dias_de_la_semana'].apply(lambda x: x.split(", ") if isinstance(x, str) else [])
     df_clean['dias_seleccionados'] = None
     
-    df_clean['school_id'] = None
-    # Cálculo de días hábiles y asignación de school_id
-    for i, row in df_clean.iterrows():
-        dias = get_days_between_dates(row["fecha_inicio"], row["fecha_fin"],row["dias_de_la_semana"])
-        df_clean.at[i, "dias_seleccionados"] = [d.strftime("%Y-%m-%d") for d in dias["days"]]
-        df_clean.at[i, "dias_de_la_semana"] = dias["str_weekdays"]
-        df_clean.at[i, "school_id"] = st.session_state["dfs"]["schools"] \
-            .loc[
-                st.session_state["dfs"]["schools"]["school_name"] == row["school_name"],
-                "school_id"
-            ].values[0]
+    # Cálculo de días hábiles de todas las filas en una pasada (calendario precalculado)
+    weekday_names = np.array(WEEKDAY_NAMES, dtype=object)
+    all_days = get_business_calendar().days_between_many(
+        df_clean["fecha_inicio"], df_clean["fecha_fin"], df_clean["dias_de_la_semana"]
+    )
+    df_clean["dias_seleccionados"] = [np.datetime_as_string(days, unit="D").tolist() for days in all_days]
+    df_clean["dias_de_la_semana"] = [weekday_names[weekdays_of(days)].tolist() for days in all_days]
+    # Asignación de school_id con el índice de colegios (un solo map)
+    df_clean["school_id"] = get_school_index().ids_for(df_clean["school_name"])
+    unknown = df_clean.loc[df_clean["school_id"].isna(), "school_name"].unique()
+    if len(unknown):
+        print(f"[utils] Colegios del formulario que no están en Schools: {list(unknown)}")
     return df_clean
 def create_request_dict_from_gform(gform_row:dict) -> dict:
     """
@@ -252,44 +257,62 @@ def create_request_dict_from_gform(gform_row:dict) -> dict:
     }
     return request_dict
 
-def create_clean_applicants_sheet(df_applicants: pd.DataFrame, write_to_gsheet: bool) -> pd.DataFrame:
+def create_clean_applicants_sheet(df_applicants: pd.DataFrame, write_to_gsheet: bool, raise_errors: bool = False) -> tuple:
     """ 
     Función que limpia el DataFrame de los aplicantes y lo prepara para ser usado en las funciones de filtrado y validación.
 
+    Solo se parsean las filas nuevas o modificadas (cleanup_applicants_incremental), y si la hoja
+    CleanApplicants ya tiene las filas de la vez anterior, solo se le agregan las nuevas.
+
     Args:
         df_applicants (pd.DataFrame): DataFrame de los aplicantes.
+        write_to_gsheet (bool): escribir el resultado en la hoja CleanApplicants.
+        raise_errors (bool): propagar los errores al escribir la hoja en vez de mostrarlos con
+            st.error (fuera de la app, p.ej. en applicants_worker, st.error no se ve).
 
     Returns:
-        pd.DataFrame: DataFrame limpio de los aplicantes.
+        tuple: (cleaned_applicants, df_serialized)
+            cleaned_applicants (pd.DataFrame): DataFrame limpio de los aplicantes.
+            df_serialized (pd.DataFrame): todas las filas limpias serializadas como en la hoja
+                (también cuando solo se agregaron las nuevas), o None si write_to_gsheet es False.
     """
-    cleaned_applicants = cleanup_applicants(df_applicants)
+    cache = get_clean_row_cache()
+    cleaned_applicants, hashes = cleanup_applicants_incremental(df_applicants, cache=cache)
     
     if write_to_gsheet:
-        rand_conn = random.choice(st.session_state["connections"])
-        print("rand_conn in create_clean_applicants:",rand_conn)
-        conn = st.connection(rand_conn, type=GSheetsConnection, ttl=0,max_entries=1)
-        
-        serialized_cleaned_applicants_dict = {}
-        
-        for i, row in cleaned_applicants.iterrows():
-            # Convertir cada fila a un diccionario
-            row_dict = row.to_dict()
-            # Serializar el diccionario
-            serialized_row = serialize_request_for_sheets(row_dict)
-            serialized_cleaned_applicants_dict[i] = serialized_row
-
-        # serialized_cleaned_applicants = serialize_request_for_sheets(cleaned_applicants)
-        # # 1. Convertir serialized_request a un dict
-        # serialized_row = {}
-        # for key, value in serialized_cleaned_applicants.items():
-        #     serialized_row[key] = [value]
-        # # 2. Convertir serialized_row a un DataFrame
-        df_serialized_cleaned_applicants = pd.DataFrame(serialized_cleaned_applicants_dict).T
+        conn = get_pooled_connection(ttl=0, max_entries=1)
+        worksheet = st.session_state["app_name"] + "CleanApplicants"
+        year = datetime.date.today().year
+
+        df_serialized_cleaned_applicants = serialize_frame_for_sheets(cleaned_applicants)
+
+        # si la hoja ya tiene todas las filas escritas la vez anterior (ninguna cambió ni se borró)
+        # y los anios_egreso son del mismo año, basta con agregar las filas nuevas
+        written = cache.written
+        if written is not None and cache.written_year == year and set(written) <= set(hashes.tolist()):
+            new_rows = ~hashes.isin(written).to_numpy()
+            try:
+                if new_rows.any():
+                    append_rows(conn, worksheet, df_serialized_cleaned_applicants[new_rows])
+                    cache.mark_written(list(written) + hashes[new_rows].tolist(), year)
+                    cache.save()
+                print(f"[utils] CleanApplicants: {int(new_rows.sum())} filas nuevas agregadas")
+            except Exception as e:
+                if raise_errors:
+                    raise
+                st.error(f"Error al actualizar la hoja de Google Sheets: {e}")
+            return cleaned_applicants, df_serialized_cleaned_applicants
+
         try:        
             
-            conn.update(data=df_serialized_cleaned_applicants, worksheet=st.session_state["app_name"] + "CleanApplicants")
+            conn.update(data=df_serialized_cleaned_applicants, worksheet=worksheet)
+            invalidate_worksheet(worksheet)
+            cache.mark_written(hashes.tolist(), year)
+            cache.save()
             
         except Exception as e:
+            if raise_errors:
+                raise
             st.error(f"Error al actualizar la hoja de Google Sheets: {e}")
             return cleaned_applicants, df_serialized_cleaned_applicants
     else:
@@ -299,7 +322,6 @@ def create_clean_applicants_sheet(df_applicants: pd.DataFrame, write_to_gsheet:
     return cleaned_applicants, df_serialized_cleaned_applicants
 
 
-
 def create_request_dict(form_reemplazo_data:dict ) -> dict:
 
     """ 
@@ -314,7 +336,7 @@ def create_request_dict(form_reemplazo_data:dict ) -> dict:
     """
     school_name = form_reemplazo_data["inst"]
     # school_id
-    school_id = st.session_state['dfs']['schools'].loc[st.session_state['dfs']['schools']["school_name"] == school_name, "school_id"].values[0]
+    school_id = get_school_index().id_for(school_name)
     
     created_by = form_reemplazo_data["solicitante"]
     nivel_educativo = form_reemplazo_data["nivel_educativo"]
@@ -385,13 +407,12 @@ def create_replacement_request( request_dict: dict, df_requests: pd.DataFrame,sa
     serialized_row = pd.DataFrame(serialized_row)
     
 
-    # Agregar la nueva fila al DataFrame existente
-    # y actualizar la hoja de Google Sheets
-    df_requests = pd.concat([df_requests, serialized_row], ignore_index=True)
-    
     try:
+        # Agregar solo la nueva fila al final de la hoja de Google Sheets (sin reescribirla completa)
         conn = get_schools_conn()
-        conn.update(data=df_requests, worksheet=st.session_state["app_name"] + "Requests")
+        append_rows(conn, st.session_state["app_name"] + "Requests", serialized_row)
+        # y agregarla también a la copia local de df_requests
+        df_requests = pd.concat([df_requests, serialized_row], ignore_index=True)
 
         if save_pickle:
         # guardar en un pickle la solicitud (request_dict)
@@ -405,6 +426,59 @@ def create_replacement_request( request_dict: dict, df_requests: pd.DataFrame,sa
     except Exception as e:
         st.error(f"Error al crear la solicitud de reemplazo en la hoja {st.session_state["app_name"] + "Requests"}: {e}")
         return False, df_requests
+def create_replacement_requests(request_dicts: list, df_requests: pd.DataFrame) -> tuple:
+    """
+    Versión masiva de create_replacement_request (importación de solicitudes del GForm).
+
+    Valida todas las solicitudes, asigna a las válidas un rango contiguo de replacement_id
+    (a partir del siguiente ID de la hoja, leído con sheets_manager.next_id justo antes de escribir,
+    no de df_requests, que puede estar desactualizado) y las agrega a la hoja Requests con un solo
+    append. Las solicitudes inválidas no detienen el lote: se reportan en 'errors'.
+    Los dicts de 'request_dicts' no se modifican.
+
+    Args:
+        request_dicts (list[dict]): solicitudes (p.ej. de create_request_dict_from_gform).
+        df_requests (pd.DataFrame): hoja Requests actual (serializada).
+
+    Returns:
+        tuple: (df_requests con las filas agregadas, errors), donde errors es un dict
+        {posición en request_dicts: lista de mensajes}. Si falla la escritura, df_requests
+        se retorna sin cambios y todas las solicitudes válidas quedan con error.
+    """
+    errors = {}
+    valid = []
+    for pos, request_dict in enumerate(request_dicts):
+        isValid, request_errors = validate_request(request_dict)
+        if request_dict.get("school_id") is None or pd.isna(request_dict.get("school_id")):
+            isValid = False
+            request_errors = request_errors + [f"El colegio '{request_dict.get('school_name')}' no existe en Schools."]
+        if isValid:
+            valid.append(pos)
+        else:
+            errors[pos] = request_errors
+    if not valid:
+        return df_requests, errors
+
+    worksheet = st.session_state["app_name"] + "Requests"
+    try:
+        conn = get_schools_conn()
+        first_id = next_id(conn, worksheet, "replacement_id")
+        serialized_rows = []
+        for replacement_id, pos in enumerate(valid, start=first_id):
+            request_dict = dict(request_dicts[pos], replacement_id=replacement_id)
+            if request_dict['created_with'] == "webapp":
+                request_dict["created_at"] = datetime.datetime.now()
+            serialized_rows.append(serialize_request_for_sheets(request_dict))
+        new_rows = pd.DataFrame(serialized_rows)
+        append_rows(conn, worksheet, new_rows)
+    except Exception as e:
+        st.error(f"Error al agregar {len(valid)} solicitudes a la hoja {worksheet}: {e}")
+        for pos in valid:
+            errors[pos] = [f"No se pudo escribir en Google Sheets: {e}"]
+        return df_requests, errors
+    print(f"[utils] {len(new_rows)} solicitudes agregadas (replacement_id {first_id}-{first_id + len(new_rows) - 1})")
+    return pd.concat([df_requests, new_rows], ignore_index=True), errors
+
 def render_email_container_draft(row,data):
     """
     Función que renderiza el contenedor de envío de correos.
@@ -495,66 +569,49 @@ def get_days_between_dates(
         - "weekdays": lista datetime.datetime
         - "str_weekdays": lista de nombres en español
     """
-    # Desactivar FutureWarnings de pandas
-    pd.options.mode.chained_assignment = None
-
-    date1 = pd.to_datetime(date1)
-    date2 = pd.to_datetime(date2)
-
-    # Lista default lunes‑viernes
-    if days_of_the_week is None:
-        days_of_the_week = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
-
-    # Holidays de Chile para el año en cuestión (y siguiente si cruza)
-    years_needed = list(range(date1.year, date2.year + 1))
-    ch_holidays = holidays.country_holidays("CL", years=years_needed, observed=True)
-    holiday_idx = pd.to_datetime(list(ch_holidays.keys()))
-
-    # Generar todos los días hábiles (lunes‑viernes) entre fechas
-    biz_days = pd.date_range(date1, date2, freq="B")
-
-    # Excluir festivos (convertimos ambos a datetime64 para evitar FutureWarning)
-    biz_days = biz_days[~biz_days.isin(holiday_idx)]
-
-    # Map ingles→español para weekday names
-    en_to_es = {
-        "Monday": "Lunes",
-        "Tuesday": "Martes",
-        "Wednesday": "Miércoles",
-        "Thursday": "Jueves",
-        "Friday": "Viernes",
-        "Saturday": "Sábado",
-        "Sunday": "Domingo",
-    }
-
-    # Filtrar por días solicitados
-    keep_mask = biz_days.strftime("%A").map(en_to_es.get).isin(days_of_the_week)
-    selected = biz_days[keep_mask]
+    # Días hábiles (lunes‑viernes sin feriados de Chile) desde el calendario precalculado
+    days = get_business_calendar().days_between(date1, date2, days_of_the_week)
+    return _business_days_dict(days)
 
-    str_days = selected.strftime("%d de %B").tolist()
-    str_weekdays_es = selected.strftime("%A").map(en_to_es).tolist()
-    weekdays_py = selected.to_pydatetime().tolist()
+def _business_days_dict(days: np.ndarray) -> dict:
+    """Arreglo datetime64[D] de días => diccionario en el formato de get_days_between_dates."""
+    selected = pd.DatetimeIndex(days.astype("datetime64[ns]"))
+    weekday_names = np.array(WEEKDAY_NAMES, dtype=object)
 
     return {
         "days": selected,
-        "str_days": str_days,
-        "weekdays": weekdays_py,
-        "str_weekdays": str_weekdays_es,
+        "str_days": selected.strftime("%d de %B").tolist(),
+        "weekdays": selected.to_pydatetime().tolist(),
+        "str_weekdays": weekday_names[selected.weekday].tolist(),
     }
 
 # =================================================================
 # Registro de envíos de correo (EmailLog)
 # =================================================================
 
-def _get_email_log_conn() -> "GSheetsConnection":
+def _enqueue_append(worksheet: str, rows) -> None:
+    """
+    Encola filas para agregar a 'worksheet' en la cola de escritura en segundo plano
+    (ceas.write_queue), sin esperar a Google Sheets. Si no se puede encolar, se escriben de inmediato.
+    """
+    if "connections" not in st.session_state:
+        raise RuntimeError("No hay conexiones disponibles en session_state.")
+    conn = get_pooled_connection(ttl=0, max_entries=1)
+    conn_name = pooled_connection_name(conn)
+    try:
+        get_write_queue().enqueue(conn_name, worksheet, rows, conn=conn)
+    except Exception as e:
+        print(f"[write_queue] No se pudo encolar {worksheet}, se escribe directamente: {e}")
+        append_rows(conn, worksheet, rows)
+
+def _get_email_log_conn():
     """
     Devuelve conexión a la hoja que registra envíos de correo.
     Usa la misma convención: <app_name>EmailLog.
     """
     if "connections" not in st.session_state:
         raise RuntimeError("No hay conexiones en session_state para EmailLog.")
-    rand = random.choice(st.session_state["connections"])
-    return st.connection(rand, type=GSheetsConnection, ttl=0, max_entries=1)
+    return get_pooled_connection(ttl=0, max_entries=1)
 
 def _email_log_sheet_name() -> str:
     return f"{st.session_state['app_name']}EmailLog"
@@ -594,8 +651,8 @@ def append_email_log(
     """
     Agrega un registro de envío de correo a EmailLog.
     attachments: lista de nombres de archivo adjunto.
+    La fila se encola (write_queue) y se envía en segundo plano, sin leer la hoja.
     """
-    df_exist = load_email_log_df()
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     sent_by = st.session_state.get("user_info", {}).get("email", "")
     new_row = {
@@ -609,10 +666,8 @@ def append_email_log(
         "body": body,
         "attachments": ", ".join(attachments)
     }
-    df_upd = pd.concat([df_exist, pd.DataFrame([new_row])], ignore_index=True)
     try:
-        conn = _get_email_log_conn()
-        conn.update(data=df_upd, worksheet=_email_log_sheet_name())
+        _enqueue_append(_email_log_sheet_name(), [new_row])
     except Exception as e:
         print(f"[EmailLog] Error al actualizar: {e}")
 
@@ -622,8 +677,7 @@ def append_email_log(
 def _get_sent_cvs_conn():
     if "connections" not in st.session_state:
         raise RuntimeError("No hay conexiones disponibles en session_state.")
-    rand = random.choice(st.session_state["connections"])
-    return st.connection(rand, type=GSheetsConnection, ttl=0, max_entries=1)
+    return get_pooled_connection(ttl=0, max_entries=1)
 
 def _sent_cvs_sheet_name() -> str:
     return f"{st.session_state['app_name']}SentCVs"
@@ -632,23 +686,30 @@ def load_sent_cvs_df() -> pd.DataFrame:
     try:
         conn = _get_sent_cvs_conn()
         df = conn.read(worksheet=_sent_cvs_sheet_name())
+        # filas encoladas que aún no llegan a la hoja
+        pending = get_write_queue().pending_rows(_sent_cvs_sheet_name())
+        if pending:
+            df = pd.concat([df, pd.DataFrame(pending)], ignore_index=True)
         if df is None or df.empty:
             return pd.DataFrame(columns=["replacement_id", "email"])
         df["replacement_id"] = df["replacement_id"].astype(int, errors="ignore")
         df["email"] = df["email"].astype(str)
-        return df
+        # append_sent_cvs no lee la hoja antes de escribir => puede haber duplicados
+        return df.drop_duplicates(ignore_index=True)
     except Exception:
         return pd.DataFrame(columns=["replacement_id", "email"])
 
 def append_sent_cvs(request_id: int, emails: list[str]):
+    """
+    Agrega (replacement_id, email) a SentCVs enviando solo las filas nuevas.
+    Las filas se encolan (write_queue) y se envían en segundo plano.
+    Los duplicados se eliminan al leer (load_sent_cvs_df).
+    """
     if not emails:
         return
-    df_exist = load_sent_cvs_df()
-    new_rows = pd.DataFrame({"replacement_id": request_id, "email": emails})
-    df_upd = pd.concat([df_exist, new_rows]).drop_duplicates()
+    new_rows = pd.DataFrame({"replacement_id": request_id, "email": emails}).drop_duplicates()
     try:
-        conn = _get_sent_cvs_conn()
-        conn.update(data=df_upd, worksheet=_sent_cvs_sheet_name())
+        _enqueue_append(_sent_cvs_sheet_name(), new_rows)
     except Exception as e:
         print(f"[SentCVs] Error al actualizar: {e}")
 
@@ -1285,7 +1346,7 @@ def validate_request(new_request):
     # 1) Check date range
     fi = new_request.get("fecha_inicio")
     ff = new_request.get("fecha_fin")
-    if fi is None or ff is None:
+    if fi is None or ff is None or pd.isna(fi) or pd.isna(ff):
         errors.append("Fechas de inicio/fin no definidas.")
     else:
         if fi > ff:
@@ -1330,7 +1391,7 @@ def validate_request(new_request):
             errors.append("No se detectaron días entre las fechas seleccionadas, verifique la selección.")
 
     # 6) Check for 'status'
-    valid_statuses = ["creada","aprobada","rechazada","finalizada"]
+    valid_statuses = cfg.REQUEST_STATUSES
     status_val = new_request.get("status", "")
     if status_val not in valid_statuses:
         errors.append(f"Estado (status) inválido: {status_val} (debe estar en {valid_statuses}).")
@@ -1357,10 +1418,10 @@ def validate_request(new_request):
     return (is_valid, errors)
 
 
-def filter_applicants_by_request(request: dict, cleaned_applicants: "pd.DataFrame") -> "pd.DataFrame":
+def filter_applicants_by_request(request: dict, cleaned_applicants: CompactApplicants) -> "pd.DataFrame":
     """
-    Filtra el DataFrame 'cleaned_applicants' (ya limpio con cleanup_applicants) 
-    en función de un 'request' que contiene los criterios de búsqueda.
+    Filtra la tabla 'cleaned_applicants' (postulantes limpios con cleanup_applicants, ver
+    applicant_table.CompactApplicants) en función de un 'request' que contiene los criterios de búsqueda.
 
     Criterios:
     1. Genero (si request['genero'] != "Indiferente", se filtra applicant['genero']).
@@ -1397,131 +1458,144 @@ def filter_applicants_by_request(request: dict, cleaned_applicants: "pd.DataFram
             - disponibilidad: "Completa" or "Parcial"
             - anios_egreso: int
             ...
-        cleaned_applicants (pd.DataFrame): 
+        cleaned_applicants (CompactApplicants): 
             - "genero", "ed_licence_level", "subjects", "available_days", "anios_egreso", etc.
 
     Returns:
-        pd.DataFrame: subset de 'cleaned_applicants' que cumple con los criterios.
+        pd.DataFrame: filas de 'cleaned_applicants' que cumplen con los criterios.
     """
-    subset = cleaned_applicants.copy()
-    
-    # 1) Genero
-    genero_req = request.get("genero", "Indiferente")
-    if genero_req != "Indiferente":
-        subset = subset[ subset["genero"] == genero_req ]
-
-    # 2) Determinación de "effective_levels" con la excepción de 7°/8° Básico => "Media"
-    niv_req = request.get("nivel_educativo", [])
-    curso_dict = request.get("curso", {})  # dict p.ej. {"Básica":["7° Básico","8° Básico"]}
-    effective_levels = set(niv_req)
-
-    # Filtramos => ed_licence_level intersecte con effective_levels
-    if effective_levels:
-        subset = subset[
-            subset["ed_licence_level"].apply(
-                lambda levs: any(niv in levs for niv in effective_levels)
-            )
-        ]
+    # los criterios se evalúan como máscaras de NumPy sobre las columnas de listas codificadas
+    # una sola vez (ceas.matching); solo se arman las filas seleccionadas
+    mask = get_matcher(cleaned_applicants).mask(request)
+    return cleaned_applicants.rows(np.flatnonzero(mask))
 
-    # 3) Filtrar por subjects solo si hay algún nivel que requiera asignaturas
-    #    "Básica", "Media", "Técnico Profesional" => exigen asignaturas
-    #    "Inicial (PreKinder/Kinder)" o "Educación Diferencial" => sin asignatura => skip subject filter
-    levels_requiring_subj = {"Básica Generalista","Básica con Mención","Media","Técnico Profesional"}
-    # si intersection de effective_levels con levels_requiring_subj está vacío => skip
-    if effective_levels.intersection(levels_requiring_subj):
-        # Flatten request["asignatura"]
-        asig_val = request.get("asignatura", {})
-        requested_subjs = []
-        if isinstance(asig_val, dict):
-            for _, arr in asig_val.items():
-                requested_subjs.extend(arr)
-        elif isinstance(asig_val, list):
-            requested_subjs = asig_val
-        requested_subjs = list(set(requested_subjs))  # unique
-
-        if requested_subjs:
-            # al menos 1 coincidencia
-            subset = subset[
-                subset["subjects"].apply(
-                    lambda s: len(set(s).intersection(requested_subjs)) > 0
-                )
-            ]
 
-    # 4) Disponibilidad => "Completa" vs "Parcial"
-    disp_type = request.get("disponibilidad","Parcial")
-    days_req = request.get("dias_de_la_semana", [])
-    days_req = list(set(days_req))  # unique
-    # ordenar días de la semana
-    days_req = sorted(days_req, key=lambda x: ["Lunes","Martes","Miércoles","Jueves","Viernes"].index(x))
-    if days_req:
-        if disp_type == "Completa":
-            
-            subset = subset[
-                subset["available_days"].apply(
-                    lambda dd: all(d in dd for d in days_req)
-                )
-            ]
-        else:
+def get_decoded_requests() -> "pd.DataFrame":
+    """
+    Solicitudes de st.session_state['dfs']['requests'] decodificadas según REQUESTS_SCHEMA
+    (serialize_data.decode_frame).
 
-            subset = subset[
-                subset["available_days"].apply(
-                    lambda dd: any(d in dd for d in days_req)
-                )
-            ]
-    # 5) Filtrar por días seleccionados
-    #    (si hay días seleccionados, se filtra por ellos)
-    #    (si no hay días seleccionados, se ignora el filtro)
+    El resultado se guarda en el caché compartido con la versión de la hoja Requests, así que los
+    reruns y las demás sesiones lo reutilizan hasta que la hoja cambie. Es de solo lectura:
+    hacer .copy() antes de agregarle columnas.
+    """
+    df_requests = st.session_state['dfs']['requests']
+    sheet_name = st.session_state["app_name"] + "Requests"
+    cache = get_shared_cache()
+    version = cache.version(sheet_name)
+    entry = cache.get(sheet_name + ":decoded", version=version)
+    if entry is not None and entry[0] is df_requests:
+        return entry[1]
+    decoded = decode_frame(df_requests, REQUESTS_SCHEMA)
+    cache.put(sheet_name + ":decoded", (df_requests, decoded), version=version)
+    return decoded
+
+
+def get_batch_matches(df_requests: "pd.DataFrame"):
+    """
+    Cruza todas las solicitudes abiertas de 'df_requests' (deserializadas) con los postulantes limpios
+    de st.session_state['dfs']['cleaned_applicants'] (ver matching.match_requests).
 
+    El resultado se guarda en st.session_state['batch_matches'] y se reutiliza mientras no cambien
+    las hojas Requests ni CleanApplicants.
 
+    Returns:
+        matching.BatchMatches | None: None si no hay postulantes limpios cargados.
+    """
+    cleaned_applicants = st.session_state['dfs'].get('cleaned_applicants')
+    if cleaned_applicants is None:
+        return None
+    key = (id(st.session_state['dfs']['requests']), len(df_requests), id(cleaned_applicants))
+    cached = st.session_state.get('batch_matches')
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    t0 = time.time()
+    matches = match_requests(open_requests(df_requests), cleaned_applicants)
+    print(f"[utils] Cruce de {len(matches)} solicitudes abiertas con {len(cleaned_applicants)} postulantes en {time.time() - t0:.2f}s")
+    st.session_state['batch_matches'] = (key, matches)
+    return matches
+
+
+def get_school_comuna(school_name: str, df_schools: "pd.DataFrame") -> Union[str, None]:
+    """
+    Retorna la comuna del colegio 'school_name' según la hoja Schools (o None si no se encuentra).
+    """
+    if df_schools is None or "comuna" not in df_schools.columns or "school_name" not in df_schools.columns:
+        return None
+    match = df_schools.loc[df_schools["school_name"] == school_name, "comuna"].dropna()
+    return str(match.iloc[0]) if not match.empty else None
+
+
+def rank_applicants_by_request(request: dict, cleaned_applicants: CompactApplicants, k: int = 50,
+                               school_comuna: str = None) -> "pd.DataFrame":
+    """
+    Igual que filter_applicants_by_request, pero en vez de retornar todos los postulantes que
+    cumplen el request, retorna los 'k' con mayor puntaje de relevancia, ordenados de mayor a menor.
+
+    El puntaje (columna 'score', de 0 a 1) pondera cobertura de asignaturas y de días, años de
+    egreso y si el postulante vive en la comuna del colegio (ver ceas.matching.SCORE_WEIGHTS).
 
-    # 5) anios_egreso
-    req_anios = request.get("anios_egreso", 0)
-    if req_anios > 0:
-        subset = subset[ subset["anios_egreso"] >= req_anios ]
+    Args:
+        request (dict): mismos campos que filter_applicants_by_request.
+        cleaned_applicants (CompactApplicants): postulantes limpios (cleanup_applicants).
+        k (int): número máximo de postulantes a retornar.
+        school_comuna (str): comuna del colegio de la solicitud (ver get_school_comuna).
+
+    Returns:
+        pd.DataFrame: top-k de 'cleaned_applicants' con la columna 'score'.
+    """
+    matcher = get_matcher(cleaned_applicants)
+    mask = matcher.mask(request)
+    scores = matcher.score(request, school_comuna=school_comuna)
+    positions = top_k(scores, k, mask=mask)
+    return cleaned_applicants.rows(positions).assign(score=scores[positions].round(3))
 
-    # 6) (Comentado) Filtrar comuna_residencia => no implementado
-    # 7) (Comentado) Filtrar horarios => no implementado
 
-    return subset
 
+def gform_request_keys(df: pd.DataFrame, dayfirst: bool = False) -> np.ndarray:
+    """
+    Llave de deduplicación de cada solicitud: hash de 64 bits (pd.util.hash_pandas_object) de
+    (created_at al segundo, created_by, school_name), calculado por columnas y no fila por fila.
+    """
+    created_at = pd.to_datetime(df["created_at"], dayfirst=dayfirst, errors="coerce")
+    normalized = pd.DataFrame({
+        "created_at": created_at.dt.floor("s").astype("datetime64[ns]"),
+        "created_by": df["created_by"].astype(str),
+        "school_name": df["school_name"].astype(str),
+    })
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
 
+def existing_gform_request_keys(df_existing: pd.DataFrame) -> np.ndarray:
+    """Llaves (gform_request_keys, ordenadas y sin repetir) de las solicitudes de Requests importadas desde GForm."""
+    if df_existing.empty or "created_with" not in df_existing.columns:
+        return np.array([], dtype=np.uint64)
+    df_exist_gf = df_existing[df_existing["created_with"] == "gform"]
+    if df_exist_gf.empty:
+        return np.array([], dtype=np.uint64)
+    return np.unique(gform_request_keys(df_exist_gf))
 
 def find_unprocessed_gform_requests(
     df_gform: pd.DataFrame,
-    df_existing: pd.DataFrame
+    df_existing: pd.DataFrame,
+    existing_keys: np.ndarray = None
 ) -> pd.DataFrame:
     """
     Dado el df preprocesado de GForm y el df de solicitudes ya importadas
     (appReemplazosRequests), retorna solo las filas de GForm que aún no
     aparecen en la tabla existente, comparando por (created_at|created_by|school_name).
+
+    La comparación es un anti-join de llaves hash (gform_request_keys). Si se entregan
+    'existing_keys' (p.ej. el índice persistente de ceas.gform_ingest) no se recalculan
+    las de df_existing.
     """
-    # Extraer solo las importadas por GForm
-    df_exist_gf = df_existing[df_existing["created_with"] == "gform"].copy()
-    if df_exist_gf.empty:
+    if existing_keys is None:
+        existing_keys = existing_gform_request_keys(df_existing)
+    if len(existing_keys) == 0 or df_gform.empty:
         return df_gform.copy()
-    
-    # Normalizar timestamps y construir claves únicas
-    
-    df_exist_gf["created_at_dt"] = pd.to_datetime(
-        df_exist_gf["created_at"])
-    df_exist_gf["__key"] = df_exist_gf.apply(
-        lambda r: f"{r['created_at_dt'].strftime('%Y-%m-%d %H:%M:%S')}|{r['created_by']}|{r['school_name']}",
-        axis=1
-    )
-    existing_keys = set(df_exist_gf["__key"])
-
-    # Hacer lo mismo en el df de GForm
-    df = df_gform.copy()
-    df["created_at_dt"] = pd.to_datetime(df["created_at"], dayfirst=True, errors="coerce")
-    df["__key"] = df.apply(
-        lambda r: f"{r['created_at_dt'].strftime('%Y-%m-%d %H:%M:%S')}|{r['created_by']}|{r['school_name']}",
-        axis=1
-    )
 
+    keys = gform_request_keys(df_gform, dayfirst=True)
     # Filtrar aquellos que NO están en existing_keys
-    df_unproc = df[~df["__key"].isin(existing_keys)].copy()
-    # Limpiar columnas auxiliares
-    return df_unproc.drop(columns=["created_at_dt", "__key"])
+    return df_gform[~np.isin(keys, existing_keys)].copy()
 
 def cleanup_applicants(df):
     """
@@ -1547,172 +1621,283 @@ def cleanup_applicants(df):
     5) ed_licence_level => se crea ed_licence_level_raw con la original,
        luego se parsea por comas. 
        Se mapea con ED_MAPPING => 'Educación Media [7° a IV medio]' => 'Media', etc.
+
+    Los pasos están separados en dedupe_applicants (normaliza email/rut y quita duplicados)
+    y parse_applicant_rows (pasos 1 a 6, fila por fila), para poder limpiar solo las filas
+    nuevas (ver cleanup_applicants_incremental).
     """
+    return parse_applicant_rows(dedupe_applicants(df))
+
+
+def cleanup_applicants_incremental(df: pd.DataFrame, cache=None) -> tuple:
+    """
+    Igual que cleanup_applicants, pero solo parsea las filas nuevas o modificadas: las demás se
+    toman del caché persistente de filas limpias (ver ceas.clean_cache), indexado por el hash
+    de la fila cruda. anios_egreso se recalcula siempre (depende de la fecha de hoy).
+
+    Args:
+        df (pd.DataFrame): hoja Applicants.
+        cache (CleanRowCache): opcional; por defecto el caché del proceso.
+
+    Returns:
+        tuple: (cleaned, hashes)
+            cleaned (pd.DataFrame): mismo resultado que cleanup_applicants(df).
+            hashes (pd.Series): hash de la fila cruda de cada fila de 'cleaned' (mismo índice).
+    """
+    cache = cache or get_clean_row_cache()
+    deduped = dedupe_applicants(df)
+    translate_days = not available_days_already_parsed(deduped)
+    schema = (CLEAN_CACHE_VERSION, tuple(deduped.columns), translate_days)
+    hashes = row_hashes(deduped)
+
+    cached = cache.lookup(schema, hashes)
+    hit = hashes.isin(cached.index).to_numpy()
+    fresh = parse_applicant_rows(deduped[~hit], translate_days=translate_days)
+    if hit.any():
+        reused = cached.loc[hashes[hit].to_numpy()].set_axis(deduped.index[hit], axis=0)
+        cleaned = pd.concat([reused, fresh[reused.columns]] if len(fresh) else [reused]).loc[deduped.index]
+        if "undergrad_year" in cleaned.columns:
+            cleaned["anios_egreso"] = calc_anios_egreso(cleaned["undergrad_year"])
+    else:
+        cleaned = fresh
+    print(f"[utils] Limpieza incremental: {int((~hit).sum())} filas parseadas, {int(hit.sum())} desde el caché")
+
+    if (~hit).any() or len(cached) != len(hashes):
+        cache.update(schema, hashes, cleaned)
+        try:
+            cache.save()
+        except Exception as e:
+            print(f"[utils] No se pudo guardar el caché de limpieza: {e}")
+    return cleaned, hashes
 
 
+def dedupe_applicants(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza email y rut, y quita los postulantes duplicados por rut y por email
+    (se conserva el último registro). Retorna una copia con índice 0..n-1.
+    """
     # Copiamos df
     newdf = df.copy()
 
     
     # --- 0) Email normalization: lowercase and strip whitespace ---
     if "email" in newdf.columns:
-        newdf["email"] = newdf["email"].astype(str).str.lower().str.strip()
+        newdf["email"] = _arrow_str(newdf["email"]).str.lower().str.strip().to_numpy(dtype=object)
 
     # --- 0.b) Normalize RUT: convert to string, strip, uppercase, handle missing ---
     if "rut" in newdf.columns:
         # Fill NaN/None with empty string, then strip and uppercase
-        newdf["rut"] = newdf["rut"].fillna("").astype(str).str.strip().str.upper()
+        newdf["rut"] = _arrow_str(newdf["rut"].fillna("")).str.strip().str.upper().to_numpy(dtype=object)
         # Convert any representations of nan back to empty
         newdf.loc[newdf["rut"].isin(["NAN", "NONE"]), "rut"] = ""
     
     # --- 0.a) Remove duplicate applicants by 'rut' and by 'email', keeping last record ---
-    # drop_duplicates solo para los ruts duplicados y no nulos, conservando todos los nulos
+    # se calculan las posiciones de las filas que quedan mirando solo las llaves, y se toman
+    # todas las columnas una sola vez (iloc) en vez de filtrar y concatenar el DataFrame completo
+    positions = np.arange(len(newdf))
     if "rut" in newdf.columns :
-        nulls = newdf[newdf["rut"]==""].copy()
-        dupes = newdf[newdf["rut"] != ""].drop_duplicates(subset=["rut"], keep="last")
-        newdf = pd.concat([dupes, nulls], ignore_index=True)
+        # ruts duplicados y no nulos => el último; los nulos se conservan todos (van al final)
+        rut = newdf["rut"]
+        has_rut = (rut != "").to_numpy(dtype=bool)
+        last_rut = ~rut.duplicated(keep="last").to_numpy(dtype=bool)
+        positions = np.concatenate([np.flatnonzero(has_rut & last_rut), np.flatnonzero(~has_rut)])
 
     # Drop duplicates by 'email'
-    newdf = newdf.drop_duplicates(subset=["email"], keep="last").reset_index(drop=True)
+    emails = newdf["email"].iloc[positions].reset_index(drop=True)
+    positions = positions[~emails.duplicated(keep="last").to_numpy(dtype=bool)]
+    newdf = newdf.iloc[positions].reset_index(drop=True)
+    return newdf
+
+
+def available_days_already_parsed(df: pd.DataFrame) -> bool:
+    """True si todos los valores de available_days ya son días de cfg.DAY_MAP (no hay que parsearlos)."""
+    return "available_days" in df.columns and all(
+        day in cfg.DAY_MAP.values() for day in df["available_days"].dropna().unique()
+    )
+
+
+def _arrow_str(series: pd.Series) -> pd.Series:
+    """series.astype(str) con tipo Arrow (mismos textos que astype(str), mismo índice)."""
+    return pd.Series(series.astype(str).to_numpy(dtype=object), index=series.index).astype(ARROW_STRING)
+
+
+def _as_arrow_text(series: pd.Series) -> pd.Series:
+    """Serie de textos con tipo Arrow (las operaciones .str corren en pyarrow); lo que no es str queda nulo."""
+    if series.dtype == ARROW_STRING:
+        return series.set_axis(pd.RangeIndex(len(series)))
+    values = series.where(series.map(type) == str)
+    return pd.Series(values.to_numpy(dtype=object), index=pd.RangeIndex(len(values))).astype(ARROW_STRING)
+
+
+def _split_tokens(series: pd.Series) -> pd.Series:
+    """
+    Textos separados por comas => una fila por elemento (sin espacios, sin vacíos), con la
+    posición (0..n-1) de la fila original como índice. Los valores que no son str no aportan elementos.
+    """
+    tokens = _as_arrow_text(series).str.split(",").explode().dropna().str.strip()
+    return tokens[tokens != ""]
+
+
+def _map_tokens(tokens: pd.Series, mapping: dict) -> pd.Series:
+    """
+    tokens.map(mapping) (los que no están en 'mapping' quedan igual), con tipo Arrow.
+    Se busca cada valor distinto una vez (factorize) en vez de cada elemento.
+    """
+    codes, uniques = pd.factorize(tokens)
+    mapped = pa.array([mapping.get(value, value) for value in uniques], type=pa.string())
+    values = mapped.take(pa.array(codes)) if len(codes) else pa.array([], type=pa.string())
+    return pd.Series(pd.arrays.ArrowExtensionArray(values), index=tokens.index)
+
+
+def _collect_lists(tokens: pd.Series, n: int) -> list:
+    """
+    Inverso de _split_tokens: lista de los elementos de cada una de las 'n' filas, en orden.
+    Las listas se arman en pyarrow (un ListArray con los offsets de cada fila), no en un loop de Python.
+    """
+    counts = np.bincount(tokens.index.to_numpy(dtype=np.int64), minlength=n)
+    offsets = pa.array(np.concatenate([[0], np.cumsum(counts)]), type=pa.int32())
+    values = pa.array(tokens.astype(ARROW_STRING).array)
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    return pa.ListArray.from_arrays(offsets, values).to_pylist()
+
+
+def normalize_phones(phones: pd.Series) -> pd.Series:
+    """
+    Normaliza teléfonos chilenos a +569XXXXXXXX (ver cleanup_applicants, paso 1); NaN si no se puede.
+    """
+    digits = phones.astype(str).astype(ARROW_STRING).str.replace(r"[^0-9]", "", regex=True)
+    length = digits.str.len().to_numpy(dtype=int)
+    conditions = [
+        (length == 11) & digits.str.startswith("569").to_numpy(dtype=bool),
+        (length == 9) & digits.str.startswith("9").to_numpy(dtype=bool),
+        length == 8,
+    ]
+    # un solo prefijo por fila y una sola concatenación (en pyarrow)
+    prefix = pd.Series(np.select(conditions, ["+", "+56", "+569"], default=""), index=digits.index, dtype=ARROW_STRING)
+    normalized = np.where(np.logical_or.reduce(conditions), (prefix + digits).to_numpy(dtype=object), np.nan)
+    return pd.Series(normalized, index=phones.index, dtype=object)
+
+
+def parse_undergrad_dates(values: pd.Series) -> pd.Series:
+    """Fechas 'dd/mm/YYYY' => datetime.date (None si no se pueden leer)."""
+    text = pd.Series(values.astype(str).to_numpy(dtype=object), index=values.index).astype(ARROW_STRING).str.strip()
+    parsed = pd.to_datetime(text.to_numpy(dtype=object), format="%d/%m/%Y", errors="coerce")
+    dates = pd.Series(parsed.date, index=values.index, dtype=object).where(~parsed.isna(), None)
+    # fechas válidas fuera del rango de pd.Timestamp (p.ej. año 0001): se leen una por una
+    missing = text[parsed.isna()]
+    for label, dstr in missing[missing.str.fullmatch(r"\d{1,2}/\d{1,2}/\d{1,4}").to_numpy(dtype=bool)].items():
+        try:
+            dates.at[label] = datetime.datetime.strptime(dstr, "%d/%m/%Y").date()
+        except ValueError:
+            pass
+    return dates
+
+
+def calc_anios_egreso(dates: pd.Series) -> pd.Series:
+    """
+    Años desde la fecha de egreso (serie de datetime.date o None), según el año de hoy:
+    0 si la fecha es a futuro, NaN si no hay fecha o son más de 80 años.
+    """
+    today = pd.Timestamp(datetime.date.today())
+    stamps = pd.to_datetime(dates, errors="coerce")
+    diff = (today.year - stamps.dt.year).astype(float)
+    diff = diff.where(diff <= 80).mask(stamps > today, 0.0)
+    # fechas fuera del rango de pd.Timestamp: muy antiguas => NaN (ya lo son); a futuro => 0
+    out_of_range = stamps.isna() & dates.notna()
+    if out_of_range.any():
+        diff[out_of_range] = dates[out_of_range].map(lambda d: 0.0 if d > today.date() else np.nan)
+    return diff
+
+
+def parse_applicant_rows(newdf: pd.DataFrame, translate_days: bool = None) -> pd.DataFrame:
+    """
+    Pasos 1 a 6 de cleanup_applicants sobre postulantes ya deduplicados (dedupe_applicants).
+    Cada paso es una operación por columna (.str, pd.to_datetime, explode/isin); ninguna fila
+    se procesa con una función de Python aparte.
+    La decisión de parsear available_days ('translate_days'; None = decidir según las filas
+    de 'newdf') es la única que mira todas las filas.
+    Retorna una copia con el mismo índice.
+    """
+    newdf = newdf.copy()
+    n = len(newdf)
 
     # --- 1) PHONE normalización ---
     # Creamos 'phone_raw'
-    
     newdf["phone_raw"] = newdf["phone"].copy()
-    newdf["phone"] = newdf["phone"].astype(str).str.strip()
-
-    def normalize_phone(p):
-        if not isinstance(p, str) or not p.strip():
-            return np.nan
-        # quitar todo caracter no numérico
-        digits = re.sub(r'[^0-9]', '', p)
-        # reglas:
-        # 1) si len=11 y primeros 3='569' => '+569XXXXXXXX'
-        if len(digits) == 11 and digits.startswith("569"):
-            return f"+{digits}"
-        # 2) si len=9 y empieza con '9' => +56 + 9 => +569XXXXXXXX
-        if len(digits) == 9 and digits[0] == '9':
-            return f"+56{digits}"
-        # 3) si len=8 => +569 + 8 => +569XXXXXXXX
-        if len(digits) == 8:
-            return f"+569{digits}"
-        # en otro caso => nan
-        return np.nan
-
-    if "phone" in newdf.columns:
-        
-        # Normalizamos
-        newdf["phone"] = newdf["phone"].apply(normalize_phone)
-    else:
-        newdf["phone"] = np.nan
+    newdf["phone"] = normalize_phones(newdf["phone"])
 
     # --- 2) parse undergrad_year => date, anios_egreso => int ---
-    def parse_undergrad_date(dstr):
-        try:
-            return datetime.datetime.strptime(str(dstr).strip(), "%d/%m/%Y").date()
-        except:
-            return None
-
     if "undergrad_year" in newdf.columns:
-        newdf["undergrad_year"] = newdf["undergrad_year"].apply(parse_undergrad_date)
-    
+        newdf["undergrad_year"] = parse_undergrad_dates(newdf["undergrad_year"])
 
     # calculamos anios_egreso
-    def calc_anios_egreso(dt):
-        # dt es un date o None
-        if dt is None:
-            return None
-        today = datetime.date.today()
-        # si dt > hoy => 0
-        if dt > today:
-            return 0
-        diff = today.year - dt.year
-        # si diff > 80 => np.nan
-        if diff > 80:
-            return None
-        return diff
-    
-    newdf["anios_egreso"] = newdf["undergrad_year"].apply(calc_anios_egreso)
-    # --- 3) available_days => lista en inglés ---
-    def parse_days_and_translate(x):
-        if not isinstance(x, str) or not x.strip():
-            return []
-        # Use mapping from config
-        return [cfg.DAY_MAP.get(d.strip(), d.strip()) for d in x.split(",") if d.strip()]
+    newdf["anios_egreso"] = calc_anios_egreso(newdf["undergrad_year"])
 
-    if "available_days" in newdf.columns:
-    # check if days are written in English
-        if all(day in cfg.DAY_MAP.values() for day in newdf["available_days"].dropna().unique()):
-            # already in spanish, no need to pase
-            pass
-        else:
-            # parse days and translate
-            newdf["available_days"] = newdf["available_days"].apply(parse_days_and_translate)
-        
+    # --- 3) available_days => lista de días (cfg.DAY_MAP) ---
+    if translate_days is None:
+        translate_days = not available_days_already_parsed(newdf)
+    if "available_days" in newdf.columns and translate_days:
+        days = _split_tokens(newdf["available_days"])
+        days = _map_tokens(days, cfg.DAY_MAP)
+        newdf["available_days"] = _collect_lists(days, n)
 
-    
     # --- 4) parse subjects => keep raw, filtrar en lista permitida ---
     if "subjects" not in newdf.columns:
-        newdf["subjects"] = [[] for _ in range(len(newdf))]
-        newdf["subjects_raw"] = ["" for _ in range(len(newdf))]
+        newdf["subjects"] = [[] for _ in range(n)]
+        newdf["subjects_raw"] = ["" for _ in range(n)]
     else:
         # Guardamos columna original
         newdf["subjects_raw"] = newdf["subjects"].copy()
-
-        def parse_subjects_and_unparsed(subj_str):
-            """
-            Devuelve una tupla (parsed, unparsed) donde:
-              - parsed   -> lista de asignaturas válidas según cfg.ALLOWED_SUBJECTS + SPECIAL_SUBJECT
-              - unparsed -> lista de chunks que no se reconocieron
-            """
-            if not isinstance(subj_str, str) or not subj_str.strip():
-                return [], []
-
-            cleaned   = []
-            unparsed  = []
-
-            special = cfg.SPECIAL_SUBJECT
-
-            # Caso especial (contiene una coma interna)
-            if special in subj_str:
-                cleaned.append(special)
-                subj_str = subj_str.replace(special, "")
-
-            # Procesamos el resto por comas
-            for chunk in [s.strip() for s in subj_str.split(",") if s.strip()]:
-                if chunk in cfg.ALLOWED_SUBJECTS:
-                    cleaned.append(chunk)
-                else:
-                    unparsed.append(chunk)
-            return cleaned, unparsed
-
-        # Aplicamos la función y separamos en dos columnas
-        parsed_series = newdf["subjects"].apply(parse_subjects_and_unparsed)
-        newdf["subjects"] = parsed_series.apply(lambda t: t[0])
-        newdf["unparseable_subjects"] = parsed_series.apply(lambda t: t[1])
+        special = cfg.SPECIAL_SUBJECT
+        text = _as_arrow_text(newdf["subjects"])
+        # Caso especial (contiene una coma interna): va primero y se quita del texto
+        has_special = text.str.contains(special, regex=False).fillna(False).to_numpy(dtype=bool)
+        chunks = _split_tokens(text.str.replace(special, "", regex=False))
+        allowed = chunks.isin(list(cfg.ALLOWED_SUBJECTS)).to_numpy(dtype=bool)
+        specials = pd.Series(special, index=np.flatnonzero(has_special), dtype=ARROW_STRING)
+        parsed = pd.concat([specials, chunks[allowed]]).sort_index(kind="stable")
+        newdf["subjects"] = _collect_lists(parsed, n)
+        newdf["unparseable_subjects"] = _collect_lists(chunks[~allowed], n)
 
     # --- 5) ed_licence_level => keep raw, map con ED_MAPPING ---
     if "ed_licence_level" not in newdf.columns:
-        newdf["ed_licence_level"] = [[] for _ in range(len(newdf))]
-        newdf["ed_licence_level_raw"] = ["" for _ in range(len(newdf))]
+        newdf["ed_licence_level"] = [[] for _ in range(n)]
+        newdf["ed_licence_level_raw"] = ["" for _ in range(n)]
     else:
         newdf["ed_licence_level_raw"] = newdf["ed_licence_level"].copy()
-       
-        def parse_ed_level(ed_str):
-            if not isinstance(ed_str, str) or not ed_str.strip():
-                return []
-            return [
-                cfg.ED_MAPPING[chunk.strip()]
-                for chunk in ed_str.split(",")
-                if chunk.strip() in cfg.ED_MAPPING.keys()
-            ]
-        newdf["ed_licence_level"] = newdf["ed_licence_level"].apply(parse_ed_level)
-    
+        levels = _split_tokens(newdf["ed_licence_level"])
+        levels = _map_tokens(levels[levels.isin(list(cfg.ED_MAPPING.keys())).to_numpy(dtype=bool)], cfg.ED_MAPPING)
+        newdf["ed_licence_level"] = _collect_lists(levels, n)
+
     # --- 6) full_name of applicant ---
     newdf["full_name"] = newdf["first_name"].astype(str) + " " + newdf["last_name"].astype(str)
 
     return newdf
 
+
+def load_applicant_raw_columns(emails, df_applicants: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Copias crudas de cleanup_applicants (applicant_table.RAW_COLUMNS: phone_raw, subjects_raw,
+    ed_licence_level_raw) de los postulantes 'emails'. La tabla de postulantes de la sesión no las
+    guarda; se leen de la hoja Applicants solo cuando se piden.
+
+    Args:
+        emails (list): emails de postulantes limpios (ya normalizados por dedupe_applicants).
+        df_applicants (pd.DataFrame): hoja Applicants; por defecto st.session_state['dfs']['applicants'].
+
+    Returns:
+        pd.DataFrame: una fila por email (en el orden de 'emails', NaN si no está), índice = email.
+    """
+    if df_applicants is None:
+        df_applicants = st.session_state['dfs']['applicants']
+    deduped = dedupe_applicants(df_applicants)
+    raw = pd.DataFrame(
+        {raw_col: deduped[col].to_numpy() if col in deduped.columns else "" for raw_col, col in RAW_COLUMNS.items()},
+        index=deduped["email"],
+    )
+    return raw.reindex(pd.Index(emails, name="email"))
+
 # transformar listas en dummies
 def transform_list_to_dummies(df, column_name, prefix):
     """
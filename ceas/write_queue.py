@@ -0,0 +1,216 @@
+"""
+write_queue.py
+
+Cola de escritura en segundo plano (write-behind) para agregar filas a las hojas.
+
+Registrar un envío de correo (SentCVs + EmailLog) no debe bloquear la interfaz esperando a
+Google Sheets. Con esta cola:
+  - enqueue() guarda la mutación en un journal local (JSONL, con fsync) y retorna de inmediato.
+  - Un thread en segundo plano agrupa las mutaciones pendientes por (conexión, hoja) y las envía
+    con un único append_rows por hoja. Los reintentos ante errores transitorios (429, 5xx, red) los
+    hace el limitador de la service account (rate_limit.call_with_retry); la cola no reintenta.
+  - Si el lote falla igual, sus mutaciones pasan a la lista de fallidas (dead letters), que se
+    guarda en el journal y se muestra en Ajustes, desde donde se pueden volver a encolar.
+  - Cuando una mutación se escribe en Sheets, se marca como hecha en el journal; al iniciar el
+    proceso se vuelven a encolar las que quedaron sin marcar (p.ej. si el proceso se cayó).
+
+La entrega es "al menos una vez": si el proceso se cae justo después de escribir en Sheets y antes
+de marcar la mutación, se escribirá de nuevo al reiniciar. Por eso solo se usa para hojas de
+registro donde un duplicado es inofensivo (SentCVs se deduplica al leer).
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+import streamlit as st
+from streamlit_gsheets import GSheetsConnection
+
+from ceas import config as cfg
+from ceas.connections_manager import get_connection_pool
+from ceas.sheets_manager import append_rows, to_cell
+
+# segundos entre intentos de vaciar la cola (también se vacía apenas llega una mutación)
+FLUSH_INTERVAL = 2.0
+
+
+class WriteBehindQueue:
+    """
+    Cola de mutaciones "append" por (conexión, hoja), persistida en un journal JSONL.
+
+    Cada línea del journal es una mutación {"id", "conn", "worksheet", "rows"} (con "error" si es
+    una fallida) o una marca de mutaciones ya escritas {"done": [ids]}.
+    """
+
+    def __init__(self, journal_path=None, conn_factory=None, flush_interval: float = FLUSH_INTERVAL):
+        self.journal_path = journal_path or cfg.INTERIM_DATA_DIR / "write_queue.jsonl"
+        self.flush_interval = flush_interval
+        # crea la conexión a partir de su nombre (en secrets) cuando no se entregó el objeto
+        self._conn_factory = conn_factory or (
+            lambda name: get_connection_pool().track(name, st.connection(name, type=GSheetsConnection))
+        )
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = []  # mutaciones aún no escritas en Sheets
+        self._dead = []  # mutaciones cuyo lote falló (no se reintentan solas)
+        self._connections = {}  # nombre -> GSheetsConnection
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        self._replay()
+        self._thread = threading.Thread(target=self._run, name="write-behind-queue", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------ journal
+    def _write_journal(self, record: dict) -> None:
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay(self) -> None:
+        """Vuelve a encolar las mutaciones del journal que no se alcanzaron a escribir."""
+        if not os.path.exists(self.journal_path):
+            return
+        entries, done = [], set()
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # última línea incompleta (caída a mitad de escritura)
+                    continue
+                if "done" in record:
+                    done.update(record["done"])
+                else:
+                    entries.append(record)
+        entries = [e for e in entries if e["id"] not in done]
+        self._pending = [e for e in entries if "error" not in e]
+        self._dead = [e for e in entries if "error" in e]
+        self._compact()
+        if self._pending:
+            print(f"[write_queue] {len(self._pending)} escrituras pendientes recuperadas del journal")
+        if self._dead:
+            print(f"[write_queue] {len(self._dead)} escrituras fallidas en el journal (ver Ajustes)")
+
+    def _compact(self) -> None:
+        """Reescribe el journal solo con las mutaciones pendientes y las fallidas."""
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._pending + self._dead:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    # ------------------------------------------------------------------ API
+    def enqueue(self, conn_name: str, worksheet: str, rows: list, conn=None) -> str:
+        """
+        Encola filas para agregar al final de 'worksheet'. Retorna apenas la mutación
+        queda guardada en el journal.
+
+        Args:
+            conn_name (str): nombre de la conexión en secrets (para recrearla al reiniciar).
+            worksheet (str): nombre de la hoja.
+            rows (list[dict] | pd.DataFrame): filas a agregar.
+            conn (GSheetsConnection): opcional, la conexión ya creada por el llamador.
+
+        Returns:
+            str: id de la mutación.
+        """
+        if hasattr(rows, "to_dict"):
+            rows = rows.to_dict(orient="records")
+        entry = {
+            "id": uuid.uuid4().hex,
+            "conn": conn_name,
+            "worksheet": worksheet,
+            "rows": [{str(k): to_cell(v) for k, v in row.items()} for row in rows],
+        }
+        with self._lock:
+            if conn is not None:
+                self._connections[conn_name] = conn
+            self._write_journal(entry)
+            self._pending.append(entry)
+        self._wakeup.set()
+        return entry["id"]
+
+    def pending_rows(self, worksheet: str) -> list:
+        """Filas encoladas para 'worksheet' que aún no se escriben en Sheets (incluye las fallidas)."""
+        with self._lock:
+            return [
+                row for e in self._pending + self._dead if e["worksheet"] == worksheet for row in e["rows"]
+            ]
+
+    def dead_letters(self) -> list:
+        """Mutaciones fallidas: [{"id", "conn", "worksheet", "rows", "error"}]."""
+        with self._lock:
+            return [dict(e) for e in self._dead]
+
+    def retry_dead_letters(self) -> int:
+        """Vuelve a encolar las mutaciones fallidas. Retorna cuántas se encolaron."""
+        with self._lock:
+            retried = [{k: v for k, v in e.items() if k != "error"} for e in self._dead]
+            self._dead = []
+            self._pending.extend(retried)
+            self._compact()
+        self._wakeup.set()
+        return len(retried)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Pide vaciar la cola y espera hasta 'timeout' segundos. Retorna True si quedó vacía."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._wakeup.set()
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+
+    # ------------------------------------------------------------------ worker
+    def _get_connection(self, name: str):
+        if name not in self._connections:
+            self._connections[name] = self._conn_factory(name)
+        return self._connections[name]
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._flush_once()
+            except Exception as e:
+                print(f"[write_queue] Error al vaciar la cola: {e}")
+
+    def _flush_once(self) -> None:
+        # agrupar por (conexión, hoja): un solo append_rows por hoja con todas sus filas
+        with self._lock:
+            batches = {}
+            for entry in self._pending:
+                batches.setdefault((entry["conn"], entry["worksheet"]), []).append(entry)
+        for (conn_name, worksheet), entries in batches.items():
+            rows = [row for e in entries for row in e["rows"]]
+            ids = {e["id"] for e in entries}
+            try:
+                append_rows(self._get_connection(conn_name), worksheet, rows)
+            except Exception as e:
+                # los errores transitorios ya se reintentaron en rate_limit.call_with_retry
+                print(f"[write_queue] {worksheet}: error al escribir ({e}); {len(entries)} mutaciones pasan a fallidas")
+                with self._lock:
+                    self._dead.extend({**entry, "error": str(e)} for entry in entries)
+                    self._pending = [p for p in self._pending if p["id"] not in ids]
+                    self._compact()
+                continue
+            with self._lock:
+                self._write_journal({"done": sorted(ids)})
+                self._pending = [e for e in self._pending if e["id"] not in ids]
+                if not self._pending:
+                    self._compact()
+            print(f"[write_queue] {worksheet}: {len(rows)} filas escritas ({len(entries)} mutaciones)")
+
+
+@st.cache_resource
+def get_write_queue() -> WriteBehindQueue:
+    """Cola del proceso: un solo thread y un solo journal para las escrituras de todas las sesiones."""
+    return WriteBehindQueue()
@@ -1,5 +1,7 @@
 import streamlit as st
+import pandas as pd
 from ceas.utils import cleanup_applicants
+from ceas.write_queue import get_write_queue
 st.title("Ajustes")
 
 # Verificar permisos
@@ -9,14 +11,35 @@ if st.session_state.role not in ["owner", "admin"]:
 
 # Configuración de ajustes
 st.write("Aquí puedes configurar los ajustes de la aplicación.")
+# tiempos de la carga inicial (ver ceas/startup.py)
+if st.session_state.get("startup_timings"):
+    st.write("Tiempos de carga inicial (segundos):")
+    st.dataframe(
+        pd.Series(st.session_state["startup_timings"], name="segundos").sort_values(ascending=False)
+    )
+# escrituras en segundo plano que fallaron (ver ceas/write_queue.py)
+write_queue = get_write_queue()
+dead_letters = write_queue.dead_letters()
+if dead_letters:
+    st.warning(f"{len(dead_letters)} escrituras en segundo plano fallaron y no se guardaron en Google Sheets.")
+    st.dataframe(pd.DataFrame([
+        {"hoja": e["worksheet"], "conexión": e["conn"], "filas": len(e["rows"]), "error": e["error"]}
+        for e in dead_letters
+    ]))
+    if st.button("Reintentar escrituras fallidas"):
+        write_queue.retry_dead_letters()
+        st.rerun()
 # mostrar st.session_state['dfs']['requests']
 st.write("DataFrame de cleaned_applicants:")
-df_a = st.session_state['dfs']['cleaned_applicants'].copy()
+# la tabla es compartida entre sesiones (ver ceas/applicant_table.py): solo se lee
+compact = st.session_state['dfs']['cleaned_applicants']
+st.write(f"Memoria: {compact.memory_bytes() / 1e6:.1f} MB (tabla compacta, {len(compact)} postulantes)")
 
+df_a = compact.rows()
 st.dataframe(df_a)
 st.divider()
 for col in df_a.columns:
-    st.write(f"Columna: {col}")
+    st.write(f"Columna: {col} ({compact.frame[col].dtype if col in compact.frame.columns else 'bitmask'})")
     st.write(df_a[col].apply(type).value_counts())
     
 # mostrar todas las st.session_state
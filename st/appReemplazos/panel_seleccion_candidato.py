@@ -14,7 +14,10 @@ from jinja2 import Environment, FileSystemLoader, select_autoescape
 from ceas.utils import (
     create_columns_panel,
     on_enviar_correo,
-    filter_applicants_by_request,
+    rank_applicants_by_request,
+    load_applicant_raw_columns,
+    get_school_comuna,
+    get_decoded_requests,
     cleanup_applicants,
     render_cascade_filters,
     build_selector_definitions,
@@ -27,6 +30,8 @@ from ceas.utils import (
 # --- Ensure these imports for cascade filters and request formatting ---
 from ceas.serialize_data import deserialize_request_from_sheets, format_request_for_panel_display,format_candidates_for_panel_display, format_request_data_for_email
 from ceas.utils import render_cascade_filters, build_selector_definitions, filter_df_by_filters
+from ceas.duckdb_mirror import filter_applicants, sync_mirror
+from ceas.matching import get_applicant_index
 # --- Extra imports for email dialog ---
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 if "cv_cache" not in st.session_state:
@@ -38,6 +43,7 @@ if "sent_cvs" not in st.session_state:
     st.session_state["sent_cvs"] = {
         rid: set(grp["email"]) for rid, grp in df_log.groupby("replacement_id")
     }
+    sync_mirror(st.session_state['dfs'], extra={"SentCVs": df_log})
 def drive_to_download(url: str) -> str:
     """
     Convierte diferentes formatos de Google Drive a link de descarga directa.
@@ -296,7 +302,7 @@ def panel(solicitud):
     st.session_state["request"] = data
     #print(data)
 
-    # 2. Cargar datos de los candidatos
+    # 2. Cargar datos de los candidatos (tabla compacta, compartida entre sesiones; ver ceas/applicant_table.py)
     df_applicants = st.session_state['dfs']['cleaned_applicants']
     # --- Selector de modo: automático (por solicitud) o manual ---
     manual_mode = st.toggle("Selección manual de candidatos", value=False, key="sel_manual_toggle")
@@ -304,12 +310,13 @@ def panel(solicitud):
     if manual_mode:
         # ===== MODO MANUAL =====
         st.info("Filtra candidatos manualmente.")
-        # Opciones dinámicas
-        subj_options = sorted({s for sublist in df_applicants["subjects"] for s in sublist})
-        ed_options   = sorted({e for edlist in df_applicants["ed_licence_level"] for e in edlist})
-        uni_options  = sorted(df_applicants["university"].dropna().unique())
-        gen_options  = ["Indiferente"] + sorted(df_applicants["genero"].dropna().unique())
-        com_options  = sorted(df_applicants["comuna_residencia"].dropna().unique())
+        # Opciones dinámicas (desde el índice invertido, construido una vez por versión de postulantes)
+        applicant_index = get_applicant_index(df_applicants)
+        subj_options = applicant_index.options("subjects")
+        ed_options   = applicant_index.options("ed_licence_level")
+        uni_options  = applicant_index.options("university")
+        gen_options  = ["Indiferente"] + applicant_index.options("genero")
+        com_options  = applicant_index.options("comuna_residencia")
 
         c1,c2,c3 = st.columns(3)
         with c1:
@@ -321,22 +328,15 @@ def panel(solicitud):
         with c3:
             sel_gen      = st.selectbox("Género", gen_options, key="manual_gen")
 
-        # Filtrado
-        df_manual = df_applicants.copy()
-        if sel_subjects:
-            df_manual = df_manual[
-                df_manual["subjects"].apply(lambda ss: any(s in ss for s in sel_subjects))
-            ]
-        if sel_ed:
-            df_manual = df_manual[
-                df_manual["ed_licence_level"].apply(lambda ee: any(e in ee for e in sel_ed))
-            ]
-        if sel_unis:
-            df_manual = df_manual[df_manual["university"].isin(sel_unis)]
-        if sel_comunas:
-            df_manual = df_manual[df_manual["comuna_residencia"].isin(sel_comunas)]
-        if sel_gen != "Indiferente":
-            df_manual = df_manual[df_manual["genero"] == sel_gen]
+        # Filtrado: intersección de las listas del índice invertido (OR dentro de cada campo)
+        positions = applicant_index.search(any_of={
+            "subjects": sel_subjects,
+            "ed_licence_level": sel_ed,
+            "university": sel_unis,
+            "comuna_residencia": sel_comunas,
+            "genero": [sel_gen] if sel_gen != "Indiferente" else [],
+        })
+        df_manual = df_applicants.rows(positions)
 
         # --- Métrica: número de candidatos filtrados ---
         st.metric("Candidatos encontrados", len(df_manual))
@@ -344,7 +344,12 @@ def panel(solicitud):
         
 
 
-        st.dataframe(df_manual)
+        # las columnas crudas (phone_raw, subjects_raw, ...) no están en la tabla: se leen de Applicants al pedirlas
+        if st.checkbox("Mostrar columnas originales", value=False, key="manual_raw_cols"):
+            raw = load_applicant_raw_columns(df_manual["email"])
+            st.dataframe(df_manual.assign(**{col: raw[col].to_numpy() for col in raw.columns}))
+        else:
+            st.dataframe(df_manual)
 
         st.divider()
 
@@ -424,7 +429,10 @@ def panel(solicitud):
             comentario = st.text_area("Comentarios", value="", disabled=False )
             if st.button("Guardar comentario", key="guardar_comentario"):
                 # Guardar comentario en la base de datos
-                st.session_state['dfs']['requests'].loc[st.session_state['dfs']['requests']['replacement_id'] == int(solicitud), 'comentarios'] = comentario
+                # (se copia antes de modificar: el DataFrame es compartido entre sesiones, ver ceas/shared_cache.py)
+                df_req = st.session_state['dfs']['requests'].copy()
+                df_req.loc[df_req['replacement_id'] == int(solicitud), 'comentarios'] = comentario
+                st.session_state['dfs']['requests'] = df_req
                 st.success("Comentario guardado.")
         st.divider()
 
@@ -532,7 +540,19 @@ def panel(solicitud):
         mod_req["asignatura"] = subject
         mod_req["nivel_educativo"] = nivel
         mod_req["dias_de_la_semana"] = dias_seleccionados
-        df_filtered_applicants = filter_applicants_by_request(mod_req, cleaned_applicants)
+        # --- Orden por relevancia: solo los k mejores según su puntaje ---
+        c_rank, c_k = st.columns([0.3, 0.7])
+        with c_rank:
+            rank_mode = st.toggle("Ordenar por relevancia", value=False, key="rank_mode_toggle")
+        if rank_mode:
+            with c_k:
+                k_top = st.number_input("Mostrar los mejores", min_value=5, max_value=500, value=50, step=5, key="rank_top_k")
+            school_comuna = get_school_comuna(req.get("school_name"), st.session_state['dfs'].get('schools'))
+            df_filtered_applicants = rank_applicants_by_request(
+                mod_req, cleaned_applicants, k=int(k_top), school_comuna=school_comuna
+            )
+        else:
+            df_filtered_applicants = filter_applicants(mod_req, cleaned_applicants)
         # --- Métrica: número de candidatos filtrados ---
         st.metric("Candidatos encontrados", len(df_filtered_applicants))
         df_filtered_applicants_formatted = format_candidates_for_panel_display(df_filtered_applicants)
@@ -554,6 +574,11 @@ def panel(solicitud):
                 if df_filtered_applicants_formatted["Enviado"].eq("Sí").any()
                 else []
             ),
+            *(
+                [{"header": "Puntaje", "field": "score", "type": "text", "width": 0.5}]
+                if "score" in df_filtered_applicants_formatted.columns
+                else []
+            ),
             {"header": "Email", "field": "email", "type": "text", "width": 2},
             {"header": "Nombre", "field": "full_name", "type": "text", "width": 1},
             {"header": "Teléfono", "field": "phone", "type": "text", "width": 1},
@@ -571,6 +596,8 @@ def panel(solicitud):
         col_headers = [c["header"] for c in available_columns[1:]]
         # Determinar columnas por defecto
         default_cols_base = ["Email", "Nombre", "Asignaturas", "Comuna", "CV"]
+        if "score" in df_filtered_applicants_formatted.columns:
+            default_cols_base = ["Puntaje"] + default_cols_base
         if any(c["header"] == "Enviado" for c in available_columns):
             default_cols = ["Enviado"] + default_cols_base
         else:
@@ -627,13 +654,12 @@ def run():
     elif "request_id" not in st.session_state or st.session_state["request_id"] is None:
         st.markdown("## Selecciona una solicitud")
         # --- Cargar y deserializar todas las solicitudes ---
-        raw_req = st.session_state['dfs']['requests'].copy()
-        if raw_req.empty:
+        if st.session_state['dfs']['requests'].empty:
             st.info("No hay solicitudes disponibles.")
             st.stop()
 
-        df_requests = pd.DataFrame([deserialize_request_from_sheets(r)
-                                    for r in raw_req.to_dict(orient="records")])
+        # solicitudes decodificadas (memoizadas por versión de la hoja); copia para agregarle columnas
+        df_requests = get_decoded_requests().copy()
         df_requests = format_request_for_panel_display(df_requests)
 
         # --- Filtros en cascada (simples) ---
@@ -7,12 +7,13 @@ import datetime
 from ceas.utils import (
     create_columns_panel,
     create_request_dict_from_gform,
-    get_preprocessed_gform_requests,
-    find_unprocessed_gform_requests,
-    create_replacement_request,
+    create_replacement_requests,
     render_manage_button,
+    get_batch_matches,
+    get_decoded_requests,
 )
-from ceas.serialize_data import deserialize_request_from_sheets, format_request_for_panel_display
+from ceas.serialize_data import format_request_for_panel_display
+from ceas.gform_ingest import sync_gform_requests
 import pandas as pd
 # Importar la función de filtros dinámicos
 from ceas.utils import build_selector_definitions, render_selectors, filter_df_by_filters
@@ -32,23 +33,32 @@ def importar_nuevas_solicitudes():
 
     elif n_new > 0:
         if st.button(f"Importar solicitudes de Google Forms ({n_new})", disabled=False, key="import_gform"):
-            # 1) Preprocesar GForm
-            df_gform = get_preprocessed_gform_requests()
-            # 2) Filtrar sólo las no procesadas
-            df_to_import = find_unprocessed_gform_requests(df_gform, st.session_state["dfs"]["requests"])
-            added = 0
-            for row in df_to_import.to_dict(orient="records"):
-                req = create_request_dict_from_gform(row)
-                success, new_df = create_replacement_request(req, st.session_state["dfs"]["requests"])
-                if success:
-                    added += 1
-                    st.session_state["dfs"]["requests"] = new_df
-                    st.session_state["n_new_gform"] -= 1
-            if added > 0 and st.session_state["n_new_gform"] == 0:
+            # 1-2) Leer y preprocesar solo las respuestas nuevas del GForm (marca de agua) y
+            # quedarse con las que no están importadas
+            df_to_import = sync_gform_requests(st.session_state["dfs"]["requests"])
+            # 3) Crear todas las solicitudes con una sola escritura; las filas con error no detienen el lote
+            rows = df_to_import.to_dict(orient="records")
+            request_dicts = []
+            build_errors = []
+            for row in rows:
+                try:
+                    request_dicts.append(create_request_dict_from_gform(row))
+                except Exception as e:
+                    build_errors.append((row, [f"No se pudo leer la respuesta del formulario: {e}"]))
+            n_before = len(st.session_state["dfs"]["requests"])
+            new_df, errors = create_replacement_requests(request_dicts, st.session_state["dfs"]["requests"])
+            st.session_state["dfs"]["requests"] = new_df
+            added = len(new_df) - n_before
+            st.session_state["n_new_gform"] = max(0, st.session_state["n_new_gform"] - added)
+            failed = build_errors + [(request_dicts[pos], msgs) for pos, msgs in errors.items()]
+            for row, msgs in failed:
+                st.warning(f"No se importó la solicitud de {row.get('created_by')} ({row.get('school_name')}): {'; '.join(msgs)}")
+            if added > 0:
                 st.success(f"{added} solicitudes importadas.")
-                time.sleep(3)
-                st.rerun()
-            else:
+                if not failed:
+                    time.sleep(3)
+                    st.rerun()
+            elif not failed:
                 st.info("No hay nuevas solicitudes para importar.")
 
 
@@ -68,16 +78,20 @@ def panel_solicitudes_reemplazo(rol,institucion):
         # -- Importar nuevas solicitudes desde Google Form --
         importar_nuevas_solicitudes()
         # -- Fin de importación --
-        # leer datos completos
-        df_requests_serialized = st.session_state['dfs']['requests'].copy()
         # si df_requests está vacío, mostrar un mensaje de error
-        if df_requests_serialized.empty:
+        if st.session_state['dfs']['requests'].empty:
             st.error("No hay solicitudes de reemplazo disponibles.")
             st.stop()
 
-        df_requests = pd.DataFrame([deserialize_request_from_sheets(row) for row in df_requests_serialized.to_dict(orient="records")])
+        # solicitudes decodificadas (memoizadas por versión de la hoja); copia para agregarle columnas
+        df_requests = get_decoded_requests().copy()
         # adecuamos algunos campos para que sean más legibles
         df_requests = format_request_for_panel_display(df_requests)
+        # candidatos disponibles por solicitud (cruce masivo de solicitudes abiertas x postulantes)
+        batch_matches = get_batch_matches(df_requests)
+        if batch_matches is not None:
+            n_candidatos = df_requests["replacement_id"].map(batch_matches.count_by_request())
+            df_requests["candidatos_f"] = n_candidatos.apply(lambda x: f"{int(x)} candidatos" if pd.notna(x) else "")
         
         # Toggle for cascading filters
         cascade_mode = st.checkbox("Filtros en cascada", value=True, key="cascade_mode")
@@ -143,6 +157,8 @@ def panel_solicitudes_reemplazo(rol,institucion):
             "fecha_fin":{"header":"Fecha Fin",  "field":"fecha_fin",  "type":"text", "width":0.75},
             "comentarios":{"header":"Comentarios",  "field":"comentarios",  "type":"text", "width":1},
         }
+        if "candidatos_f" in df_requests.columns:
+            columns_info_dict["candidatos_f"] = {"header":"Candidatos",  "field":"candidatos_f",  "type":"text", "width":0.75}
 
 
 
@@ -19,7 +19,7 @@ st.dataframe(st.session_state['dfs']['applicants'])
 # Validar candidato
 email = st.text_input("Email del candidato a validar")
 if st.button("Validar Candidato"):
-    success, df_candidates = schools_manager.validate_candidate(email, st.session_state['dfs']['applicants'])
+    success, df_candidates = schools_manager.validate_candidate(email, st.session_state['dfs']['applicants'].copy())
     if success:
         st.success("Candidato validado exitosamente")
     else:
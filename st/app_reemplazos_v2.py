@@ -1,14 +1,21 @@
 
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
 import pandas as pd
-import random
 import pickle
 import json
+import time
 from ceas import config as cfg
 from ceas.utils import create_clean_applicants_sheet
 from ceas.serialize_data import read_all_dataframes
-from ceas.utils import get_preprocessed_gform_requests, find_unprocessed_gform_requests
+from ceas.utils import find_unprocessed_gform_requests
+from ceas.startup import run_startup_tasks
+from ceas.shared_cache import get_shared_cache
+from ceas.duckdb_mirror import sync_mirror
+from ceas.connections_manager import get_pooled_connection
+from ceas.applicant_table import CompactApplicants
+from ceas.matching import get_applicant_index, get_matcher
+from ceas.applicants_worker import load_latest_clean_applicants
+from ceas.gform_ingest import sync_gform_requests
 
 # ---- Modularized Initialization ----
 
@@ -60,27 +67,38 @@ def initialize_session_state():
     st.session_state['asignaturas_por_nivel_educativo'] = cfg.ASIGNATURAS_POR_NIVEL_EDUCATIVO
 
 
-def load_dataframes():
+def read_app_dataframes() -> dict:
     """
-    Load all required Google Sheets into session_state['dfs'].
+    Read all required Google Sheets and return them as {simplified_key: df}.
+    Sheets already in the process-wide shared cache are reused (same DataFrame object,
+    treat as read-only); only the missing ones are read from Google Sheets.
     """
-    random_conn = random.choice(st.session_state['connections'])
-    conn = st.connection(random_conn, type=GSheetsConnection)
-    dfs = read_all_dataframes(st.session_state['sheet_names'], connection=conn)
+    cache = get_shared_cache()
+    dfs, misses = cache.get_many(st.session_state['sheet_names'])
+    if misses:
+        conn = get_pooled_connection()
+        for sheet_name, df in read_all_dataframes(misses, connection=conn).items():
+            cache.put(sheet_name, df)
+            dfs[sheet_name] = df
+    print(f"{len(dfs) - len(misses)} hojas desde el caché compartido, {len(misses)} desde Google Sheets")
     # simplify keys
-    st.session_state['dfs'] = {
+    return {
         k.replace(st.session_state["app_name"], "").lower(): v
         for k, v in dfs.items()
     }
+
+
 def clean_applicants():
     """
     Clean the applicants dataframe and save it to session state.
     """
     # Clean applicants
-    cleaned,df_serialized_cleaned = create_clean_applicants_sheet(st.session_state['dfs']['applicants'],write_to_gsheet=True)
+    cleaned, _ = create_clean_applicants_sheet(st.session_state['dfs']['applicants'],write_to_gsheet=True)
     #print(cleaned.shape[0], "applicants cleaned", "from", st.session_state['dfs']['applicants'].shape[0])
-    st.session_state['dfs']['cleaned_applicants'] = cleaned
-    st.session_state['dfs']['cleaned_applicants_serialized'] = df_serialized_cleaned
+    # en la sesión solo queda la tabla compacta; el DataFrame limpio y su versión serializada
+    # solo se usan para escribir CleanApplicants
+    st.session_state['dfs']['cleaned_applicants'] = CompactApplicants(cleaned)
+    st.session_state['dfs']['cleaned_applicants_serialized'] = None
     # create_clean_applicants_sheet
     print(cleaned.shape[0], "applicants cleaned", "from", st.session_state['dfs']['applicants'].shape[0])
 
@@ -152,25 +170,33 @@ def configure_pages():
     return page_dict
 
 
-def check_new_gform_requests():
+def count_new_gform_requests(df_gform=None, existing=None) -> int:
+    """
+    Cuenta las solicitudes de GForm que aún no están importadas en Requests.
+    Si no se entrega df_gform (preprocesado), se leen solo las respuestas nuevas desde la última
+    sincronización (ceas.gform_ingest). Si no se entrega existing, se lee Requests desde gsheets.
+    """
+    # 1) Obtener df de solicitudes ya importadas desde gsheets
+    if existing is None:
+        conn = get_pooled_connection(max_entries=1)
+        existing = conn.read(worksheet=st.session_state['app_name'] + "Requests")
+
+    # 2) Encontrar no procesadas (por defecto, de forma incremental con la marca de agua)
+    if df_gform is None:
+        return sync_gform_requests(existing).shape[0]
+    df_unproc = find_unprocessed_gform_requests(df_gform, existing)
+    return df_unproc.shape[0]
+
+
+def check_new_gform_requests(n_new: int = None):
     """
     Al iniciar sesión, calcula cuántas solicitudes nuevas hay en GForm
     y dispara un diálogo si hay (>0). Guarda el conteo y la confirmación
     en session_state.
+    Si n_new ya fue calculado (p.ej. en startup_load), no se vuelve a leer GForm.
     """
-    # 1) Obtener y preprocesar GForm
-    df_gform = get_preprocessed_gform_requests()
-
-    # 2) Obtener df de solicitudes ya importadas desde gsheets
-    random_conn = random.choice(st.session_state['connections'])
-    conn = st.connection(random_conn, type=GSheetsConnection,max_entries=1)
-    existing = conn.read(worksheet=st.session_state['app_name'] + "Requests")
-
-
-
-    # 3) Encontrar no procesadas
-    df_unproc = find_unprocessed_gform_requests(df_gform, existing)
-    n_new = df_unproc.shape[0]
+    if n_new is None:
+        n_new = count_new_gform_requests()
 
     # 4) Guardar el conteo (puede usarse en otros lugares)
     st.session_state["n_new_gform"] = n_new
@@ -191,6 +217,68 @@ def check_new_gform_requests():
         _dialog()
 
 
+def startup_load():
+    """
+    Carga inicial al iniciar sesión, en dos etapas:
+      1) lectura de las hojas de la app (una request en lote, en el thread principal)
+      2) lectura de los postulantes limpios || lectura de las respuestas GForm nuevas (desde la
+         marca de agua, ver ceas.gform_ingest) y conteo de las que faltan por importar, en un
+         pool de threads acotado (ceas.startup.run_startup_tasks)
+    Los postulantes los limpia el worker (ceas.applicants_worker); aquí solo se lee su último
+    resultado. Solo si no hay ninguno se limpia en el login (primera vez).
+    Los tiempos de cada tarea quedan en session_state['startup_timings'].
+    Retorna el número de solicitudes GForm nuevas.
+    """
+    # Etapa 1: hojas de la app (las demás tareas dependen de ellas)
+    t0 = time.perf_counter()
+    st.session_state['dfs'] = read_app_dataframes()
+    timings = {"load_dataframes": time.perf_counter() - t0}
+    print(f"[startup] load_dataframes: {timings['load_dataframes']:.2f}s")
+    print({k: v.shape[0] for k, v in st.session_state['dfs'].items()}, "filas por hoja")
+
+    # Etapa 2: dependen de las hojas leídas en la etapa 1
+    # los aplicantes limpios se comparten entre sesiones mientras no cambie la versión de Applicants
+    cache = get_shared_cache()
+    applicants_version = cache.version(st.session_state["app_name"] + "Applicants")
+    cached_cleaned = cache.get("cleaned_applicants", version=applicants_version)
+    stage2 = {}
+    if cached_cleaned is None:
+        stage2["clean_applicants"] = lambda: load_latest_clean_applicants(st.session_state['dfs']['applicants'])
+    stage2["count_new_gform"] = lambda: count_new_gform_requests(existing=st.session_state['dfs']['requests'])
+    results2, timings2 = run_startup_tasks(stage2)
+    timings.update(timings2)
+    st.session_state['startup_timings'] = timings
+
+    if cached_cleaned is not None:
+        st.session_state['dfs']['cleaned_applicants'] = cached_cleaned
+        st.session_state['dfs']['cleaned_applicants_serialized'] = None
+    elif isinstance(results2["clean_applicants"], Exception) or results2["clean_applicants"] is None:
+        # no hay resultado del worker (o no se pudo leer): se limpia aquí, en el thread principal
+        clean_applicants()
+        cache.put("cleaned_applicants", st.session_state['dfs']['cleaned_applicants'], version=applicants_version)
+    else:
+        cleaned = CompactApplicants(results2["clean_applicants"])
+        cache.put("cleaned_applicants", cleaned, version=applicants_version)
+        st.session_state['dfs']['cleaned_applicants'] = cleaned
+        # la versión serializada solo se usa para escribir CleanApplicants; no se guarda en la sesión
+        st.session_state['dfs']['cleaned_applicants_serialized'] = None
+        print(len(cleaned), "applicants limpios leídos", "de", st.session_state['dfs']['applicants'].shape[0])
+
+    # estructuras de búsqueda de postulantes: se construyen una vez por versión y se comparten entre sesiones
+    if st.session_state['dfs'].get('cleaned_applicants') is not None:
+        get_matcher(st.session_state['dfs']['cleaned_applicants'])
+        get_applicant_index(st.session_state['dfs']['cleaned_applicants'])
+
+    # espejo local DuckDB (solo si está activado con CEAS_DUCKDB_MIRROR)
+    sync_mirror(st.session_state['dfs'])
+
+    n_new = results2.get("count_new_gform", 0)
+    if isinstance(n_new, Exception):
+        print(f"No se pudieron contar las solicitudes GForm nuevas: {n_new}")
+        n_new = 0
+    return n_new
+
+
 # ---- Main Script: Initialization and Navigation ----
 
 # Initialize session state
@@ -203,7 +291,7 @@ if not getattr(st.experimental_user, "is_logged_in", False):
 
 # 2. If logged in but role not yet set, load data and determine role, then rerun
 if st.session_state.get("role") is None:
-    load_dataframes()
+    n_new_gform = startup_load()
     # Determine user role from users sheet
     users_df = st.session_state['dfs']['users']
     user_email = st.experimental_user.email
@@ -216,9 +304,8 @@ if st.session_state.get("role") is None:
         st.session_state["role"] = None
         st.session_state["user_info"] = {}
     
-    clean_applicants()
-    # check new gform requests
-    check_new_gform_requests()
+    # check new gform requests (el conteo ya se hizo en startup_load)
+    check_new_gform_requests(n_new_gform)
     if st.session_state['new_gform_ack'] == True:
         st.rerun()
         